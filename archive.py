@@ -0,0 +1,175 @@
+"""
+Archive de parties enregistrées (journaux de journal.py), à accès direct.
+
+Format (petit-boutiste) :
+    en-tête (32 octets) : 'RKAR', version, nombre de parties, position de
+        l'index
+    blocs de parties : pour chaque partie, son journal (premier
+        enregistrement 'debut_partie'), suivi de la table de ses tours
+        (uint32 : position du début de chaque tour, relative au début du
+        journal de la partie ; le tour 0 commence à 0)
+    index (24 octets par partie) : position du journal, longueur du
+        journal, position de la table des tours, nombre de tours
+
+L'index étant de taille fixe, la partie K se trouve sans rien lire d'autre
+que son entrée ; la table des tours donne directement la position du tour T.
+La lecture passe par mmap : seules les pages utilisées sont chargées.
+"""
+import mmap
+import struct
+from array import array
+from journal import EVENEMENTS, ENREGISTREMENT, enregistrements, decoder_evenements, rejouer_evenements
+
+_MAGIQUE = b'RKAR'
+_VERSION = 1
+_ENTETE = struct.Struct('<4sB3xQQ8x')
+_ENTREE = struct.Struct('<QIQI')
+_DEBUT_PARTIE = EVENEMENTS.index('debut_partie')
+_TOUR_SUIVANT = EVENEMENTS.index('tour_suivant')
+
+
+class EcritureArchive:
+    """
+    Écriture d'une archive, partie par partie (le fichier est écrit au fil
+    de l'eau ; seul l'index, 24 octets par partie, reste en mémoire jusqu'à
+    la fermeture).
+    Méthodes :
+        ajouter(donnees), ajouter_journal(chemin), fermer
+    """
+    def __init__(self, chemin:str):
+        self.chemin = chemin
+        self._fichier = open(chemin, 'wb')
+        self._fichier.write(_ENTETE.pack(_MAGIQUE, _VERSION, 0, 0))
+        self._index = bytearray()
+        self._nb_parties = 0
+
+    def ajouter(self, donnees:bytes):
+        """Ajoute une partie : son journal complet, commençant par
+        l'enregistrement 'debut_partie'."""
+        tours = array('I', [0])
+        for pos, code, longueur in enregistrements(donnees):
+            if (code == _DEBUT_PARTIE) != (pos == 0):
+                raise ValueError("Une partie doit commencer, et elle seule, par 'debut_partie'")
+            if code == _TOUR_SUIVANT:
+                tours.append(pos + ENREGISTREMENT.size + longueur)
+        position = self._fichier.tell()
+        self._fichier.write(donnees)
+        position_tours = self._fichier.tell()
+        self._fichier.write(tours.tobytes())
+        self._index += _ENTREE.pack(position, len(donnees), position_tours, len(tours))
+        self._nb_parties += 1
+
+    def ajouter_journal(self, chemin:str):
+        """Ajoute toutes les parties d'un fichier journal, lu enregistrement
+        par enregistrement (une seule partie en mémoire à la fois)."""
+        partie = bytearray()
+        with open(chemin, 'rb') as f:
+            while True:
+                entete = f.read(ENREGISTREMENT.size)
+                if len(entete) < ENREGISTREMENT.size:
+                    break
+                code, longueur = ENREGISTREMENT.unpack(entete)
+                if code == _DEBUT_PARTIE and partie:
+                    self.ajouter(partie)
+                    partie = bytearray()
+                partie += entete
+                partie += f.read(longueur)
+        if entete:
+            raise ValueError("Journal tronqué")
+        if partie:
+            self.ajouter(partie)
+
+    def fermer(self):
+        position_index = self._fichier.tell()
+        self._fichier.write(self._index)
+        self._fichier.seek(0)
+        self._fichier.write(_ENTETE.pack(_MAGIQUE, _VERSION, self._nb_parties, position_index))
+        self._fichier.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+class Archive:
+    """
+    Lecture d'une archive par mmap, avec accès direct à la partie K et au
+    tour T.
+    Méthodes :
+        __len__, journal(k), nb_tours(k), evenements(k, tour), etat(k, tour),
+        __iter__ (parcours de toutes les parties), fermer
+    """
+    def __init__(self, chemin:str):
+        self.chemin = chemin
+        self._fichier = open(chemin, 'rb')
+        self._mmap = mmap.mmap(self._fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        magique, version, self._nb_parties, self._position_index = _ENTETE.unpack_from(self._mmap, 0)
+        if magique != _MAGIQUE or version != _VERSION:
+            raise ValueError("Format d'archive inconnu")
+
+    def __len__(self):
+        return self._nb_parties
+
+    def _entree(self, k:int):
+        if not 0 <= k < self._nb_parties:
+            raise IndexError(f"Partie {k} absente de l'archive")
+        return _ENTREE.unpack_from(self._mmap, self._position_index + k * _ENTREE.size)
+
+    def _bornes_tour(self, k:int, tour:int):
+        """Positions absolues (début, fin) des enregistrements du tour."""
+        position, longueur, position_tours, nb_tours = self._entree(k)
+        if not 0 <= tour < nb_tours:
+            raise IndexError(f"Tour {tour} absent de la partie {k}")
+        debut, = struct.unpack_from('<I', self._mmap, position_tours + 4 * tour)
+        if tour + 1 < nb_tours:
+            fin, = struct.unpack_from('<I', self._mmap, position_tours + 4 * (tour + 1))
+        else:
+            fin = longueur
+        return position + debut, position + fin
+
+    def journal(self, k:int):
+        """Journal brut de la partie k (bytes)."""
+        position, longueur, _, _ = self._entree(k)
+        return self._mmap[position:position + longueur]
+
+    def nb_tours(self, k:int):
+        return self._entree(k)[3]
+
+    def evenements(self, k:int, tour:int = None):
+        """Générateur des événements de la partie k, ou seulement ceux du tour
+        `tour` (l'événement 'tour_suivant' qui le termine compris)."""
+        if tour is None:
+            position, longueur, _, _ = self._entree(k)
+            return decoder_evenements(self._mmap, position, position + longueur)
+        return decoder_evenements(self._mmap, *self._bornes_tour(k, tour))
+
+    def etat(self, k:int, tour:int = 0):
+        """Jeu de la partie k au début du tour `tour`, en ne rejouant que les
+        enregistrements de cette partie qui le précèdent."""
+        position, _, _, _ = self._entree(k)
+        debut_tour, _ = self._bornes_tour(k, tour)
+        if tour == 0:
+            # Le tour 0 commence par l'état initial lui-même
+            _, _, longueur = next(enregistrements(self._mmap, position))
+            debut_tour = position + ENREGISTREMENT.size + longueur
+        jeu = None
+        for _, jeu in rejouer_evenements(decoder_evenements(self._mmap, position, debut_tour)):
+            pass
+        return jeu
+
+    def __iter__(self):
+        """Parcours de toutes les parties : (k, générateur d'événements)."""
+        for k in range(self._nb_parties):
+            yield k, self.evenements(k)
+
+    def fermer(self):
+        self._mmap.close()
+        self._fichier.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
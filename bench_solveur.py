@@ -0,0 +1,55 @@
+"""
+Benchmark du solveur (solveur.resoudre) sur des plateaux aléatoires :
+plateaux formés de suites et de groupes tirés d'un jeu complet, rack de
+14 tuiles prises dans le reste.
+
+Lancer : python bench_solveur.py
+"""
+import random
+import time
+from classes import Tuile, Combinaison, Plateau, Rack, NB_VALEURS, CODE_JOKER
+from solveur import resoudre
+
+
+def partie_aleatoire(nb_combinaisons:int, graine:int = 0):
+    """Construit un plateau d'environ nb_combinaisons combinaisons valides et
+    un rack de 14 tuiles, sans utiliser deux fois la même tuile physique."""
+    rng = random.Random(graine)
+    restantes = {code: 2 for code in range(CODE_JOKER + 1)}
+    plateau = Plateau()
+    for _ in range(nb_combinaisons * 4):
+        if len(plateau.mains) >= nb_combinaisons:
+            break
+        if rng.random() < 0.5:
+            couleur = rng.randrange(4)
+            taille = rng.randint(3, 5)
+            debut = rng.randint(1, NB_VALEURS - taille + 1)
+            codes = [couleur * NB_VALEURS + v - 1 for v in range(debut, debut + taille)]
+        else:
+            valeur = rng.randint(1, NB_VALEURS)
+            codes = [c * NB_VALEURS + valeur - 1 for c in rng.sample(range(4), rng.randint(3, 4))]
+        if all(restantes[c] for c in codes):
+            for c in codes:
+                restantes[c] -= 1
+            plateau.ajouter(Combinaison(Tuile.depuis_code(c, restantes[c]) for c in codes))
+    reste = [(code, copie) for code, n in restantes.items() for copie in range(n)]
+    rack = Rack()
+    for code, copie in rng.sample(reste, 14):
+        rack.ajouter_tuile(Tuile.depuis_code(code, copie))
+    return plateau, rack
+
+
+if __name__ == "__main__":
+    for nb_combinaisons in (5, 10, 20):
+        for objectif in ('tuiles', 'points'):
+            durees = []
+            scores = []
+            for graine in range(10):
+                plateau, rack = partie_aleatoire(nb_combinaisons, graine)
+                debut = time.perf_counter()
+                solution = resoudre(plateau, rack, objectif)
+                durees.append(time.perf_counter() - debut)
+                scores.append(solution.score if solution else 0)
+            print(f"{nb_combinaisons:2d} combinaisons, objectif {objectif:6s} : "
+                  f"{sum(durees) / len(durees) * 1000:7.1f} ms en moyenne, "
+                  f"{max(durees) * 1000:7.1f} ms au pire, score moyen {sum(scores) / len(scores):.1f}")
@@ -0,0 +1,70 @@
+"""
+Benchmark de la validation des combinaisons : table précalculée
+(Main.est_valide) contre l'algorithme d'origine (est_valide_historique).
+
+Lancer : python bench_validation.py
+"""
+import random
+import time
+from classes import (Tuile, Combinaison, NB_VALEURS, CODE_JOKER, table_combinaisons_valides,
+                     est_valide_historique)
+
+
+def combinaisons_aleatoires(n:int, graine:int = 0):
+    """Génère n combinaisons (suites, groupes et mélanges invalides) de 3 à 6 tuiles."""
+    rng = random.Random(graine)
+    combs = []
+    for _ in range(n):
+        taille = rng.randint(3, 6)
+        genre = rng.random()
+        if genre < 0.4:
+            couleur = rng.randrange(4)
+            debut = rng.randint(1, NB_VALEURS - taille + 1)
+            codes = [couleur * NB_VALEURS + v - 1 for v in range(debut, debut + taille)]
+        elif genre < 0.8:
+            valeur = rng.randint(1, NB_VALEURS)
+            codes = [c * NB_VALEURS + valeur - 1 for c in rng.sample(range(4), min(taille, 4))]
+        else:
+            codes = [rng.randrange(CODE_JOKER) for _ in range(taille)]
+        # Remplace éventuellement une tuile par un joker
+        if rng.random() < 0.3:
+            codes[rng.randrange(len(codes))] = CODE_JOKER
+        combs.append(Combinaison(Tuile.depuis_code(c) for c in codes))
+    return combs
+
+
+def valider_sans_cache(comb:Combinaison):
+    """est_valide sans la signature mise en cache par un appel précédent :
+    calcul de la signature puis recherche dans la table."""
+    comb.invalider()
+    return comb.est_valide()
+
+
+def chronometrer(fonction, combs, repetitions:int):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        for comb in combs:
+            fonction(comb)
+    return time.perf_counter() - debut
+
+
+if __name__ == "__main__":
+    debut = time.perf_counter()
+    table = table_combinaisons_valides()
+    print(f"Génération de la table : {len(table)} combinaisons en {(time.perf_counter() - debut) * 1000:.1f} ms")
+
+    combs = combinaisons_aleatoires(10000)
+    # Les deux chemins doivent donner exactement le même résultat
+    assert all(c.est_valide() == est_valide_historique(c.tuiles) for c in combs)
+
+    repetitions = 20
+    n = len(combs) * repetitions
+    # Chaque répétition recalcule la signature : sinon, dès la deuxième,
+    # est_valide ne mesurerait que la lecture du cache
+    t_table = chronometrer(valider_sans_cache, combs, repetitions)
+    t_cache = chronometrer(lambda c: c.est_valide(), combs, repetitions)
+    t_hist = chronometrer(lambda c: est_valide_historique(c.tuiles), combs, repetitions)
+    print(f"Table précalculée   : {t_table / n * 1e9:8.0f} ns / combinaison")
+    print(f"  (signature en cache : {t_cache / n * 1e9:6.0f} ns)")
+    print(f"Algorithme d'origine: {t_hist / n * 1e9:8.0f} ns / combinaison")
+    print(f"Accélération        : x{t_hist / t_table:.1f}")
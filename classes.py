@@ -1,4 +1,37 @@
 import random
+from array import array
+from functools import lru_cache
+from itertools import combinations
+
+# Codage entier des tuiles : 4 couleurs x 13 valeurs + le joker = 53 types.
+# Le code d'un type vaut indice_couleur * 13 + (valeur - 1), le joker vaut 52.
+# Chaque type existe en deux exemplaires (copie 0 et 1), l'identifiant
+# d'une tuile physique vaut code * 2 + copie (0..105).
+COULEURS = ("rouge", "bleu", "noir", "jaune")
+NB_VALEURS = 13
+CODE_JOKER = len(COULEURS) * NB_VALEURS
+NB_TYPES = CODE_JOKER + 1
+NB_COPIES = 2
+NB_TUILES = NB_TYPES * NB_COPIES
+_INDICE_COULEUR = {c: i for i, c in enumerate(COULEURS)}
+
+
+def code_tuile(couleur:str, valeur:int, is_joker:bool=False):
+    """Retourne le code entier (0..52) du type de tuile."""
+    if is_joker or couleur == "joker":
+        return CODE_JOKER
+    return _INDICE_COULEUR[couleur] * NB_VALEURS + (valeur - 1)
+
+
+def couleur_code(code:int):
+    """Retourne la couleur associée à un code de tuile."""
+    return "joker" if code == CODE_JOKER else COULEURS[code // NB_VALEURS]
+
+
+def valeur_code(code:int):
+    """Retourne la valeur associée à un code de tuile (0 pour le joker)."""
+    return 0 if code == CODE_JOKER else code % NB_VALEURS + 1
+
 
 class Tuile:
     """
@@ -7,13 +40,48 @@ class Tuile:
         couleur (str): Couleur de la tuile ('rouge', 'bleu', 'noir', 'jaune', ou 'joker').
         valeur (int): Valeur numérique de la tuile (1-13, ou 0 pour joker).
         is_joker (bool): Indique si la tuile est un joker.
+        code (int): Code du type de tuile (0..52, 52 pour le joker).
+        copie (int): Numéro d'exemplaire (0 ou 1) pour distinguer les doublons.
     Méthodes :
-        __init__, __repr__
+        __init__, depuis_code, depuis_ident, ident, __repr__
+
+    Les 106 tuiles physiques du jeu sont créées une seule fois (voir
+    Tuile.depuis_ident) et partagées par toutes les parties : une tuile est
+    immuable, les copies (copy, deepcopy) retournent donc la même instance.
     """
-    def __init__(self, couleur:str, valeur:int, is_joker:bool=False):
+    __slots__ = ("couleur", "valeur", "is_joker", "code", "copie")
+
+    def __init__(self, couleur:str, valeur:int, is_joker:bool=False, copie:int=0):
         self.couleur = couleur
         self.valeur = valeur
         self.is_joker = is_joker
+        self.code = code_tuile(couleur, valeur, is_joker)
+        self.copie = copie
+
+    @staticmethod
+    def depuis_code(code:int, copie:int=0):
+        """Retourne la tuile partagée du pool pour un code et un exemplaire."""
+        return _POOL_TUILES[code * NB_COPIES + copie]
+
+    @staticmethod
+    def depuis_ident(ident:int):
+        """Retourne la tuile partagée du pool pour un identifiant (0..105)."""
+        return _POOL_TUILES[ident]
+
+    @property
+    def ident(self):
+        """Identifiant de la tuile physique (code * 2 + copie)."""
+        return self.code * NB_COPIES + self.copie
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # Une tuile sérialisée (pickle) est restaurée depuis le pool partagé
+        return (_tuile_du_pool, (self.ident,))
 
     def __repr__(self):
         # Affichage couleur terminal (ANSI)
@@ -28,65 +96,200 @@ class Tuile:
         reset = "\033[0m"
         return f"{couleur_ansi}{self.valeur}{reset}"
 
+
+# Pool des 106 tuiles physiques, indexé par identifiant.
+_POOL_TUILES = tuple(
+    Tuile(couleur_code(code), valeur_code(code), code == CODE_JOKER, copie)
+    for code in range(NB_TYPES) for copie in range(NB_COPIES)
+)
+
+
+def _tuile_du_pool(ident:int):
+    return _POOL_TUILES[ident]
+
+
+def tuiles_depuis_idents(idents):
+    """Tuiles partagées du pool pour une suite d'identifiants (0..105)."""
+    return [_POOL_TUILES[i] for i in idents]
+
+
+# --- Empreintes (hachage de Zobrist) ------------------------------------
+# Une clé aléatoire de 64 bits par type de tuile, tirée d'une graine fixe :
+# les empreintes sont identiques d'un processus à l'autre. L'empreinte d'une
+# combinaison est la somme (modulo 2**64) des clés de ses tuiles : elle ne
+# dépend ni de l'ordre des tuiles ni de l'exemplaire, et se met à jour en
+# O(1) par tuile ajoutée ou retirée. Celle du plateau est la somme des
+# empreintes mélangées de ses combinaisons : elle ne dépend pas de leur
+# ordre, mais distingue deux découpages des mêmes tuiles.
+MASQUE_64 = (1 << 64) - 1
+_alea_zobrist = random.Random(0x52756D6D)
+ZOBRIST_PLATEAU = tuple(_alea_zobrist.getrandbits(64) for _ in range(NB_TYPES))
+ZOBRIST_RACK = tuple(_alea_zobrist.getrandbits(64) for _ in range(NB_TYPES))
+del _alea_zobrist
+
+
+def melanger_empreinte(h:int):
+    """Mélange non linéaire d'une empreinte de 64 bits (finaliseur de
+    splitmix64) ; 0 reste 0 (combinaison vide)."""
+    h = (h ^ (h >> 30)) * 0xBF58476D1CE4E5B9 & MASQUE_64
+    h = (h ^ (h >> 27)) * 0x94D049BB133111EB & MASQUE_64
+    return h ^ (h >> 31)
+
+
+def empreinte_tuiles(tuiles, cles:tuple = ZOBRIST_PLATEAU):
+    """Somme des clés de Zobrist d'une liste de tuiles (modulo 2**64)."""
+    return sum(cles[t.code] for t in tuiles) & MASQUE_64
+
+
+def est_valide_historique(tuiles):
+    """Validation d'origine (tri et insertion des jokers), conservée comme référence."""
+    if len(tuiles) < 3:
+        return False
+    tuiles = tuiles[:]
+    jokers = [t for t in tuiles if t.is_joker]
+    non_jokers = [t for t in tuiles if not t.is_joker]
+    valeurs = [t.valeur for t in non_jokers]
+    couleurs = [t.couleur for t in non_jokers]
+    # Groupe : même valeur, couleurs toutes différentes
+    if len(valeurs) > 0 and len(set(valeurs)) == 1:
+        # On doit avoir au plus un joker, et toutes les couleurs différentes
+        total_couleurs = couleurs + [f"joker{n}" for n in range(len(jokers))]
+        if len(set(total_couleurs)) == len(total_couleurs):
+            return True
+    # Suite : même couleur, valeurs consécutives
+    if len(set(couleurs)) == 1 and len(couleurs) > 0:
+        vals = sorted(valeurs)
+        jokers_count = len(jokers)
+        # On insère les jokers pour compléter la suite
+        for _ in range(jokers_count):
+            # Cherche où insérer le joker pour compléter la suite
+            inserted = False
+            for i in range(len(vals)-1):
+                if vals[i+1] - vals[i] > 1:
+                    vals.insert(i+1, vals[i]+1)
+                    inserted = True
+                    break
+            if not inserted:
+                # Joker en fin ou début
+                if vals:
+                    vals.append(vals[-1]+1)
+                else:
+                    vals.append(1)
+        # Vérifie la suite
+        if all(vals[i]+1 == vals[i+1] for i in range(len(vals)-1)):
+            return True
+    return False
+
+
+def signature(tuiles):
+    """Signature canonique d'un multi-ensemble de tuiles : codes triés."""
+    return tuple(sorted([t.code for t in tuiles]))
+
+
+@lru_cache(maxsize=None)
+def table_combinaisons_valides():
+    """Table de toutes les combinaisons valides, indexée par signature.
+
+    Générée une seule fois, elle accepte exactement les mêmes combinaisons
+    que est_valide_historique (au plus deux jokers) :
+    - groupe : une valeur, couleurs distinctes, au moins 3 tuiles ;
+    - suite : une couleur, valeurs distinctes dont les trous peuvent être
+      comblés par les jokers, au moins 3 tuiles.
+    Les valeurs associées valent 'groupe' ou 'suite'.
+    """
+    table = {}
+    jokers = [(), (CODE_JOKER,), (CODE_JOKER, CODE_JOKER)]
+    for valeur in range(1, NB_VALEURS + 1):
+        for r in range(1, len(COULEURS) + 1):
+            for couleurs in combinations(range(len(COULEURS)), r):
+                codes = tuple(c * NB_VALEURS + valeur - 1 for c in couleurs)
+                for j in jokers:
+                    if len(codes) + len(j) >= 3:
+                        table[codes + j] = 'groupe'
+    for c in range(len(COULEURS)):
+        for bas in range(1, NB_VALEURS + 1):
+            for haut in range(bas, NB_VALEURS + 1):
+                interieur = range(bas + 1, haut)
+                for nb_trous in range(min(2, len(interieur)) + 1):
+                    for trous in combinations(interieur, nb_trous):
+                        valeurs = [v for v in range(bas, haut + 1) if v not in trous]
+                        codes = tuple(c * NB_VALEURS + v - 1 for v in valeurs)
+                        for j in jokers[nb_trous:]:
+                            if len(codes) + len(j) >= 3:
+                                table.setdefault(codes + j, 'suite')
+    return table
+
+
 class Main:
     """
     Représente une main de tuiles (utilisée pour les combinaisons et le rack).
     Attributs :
         tuiles (list[Tuile]) : Liste des tuiles dans la main.
+        _signature (tuple | None) : Signature des tuiles (cache, None si à recalculer).
     Méthodes :
-        ajouter_tuile, retirer_tuile, est_valide, __repr__
+        ajouter_tuile, retirer_tuile, signature, invalider, est_valide, __repr__
+
+    Toute modification directe de la liste `tuiles` doit être suivie d'un
+    appel à invalider() ; les méthodes de Main, Combinaison et Plateau le
+    font elles-mêmes.
     """
     def __init__(self):
         self.tuiles = []
+        self._signature = None
 
     def ajouter_tuile(self, tuile:Tuile):
         self.tuiles.append(tuile)
+        self._signature = None
 
     def retirer_tuile(self, tuile:Tuile):
         self.tuiles.remove(tuile)
+        self._signature = None
+
+    def signature(self):
+        """Signature canonique des tuiles (voir signature), mise en cache."""
+        if self._signature is None:
+            self._signature = signature(self.tuiles)
+        return self._signature
+
+    def invalider(self):
+        self._signature = None
 
     def est_valide(self):
         if len(self.tuiles) < 3:
             return False
-        tuiles = self.tuiles[:]
-        jokers = [t for t in tuiles if t.is_joker]
-        non_jokers = [t for t in tuiles if not t.is_joker]
-        valeurs = [t.valeur for t in non_jokers]
-        couleurs = [t.couleur for t in non_jokers]
-        # Groupe : même valeur, couleurs toutes différentes
-        if len(valeurs) > 0 and len(set(valeurs)) == 1:
-            # On doit avoir au plus un joker, et toutes les couleurs différentes
-            total_couleurs = couleurs + [f"joker{n}" for n in range(len(jokers))]
-            if len(set(total_couleurs)) == len(total_couleurs):
-                return True
-        # Suite : même couleur, valeurs consécutives
-        if len(set(couleurs)) == 1 and len(couleurs) > 0:
-            vals = sorted(valeurs)
-            jokers_count = len(jokers)
-            # On insère les jokers pour compléter la suite
-            for _ in range(jokers_count):
-                # Cherche où insérer le joker pour compléter la suite
-                inserted = False
-                for i in range(len(vals)-1):
-                    if vals[i+1] - vals[i] > 1:
-                        vals.insert(i+1, vals[i]+1)
-                        inserted = True
-                        break
-                if not inserted:
-                    # Joker en fin ou début
-                    if vals:
-                        vals.append(vals[-1]+1)
-                    else:
-                        vals.append(1)
-            # Vérifie la suite
-            if all(vals[i]+1 == vals[i+1] for i in range(len(vals)-1)):
-                return True
-        return False
+        return self.signature() in table_combinaisons_valides()
 
     def __repr__(self):
         return f"Main(tuiles={self.tuiles})"
 
 
+@lru_cache(maxsize=None)
+def points_signature(sig:tuple, final:bool = False):
+    """Points d'une combinaison de signature `sig` (voir Combinaison.points).
+
+    Ne dépend que des types de tuiles : le résultat est mis en cache par
+    signature. Retourne 0 si les tuiles ne forment ni un groupe ni une suite
+    dont on peut inférer la valeur des jokers.
+    """
+    n = len(sig)
+    valeurs = sorted(valeur_code(c) for c in sig if c != CODE_JOKER)
+    if final:
+        return sum(valeurs) + 25 * (n - len(valeurs))
+    if not valeurs:
+        return 0
+    # Groupe : même valeur
+    if valeurs[0] == valeurs[-1]:
+        return valeurs[0] * n
+    # Suite : même couleur ; les jokers prennent les plus petites valeurs
+    # possibles, le début de la suite étant le plus bas qui contient toutes
+    # les valeurs
+    couleurs = {c // NB_VALEURS for c in sig if c != CODE_JOKER}
+    if len(couleurs) == 1:
+        debut = max(1, valeurs[0] - (n - len(valeurs)), valeurs[-1] - n + 1)
+        if debut <= min(NB_VALEURS - n + 1, valeurs[0]):
+            return n * debut + n * (n - 1) // 2
+    return 0
+
 
 class Combinaison(Main):
     """
@@ -103,6 +306,7 @@ class Combinaison(Main):
         for i, t in enumerate(self.tuiles):
             if t.is_joker:
                 self.tuiles[i] = tuile_replacement
+                self._signature = None
                 return True
         return False
     def points(self, context: str = 'normal'):
@@ -113,41 +317,10 @@ class Combinaison(Main):
           des tuiles qu'ils remplacent (inférée à partir de la combinaison).
         - context='final' : pour le décompte final, chaque joker vaut 25 points.
 
+        Retourne 0 si la valeur des jokers ne peut pas être inférée (ni
+        groupe ni suite). Le calcul est mis en cache par signature.
         """
-        def _sum_final():
-            total = 0
-            for t in self.tuiles:
-                if getattr(t, 'is_joker', False):
-                    total += 25
-                else:
-                    total += getattr(t, 'valeur', 0)
-            return total
-
-        if context == 'final':
-            return _sum_final()
-
-        # contexte 'initial'  : essayer d'inférer jokers
-        jokers = [i for i, t in enumerate(self.tuiles) if getattr(t, 'is_joker', False)]
-        non_jokers = [t for t in self.tuiles if not getattr(t, 'is_joker', False)]
-        valeurs = [t.valeur for t in non_jokers]
-        couleurs = [t.couleur for t in non_jokers]
-        n = len(self.tuiles)
-
-        # Groupe : même valeur
-        if len(valeurs) > 0 and len(set(valeurs)) == 1:
-            v = valeurs[0]
-            return v * n
-
-        # Suite : même couleur, valeurs consécutives possibles
-        if len(set(couleurs)) == 1 and len(valeurs) > 0:
-            vals = sorted(valeurs)
-            jokers_count = len(jokers)
-            min_start = max(1, vals[0] - jokers_count)
-            max_start = min(13 - n + 1, vals[-1])
-            for start in range(min_start, max_start + 1):
-                seq = list(range(start, start + n))
-                if all(v in seq for v in vals):
-                    return sum(seq)
+        return points_signature(self.signature(), context == 'final')
 
 
 
@@ -155,42 +328,217 @@ class Pioche:
     """
     Représente la pioche du jeu (ensemble des tuiles restantes).
     Attributs :
-        tuiles (list[Tuile]) : Tuiles restantes à piocher.
+        idents (array) : identifiants des tuiles restantes (Tuile.ident), la
+            prochaine tuile tirée est la dernière.
+        tuiles (list[Tuile]) : vue des tuiles restantes, dans le même ordre.
+        graine (int | None) : graine du générateur de la pioche.
     Méthodes :
-        tirer, __repr__
+        tirer, regarder, remettre, etat_generateur, restaurer_generateur,
+        __len__, __repr__
+
+    Chaque pioche a son propre générateur (random.Random) : deux pioches de
+    même graine donnent exactement la même partie, sans jamais toucher au
+    générateur global du module random.
     """
-    def __init__(self):
-        self.tuiles = []
-        couleurs = ["rouge", "bleu", "noir", "jaune"]
-        self.tuiles = [Tuile(c, v) for c in couleurs for v in range(1, 14)] * 2
-        self.tuiles.append(Tuile("joker", 0, True))
-        self.tuiles.append(Tuile("joker", 0, True))
-        random.shuffle(self.tuiles)
+    def __init__(self, graine:int = None, idents=None):
+        """Pioche mélangée, ou reprise telle quelle depuis `idents` (sans
+        mélange, par exemple au chargement d'une sauvegarde)."""
+        self.graine = graine
+        self._rng = None
+        # Un octet par tuile : créer une pioche ne crée aucun objet Tuile
+        if idents is None:
+            self.idents = array('B', range(NB_TUILES))
+            self._generateur().shuffle(self.idents)
+        else:
+            self.idents = array('B', idents)
+
+    def _generateur(self):
+        # Créé à la première utilisation : une pioche rechargée n'en a
+        # souvent pas besoin
+        if self._rng is None:
+            self._rng = random.Random(self.graine)
+        return self._rng
+
+    @property
+    def tuiles(self):
+        return [_POOL_TUILES[i] for i in self.idents]
+
+    @tuiles.setter
+    def tuiles(self, tuiles):
+        self.idents = array('B', (t.ident for t in tuiles))
 
     def tirer(self):
-        return self.tuiles.pop() if self.tuiles else None
+        return _POOL_TUILES[self.idents.pop()] if self.idents else None
+
+    def regarder(self, n:int = 1):
+        """Retourne les n prochaines tuiles sans les tirer (la prochaine en
+        premier)."""
+        if n <= 0:
+            return []
+        return [_POOL_TUILES[i] for i in self.idents[:-n - 1:-1]]
+
+    def remettre(self, tuile:Tuile, melanger:bool = True):
+        """Remet une tuile dans la pioche, à une position tirée au hasard
+        (par échange avec une tuile existante), ou sur le dessus si
+        melanger=False."""
+        self.idents.append(tuile.ident)
+        if melanger:
+            i = self._generateur().randrange(len(self.idents))
+            self.idents[i], self.idents[-1] = self.idents[-1], self.idents[i]
+
+    def etat_generateur(self):
+        """État du générateur, à passer à restaurer_generateur."""
+        return self._generateur().getstate()
+
+    def restaurer_generateur(self, etat):
+        self._generateur().setstate(etat)
+
+    def __len__(self):
+        return len(self.idents)
 
     def __repr__(self):
-        return f"Pioche(tuiles_restantes={len(self.tuiles)})"
-  
-  
-    
-class Rack:
+        return f"Pioche(tuiles_restantes={len(self.idents)})"
+
+
+class Changement:
+    """
+    Changement notifié aux abonnés d'un Plateau ou d'un Rack.
+    Attributs :
+        nom (str) : type de changement (voir Plateau.CHANGEMENTS et
+            Rack.CHANGEMENTS).
+        indices (tuple[int]) : positions concernées (combinaison, tuile...).
+        codes (tuple[int]) : codes des tuiles concernées.
+    """
+    __slots__ = ("nom", "indices", "codes")
+
+    def __init__(self, nom:str, indices:tuple = (), codes:tuple = ()):
+        self.nom = nom
+        self.indices = indices
+        self.codes = codes
+
+    def __repr__(self):
+        return f"Changement({self.nom}, indices={self.indices}, codes={self.codes})"
+
+
+class Emetteur:
+    """
+    Base des objets qui notifient leurs changements (Plateau, Rack).
+    Méthodes :
+        abonner(fonction), desabonner(fonction)
+
+    Chaque abonné est appelé avec un Changement juste après la
+    modification, dans l'ordre d'abonnement. Sans abonné, une notification
+    ne coûte qu'un test.
+    """
+    CHANGEMENTS = ()
+
+    def abonner(self, fonction):
+        """Abonne `fonction` aux changements ; la retourne (utilisable en
+        décorateur)."""
+        self._abonnes.append(fonction)
+        return fonction
+
+    def desabonner(self, fonction):
+        self._abonnes.remove(fonction)
+
+    def _notifier(self, nom:str, indices:tuple = (), codes:tuple = ()):
+        changement = Changement(nom, indices, codes)
+        for fonction in list(self._abonnes):
+            fonction(changement)
+
+
+class Rack(Emetteur):
     """
     Représente le rack d'un joueur (tuiles en main).
     Attributs :
         tuiles (list[Tuile]) : Tuiles du rack.
+        _empreinte (int) : Empreinte de Zobrist des tuiles (voir empreinte).
     Méthodes :
-        ajouter_tuile, retirer, afficher, __repr__
+        ajouter_tuile, retirer, empreinte, debut_transaction,
+        valider_transaction, annuler_transaction, abonner, desabonner,
+        afficher, __repr__
+
+    La liste `tuiles` ne doit être modifiée que par ces méthodes (ou
+    remplacée en entier) pour que l'empreinte reste à jour et que les
+    abonnés soient notifiés (voir CHANGEMENTS), annulations comprises.
     """
+    # Changements notifiés : indices (position dans le rack,) et codes
+    # (code de la tuile,) ; 'rack_remplace' sans indices, avec tous les codes.
+    CHANGEMENTS = ('tuile_ajoutee', 'tuile_retiree', 'rack_remplace')
+
     def __init__(self):
+        self._abonnes = []
+        self._journal = []
+        self._transactions = []
         self.tuiles = []
 
+    @property
+    def tuiles(self):
+        return self._tuiles
+
+    @tuiles.setter
+    def tuiles(self, tuiles):
+        # Remplacement complet : l'ancienne liste est gardée pour l'annulation
+        if self._transactions:
+            self._journal.append(('tuiles', self._tuiles))
+        self._tuiles = tuiles
+        self._empreinte = empreinte_tuiles(tuiles, ZOBRIST_RACK)
+        if self._abonnes:
+            self._notifier('rack_remplace', (), tuple(t.code for t in tuiles))
+
     def ajouter_tuile(self, tuile:Tuile):
-        self.tuiles.append(tuile)
+        self._tuiles.append(tuile)
+        self._empreinte = (self._empreinte + ZOBRIST_RACK[tuile.code]) & MASQUE_64
+        if self._transactions:
+            self._journal.append(('ajout', None))
+        if self._abonnes:
+            self._notifier('tuile_ajoutee', (len(self._tuiles) - 1,), (tuile.code,))
 
     def retirer(self, tuile:Tuile):
-        self.tuiles.remove(tuile)
+        index = self._tuiles.index(tuile)
+        del self._tuiles[index]
+        self._empreinte = (self._empreinte - ZOBRIST_RACK[tuile.code]) & MASQUE_64
+        if self._transactions:
+            self._journal.append(('retrait', index, tuile))
+        if self._abonnes:
+            self._notifier('tuile_retiree', (index,), (tuile.code,))
+
+    def empreinte(self):
+        """Empreinte de Zobrist du rack : ne dépend que des types de tuiles,
+        pas de leur ordre ni de leur exemplaire."""
+        return self._empreinte
+
+    # --- Transactions (même principe que Plateau) ---
+    def debut_transaction(self):
+        self._transactions.append(len(self._journal))
+
+    def valider_transaction(self):
+        self._transactions.pop()
+        if not self._transactions:
+            self._journal.clear()
+
+    def annuler_transaction(self):
+        marque = self._transactions.pop()
+        # Pas de journalisation pendant l'annulation elle-même
+        pile, self._transactions = self._transactions, []
+        try:
+            while len(self._journal) > marque:
+                op, *args = self._journal.pop()
+                if op == 'ajout':
+                    tuile = self._tuiles.pop()
+                    self._empreinte = (self._empreinte - ZOBRIST_RACK[tuile.code]) & MASQUE_64
+                    if self._abonnes:
+                        self._notifier('tuile_retiree', (len(self._tuiles),), (tuile.code,))
+                elif op == 'retrait':
+                    index, tuile = args
+                    self._tuiles.insert(index, tuile)
+                    self._empreinte = (self._empreinte + ZOBRIST_RACK[tuile.code]) & MASQUE_64
+                    if self._abonnes:
+                        self._notifier('tuile_ajoutee', (index,), (tuile.code,))
+                else:
+                    self.tuiles = args[0]
+        finally:
+            self._transactions = pile
 
     def afficher(self):
         if not self.tuiles:
@@ -205,38 +553,206 @@ class Rack:
     
     
     
-class Plateau:
+class Plateau(Emetteur):
     """
     Représente le plateau de jeu, contenant toutes les combinaisons posées.
     Attributs :
         mains (list[Combinaison]) : Liste des combinaisons posées sur le plateau.
+        _valides (list[bool]) : Validité de chaque combinaison (cache).
+        _nb_invalides (int) : Nombre de combinaisons invalides.
+        _empreintes (list[int]) : Empreinte de Zobrist de chaque combinaison.
+        _empreinte (int) : Empreinte du plateau (voir empreinte).
     Méthodes :
         reutiliser_tuiles, ajouter_main, ajouter, retirer_tuile, ajouter_tuile,
         deplacer_tuile, deplacer_tuiles, fusionner_combinaisons, split_combinaison,
-        est_valide_plateau, afficher, __repr__
+        est_valide_plateau, empreinte, revalider, debut_transaction,
+        valider_transaction, annuler_transaction, abonner, desabonner,
+        afficher, __repr__
+
+    Toutes les modifications passent par quelques primitives (_retirer_tuile_de,
+    _inserer_tuile, _inserer_combinaison, _retirer_combinaison) qui ne
+    revalident que les combinaisons touchées et mettent à jour l'empreinte
+    en O(1) : est_valide_plateau et empreinte sont en O(1).
+    Pendant une transaction, chaque primitive note dans _journal l'opération
+    inverse, ce qui permet d'annuler sans copier le plateau.
+
+    Chaque primitive notifie aussi les abonnés (voir CHANGEMENTS), y compris
+    pendant une annulation : un abonné qui suit ces changements reste
+    synchrone sans relire tout le plateau. Les manipulations composées
+    notifient ensuite un récapitulatif, utile pour un journal ; un abonné
+    qui tient un état à jour doit s'en tenir aux changements élémentaires.
     """
+    # Changements élémentaires (indices ; codes) :
+    #   tuile_retiree, tuile_inseree : (combinaison, position) ; (tuile,)
+    #   combinaison_inseree, combinaison_retiree : (combinaison,) ; ses tuiles
+    #   plateau_remplace : () ; toutes les tuiles
+    # Récapitulatifs, indices dans le plateau d'avant la manipulation :
+    #   tuile_deplacee : (source, position, destination) ; (tuile,)
+    #   tuiles_deplacees : (source, position, ..., destination) ; tuiles
+    #   combinaisons_fusionnees : (index1, index2) ; tuiles de la fusion
+    #   combinaison_scindee : (combinaison, position) ; tuiles scindées
+    CHANGEMENTS = ('tuile_retiree', 'tuile_inseree', 'combinaison_inseree', 'combinaison_retiree',
+                   'plateau_remplace', 'tuile_deplacee', 'tuiles_deplacees',
+                   'combinaisons_fusionnees', 'combinaison_scindee')
+
     def reutiliser_tuiles(self, indices):
         tuiles = []
         for idx_comb, idx_tuile in sorted(indices, reverse=True):
             tuiles.append(self.retirer_tuile(idx_comb, idx_tuile))
         return tuiles
     def __init__(self):
+        self._abonnes = []
+        self._journal = []
+        self._transactions = []
         self.mains = []
 
+    @property
+    def mains(self):
+        return self._mains
+
+    @mains.setter
+    def mains(self, mains):
+        # Remplacement complet (ex. restauration) : on recalcule tout le cache
+        if self._transactions:
+            self._journal.append(('mains', self._mains))
+        self._mains = mains
+        self._valides = [m.est_valide() for m in mains]
+        self._nb_invalides = self._valides.count(False)
+        self._empreintes = [empreinte_tuiles(m.tuiles) for m in mains]
+        self._empreinte = sum(melanger_empreinte(h) for h in self._empreintes) & MASQUE_64
+        if self._abonnes:
+            self._notifier('plateau_remplace', (), tuple(t.code for m in mains for t in m.tuiles))
+
+    # --- Transactions ---
+    def debut_transaction(self):
+        """Ouvre une transaction (imbricable) : les modifications suivantes
+        sont journalisées jusqu'à valider_transaction ou annuler_transaction."""
+        self._transactions.append(len(self._journal))
+
+    def valider_transaction(self):
+        self._transactions.pop()
+        if not self._transactions:
+            self._journal.clear()
+
+    def annuler_transaction(self):
+        """Défait les modifications depuis le début de la transaction, en
+        rejouant le journal à l'envers (coût proportionnel au changement)."""
+        marque = self._transactions.pop()
+        # Pas de journalisation pendant l'annulation elle-même
+        pile, self._transactions = self._transactions, []
+        try:
+            while len(self._journal) > marque:
+                op, *args = self._journal.pop()
+                if op == 'tuile_retiree':
+                    self._inserer_tuile(*args)
+                elif op == 'tuile_inseree':
+                    self._retirer_tuile_de(*args)
+                elif op == 'combinaison_retiree':
+                    self._inserer_combinaison(*args)
+                elif op == 'combinaison_inseree':
+                    self._retirer_combinaison(*args)
+                elif op == 'mains':
+                    self.mains = args[0]
+        finally:
+            self._transactions = pile
+
+    # --- Primitives : seules à modifier self._mains ---
+    def _revalider(self, index:int):
+        valide = self._mains[index].est_valide()
+        if valide != self._valides[index]:
+            self._valides[index] = valide
+            self._nb_invalides += -1 if valide else 1
+
+    def _changer_empreinte(self, index:int, h:int):
+        """Remplace l'empreinte de la combinaison `index` par h."""
+        self._empreinte = (self._empreinte - melanger_empreinte(self._empreintes[index])
+                           + melanger_empreinte(h)) & MASQUE_64
+        self._empreintes[index] = h
+
+    @staticmethod
+    def _position(pos, taille:int):
+        # Position effective d'un list.insert(pos, ...) sur une liste de cette taille
+        if pos is None or pos > taille:
+            return taille
+        if pos < 0:
+            return max(0, taille + pos)
+        return pos
+
+    def _retirer_tuile_de(self, index_combinaison:int, index_tuile:int):
+        comb = self._mains[index_combinaison]
+        tuiles = comb.tuiles
+        tuile = tuiles.pop(index_tuile)
+        comb.invalider()
+        self._revalider(index_combinaison)
+        self._changer_empreinte(index_combinaison,
+                                (self._empreintes[index_combinaison] - ZOBRIST_PLATEAU[tuile.code]) & MASQUE_64)
+        if self._transactions or self._abonnes:
+            index_combinaison %= len(self._mains)
+            index_tuile %= len(tuiles) + 1
+            if self._transactions:
+                self._journal.append(('tuile_retiree', index_combinaison, index_tuile, tuile))
+            if self._abonnes:
+                self._notifier('tuile_retiree', (index_combinaison, index_tuile), (tuile.code,))
+        return tuile
+
+    def _inserer_tuile(self, index_combinaison:int, pos:int, tuile):
+        comb = self._mains[index_combinaison]
+        tuiles = comb.tuiles
+        pos = self._position(pos, len(tuiles))
+        tuiles.insert(pos, tuile)
+        comb.invalider()
+        self._revalider(index_combinaison)
+        self._changer_empreinte(index_combinaison,
+                                (self._empreintes[index_combinaison] + ZOBRIST_PLATEAU[tuile.code]) & MASQUE_64)
+        if self._transactions or self._abonnes:
+            index_combinaison %= len(self._mains)
+            if self._transactions:
+                self._journal.append(('tuile_inseree', index_combinaison, pos))
+            if self._abonnes:
+                self._notifier('tuile_inseree', (index_combinaison, pos), (tuile.code,))
+
+    def _inserer_combinaison(self, index:int, comb):
+        index = self._position(index, len(self._mains))
+        self._mains.insert(index, comb)
+        valide = comb.est_valide()
+        self._valides.insert(index, valide)
+        if not valide:
+            self._nb_invalides += 1
+        h = empreinte_tuiles(comb.tuiles)
+        self._empreintes.insert(index, h)
+        self._empreinte = (self._empreinte + melanger_empreinte(h)) & MASQUE_64
+        if self._transactions:
+            self._journal.append(('combinaison_inseree', index))
+        if self._abonnes:
+            self._notifier('combinaison_inseree', (index,), tuple(t.code for t in comb.tuiles))
+
+    def _retirer_combinaison(self, index:int):
+        comb = self._mains.pop(index)
+        if not self._valides.pop(index):
+            self._nb_invalides -= 1
+        self._empreinte = (self._empreinte - melanger_empreinte(self._empreintes.pop(index))) & MASQUE_64
+        if self._transactions or self._abonnes:
+            index %= len(self._mains) + 1
+            if self._transactions:
+                self._journal.append(('combinaison_retiree', index, comb))
+            if self._abonnes:
+                self._notifier('combinaison_retiree', (index,), tuple(t.code for t in comb.tuiles))
+        return comb
+
     def ajouter_main(self, main:Main):
-        self.mains.append(main)
+        self._inserer_combinaison(None, main)
 
     def ajouter(self, combinaison:Main):
         if hasattr(combinaison, 'est_valide') and combinaison.est_valide():
-            self.mains.append(combinaison)
+            self._inserer_combinaison(None, combinaison)
             return True
         return False
 
     def retirer_tuile(self, index_combinaison:int, index_tuile:int):
         try:
-            tuile = self.mains[index_combinaison].tuiles.pop(index_tuile)
+            tuile = self._retirer_tuile_de(index_combinaison, index_tuile)
             if not self.mains[index_combinaison].tuiles:
-                self.mains.pop(index_combinaison)
+                self._retirer_combinaison(index_combinaison)
             return tuile
         except Exception as e:
             print(f"Erreur lors du retrait de tuile : {e}")
@@ -244,10 +760,7 @@ class Plateau:
 
     def ajouter_tuile(self, index_combinaison:int, tuile, pos_dest: int = None):
         try:
-            if pos_dest is None:
-                self.mains[index_combinaison].tuiles.append(tuile)
-            else:
-                self.mains[index_combinaison].tuiles.insert(pos_dest, tuile)
+            self._inserer_tuile(index_combinaison, pos_dest, tuile)
             return True
         except Exception as e:
             print(f"Erreur lors de l'ajout de tuile : {e}")
@@ -256,13 +769,13 @@ class Plateau:
 
     def deplacer_tuile(self, index_src:int, index_tuile:int, index_dest:int, pos_dest:int=None):
         try:
-            tuile = self.mains[index_src].tuiles.pop(index_tuile)
-            if pos_dest is None:
-                self.mains[index_dest].tuiles.append(tuile)
-            else:
-                self.mains[index_dest].tuiles.insert(pos_dest, tuile)
+            self.mains[index_dest]  # vérifie la destination avant de retirer la tuile
+            tuile = self._retirer_tuile_de(index_src, index_tuile)
+            self._inserer_tuile(index_dest, pos_dest, tuile)
             if not self.mains[index_src].tuiles:
-                self.mains.pop(index_src)
+                self._retirer_combinaison(index_src)
+            if self._abonnes:
+                self._notifier('tuile_deplacee', (index_src, index_tuile, index_dest), (tuile.code,))
             return True
         except Exception as e:
             print(f"Erreur lors du déplacement de tuile : {e}")
@@ -282,19 +795,15 @@ class Plateau:
             # Si destination est en fin (nouvelle combinaison)
             if index_dest >= len(self.mains):
                 # créer nouvelle combinaison
-                comb = Combinaison(tuiles)
-                self.mains.append(comb)
-                return True
-
-            # Insertion : si pos_dest None => append in order
-            if pos_dest is None:
-                for t in tuiles:
-                    self.mains[index_dest].tuiles.append(t)
+                self._inserer_combinaison(None, Combinaison(tuiles))
             else:
-                # insérer en respectant l'ordre des tuiles
+                # Insertion : si pos_dest None => append in order
                 for offset, t in enumerate(tuiles):
-                    self.mains[index_dest].tuiles.insert(pos_dest + offset, t)
+                    self._inserer_tuile(index_dest, None if pos_dest is None else pos_dest + offset, t)
 
+            if self._abonnes:
+                self._notifier('tuiles_deplacees', tuple(x for source in sources_norm for x in source) + (index_dest,),
+                               tuple(t.code for t in tuiles))
             return True
         except Exception as e:
             print(f"Erreur lors du déplacement multiple : {e}")
@@ -302,8 +811,13 @@ class Plateau:
 
     def fusionner_combinaisons(self, index1:int, index2:int):
         try:
-            self.mains[index1].tuiles.extend(self.mains[index2].tuiles)
-            self.mains.pop(index2)
+            tuiles = list(self.mains[index2].tuiles)
+            for t in tuiles:
+                self._inserer_tuile(index1, None, t)
+            self._retirer_combinaison(index2)
+            if self._abonnes:
+                self._notifier('combinaisons_fusionnees', (index1, index2),
+                               tuple(t.code for t in self.mains[index1 if index1 < index2 else index1 - 1].tuiles))
             return True
         except Exception as e:
             print(f"Erreur lors de la fusion : {e}")
@@ -312,17 +826,38 @@ class Plateau:
     def split_combinaison(self, index:int, split_pos:int):
         try:
             comb = self.mains[index]
+            index %= len(self.mains)
             tuiles1 = comb.tuiles[:split_pos]
             tuiles2 = comb.tuiles[split_pos:]
-            self.mains[index] = Combinaison(tuiles1)
-            self.mains.insert(index+1, Combinaison(tuiles2))
+            self._retirer_combinaison(index)
+            self._inserer_combinaison(index, Combinaison(tuiles1))
+            self._inserer_combinaison(index+1, Combinaison(tuiles2))
+            if self._abonnes:
+                self._notifier('combinaison_scindee', (index, split_pos), tuple(t.code for t in comb.tuiles))
             return True
         except Exception as e:
             print(f"Erreur lors du split : {e}")
             return False
 
     def est_valide_plateau(self):
-        return all(m.est_valide() for m in self.mains)
+        return self._nb_invalides == 0
+
+    def empreinte(self):
+        """Empreinte de Zobrist du plateau, clé de table de transposition :
+        deux plateaux formés des mêmes combinaisons (au sens des types de
+        tuiles), dans n'importe quel ordre, ont la même empreinte."""
+        return self._empreinte
+
+    def revalider(self, index:int = None):
+        """Recalcule la validité et l'empreinte d'une combinaison (ou de tout
+        le plateau) après une modification faite hors des méthodes de
+        Plateau."""
+        if index is None:
+            self.mains = self._mains
+        else:
+            self._mains[index].invalider()
+            self._revalider(index)
+            self._changer_empreinte(index, empreinte_tuiles(self._mains[index].tuiles))
 
     def __repr__(self):
         return f"Plateau(mains={self.mains})"
@@ -350,10 +885,11 @@ class Joueur:
         has_melded (bool): Indique si la première pose a été validée.
         has_drawn (bool): Indique si le joueur a déjà pioché ce tour.
         temp_meld_points (int): Points accumulés pour la première pose.
-        _backup_plateau, _backup_rack: Sauvegardes pour rollback.
-        _placed_this_turn (bool): Indique si une pose a été faite ce tour.
+        _placed_this_turn (bool): Indique si une première pose est en cours ce tour
+            (transaction ouverte sur le plateau et le rack).
     Méthodes :
-        piocher, tirer_tuile, jouer_main, manipuler_plateau, __repr__
+        piocher, tirer_tuile, jouer_main, manipuler_plateau,
+        debut_premiere_pose, premiere_pose_en_cours, fin_premiere_pose, __repr__
     """
     def __init__(self, nom:str):
         self.nom = nom
@@ -365,8 +901,6 @@ class Joueur:
         # État temporaire pendant un tour
         self.has_drawn = False
         self.temp_meld_points = 0
-        self._backup_plateau = None
-        self._backup_rack = None
         self._placed_this_turn = False
 
     def piocher(self, pioche:Pioche):
@@ -398,6 +932,31 @@ class Joueur:
             return plateau.reutiliser_tuiles(kwargs.get('indices'))
         return False
 
+    def debut_premiere_pose(self, plateau:Plateau):
+        """Ouvre les transactions du plateau et du rack pour la première pose,
+        qui pourra être annulée si elle n'atteint pas 30 points."""
+        if not self._placed_this_turn:
+            plateau.debut_transaction()
+            self.rack.debut_transaction()
+            self._placed_this_turn = True
+
+    @property
+    def premiere_pose_en_cours(self):
+        """Vrai si des tuiles du rack ont été posées depuis
+        debut_premiere_pose (transactions encore ouvertes)."""
+        return self._placed_this_turn
+
+    def fin_premiere_pose(self, plateau:Plateau, valider:bool):
+        """Valide ou annule les mouvements faits depuis debut_premiere_pose."""
+        if self._placed_this_turn:
+            if valider:
+                plateau.valider_transaction()
+                self.rack.valider_transaction()
+            else:
+                plateau.annuler_transaction()
+                self.rack.annuler_transaction()
+            self._placed_this_turn = False
+
     def __repr__(self):
         return f"Joueur(nom={self.nom}, main={self.main}, rack={self.rack})" 
 
@@ -0,0 +1,305 @@
+"""
+Générateur paresseux des coups légaux à partir d'un plateau et d'un rack.
+
+Un coup est soit une étape simple (ajouter une tuile du rack à une
+combinaison, poser une combinaison du rack, déplacer une tuile du plateau,
+fusionner ou scinder des combinaisons), soit un coup composé qui n'est
+légal qu'en entier (scinder une suite en y insérant une tuile du rack,
+prendre une tuile du plateau pour compléter une combinaison du rack,
+remplacer un joker et le rejouer aussitôt).
+
+Les coups sont produits au fur et à mesure, les moins coûteux d'abord :
+l'appelant peut s'arrêter au premier coup qui lui convient sans payer
+l'énumération complète. Chaque candidat est élagué par la table des
+combinaisons valides avant d'être construit, et deux coups menant au même
+plateau (même multi-ensemble de signatures) ne sont produits qu'une fois.
+
+Utilisation :
+    for coup in generer_coups(jeu.plateau, joueur.rack):
+        if coup.tuiles_rack:
+            coup.appliquer(jeu, joueur)
+            break
+
+Lancer : python coups.py [nombre de combinaisons] [graine]
+"""
+import sys
+import time
+from functools import lru_cache
+from classes import Combinaison, CODE_JOKER, signature, table_combinaisons_valides
+from premiere_pose import ordonner
+
+TYPES_COUPS = ('ajouter', 'poser', 'deplacer', 'fusionner', 'scinder',
+               'scinder_ajouter', 'poser_avec_plateau', 'remplacer_joker')
+
+
+@lru_cache(maxsize=None)
+def _combinaisons_par_code():
+    """Combinaisons valides indexées par chacun des codes qu'elles
+    contiennent (joker compris), les plus courtes d'abord.
+
+    Chaque entrée est un couple (signature, besoins), où besoins liste les
+    couples (code, nombre d'exemplaires) nécessaires.
+    """
+    index = {}
+    for sig in table_combinaisons_valides():
+        besoins = tuple((code, sig.count(code)) for code in sorted(set(sig)))
+        for code, _ in besoins:
+            index.setdefault(code, []).append((sig, besoins))
+    for liste in index.values():
+        liste.sort(key=lambda c: len(c[0]))
+    return index
+
+
+def _ajouter_code(sig:tuple, code:int):
+    return tuple(sorted(sig + (code,)))
+
+
+def _retirer_code(sig:tuple, code:int):
+    i = sig.index(code)
+    return sig[:i] + sig[i + 1:]
+
+
+def _valide(sig:tuple):
+    return len(sig) >= 3 and sig in table_combinaisons_valides()
+
+
+def _prendre(par_code:dict, besoins, fournie:int = None, deja:dict = None):
+    """Tuiles du rack couvrant `besoins`, sauf un exemplaire de `fournie`
+    (apporté par le plateau) et en laissant de côté les tuiles `deja` prises
+    (code -> nombre). Retourne None si le rack n'y suffit pas."""
+    tuiles = []
+    for code, n in besoins:
+        if code == fournie:
+            n -= 1
+        if not n:
+            continue
+        debut = deja.get(code, 0) if deja else 0
+        disponibles = par_code.get(code, ())
+        if len(disponibles) < debut + n:
+            return None
+        tuiles.extend(disponibles[debut:debut + n])
+    return tuiles
+
+
+class Coup:
+    """
+    Coup légal et plateau qui en résulte.
+    Attributs :
+        nom (str) : type de coup (voir TYPES_COUPS).
+        details (dict) : indices des combinaisons (et tuiles) concernées,
+            dans le plateau de départ.
+        combinaisons (list[list[Tuile]]) : plateau complet après le coup.
+        tuiles_rack (list[Tuile]) : tuiles du rack posées par le coup.
+        signature (tuple) : signatures triées des combinaisons du plateau
+            obtenu (sert à dédoublonner).
+    Méthodes :
+        appliquer(jeu, joueur)
+    """
+    __slots__ = ("nom", "details", "combinaisons", "tuiles_rack", "signature")
+
+    def __init__(self, nom:str, details:dict, combinaisons, tuiles_rack, signature:tuple):
+        self.nom = nom
+        self.details = details
+        self.combinaisons = combinaisons
+        self.tuiles_rack = tuiles_rack
+        self.signature = signature
+
+    def appliquer(self, jeu, joueur):
+        """Joue le coup pour `joueur` (voir Jeu.reorganiser_plateau)."""
+        return jeu.reorganiser_plateau(joueur, [Combinaison(c) for c in self.combinaisons])
+
+    def __repr__(self):
+        return f"Coup({self.nom}, {self.details}, posees={self.tuiles_rack})"
+
+
+def generer_coups(plateau, rack, types=None, plateau_modifiable:bool = True):
+    """Générateur des coups légaux depuis `plateau` avec les tuiles de `rack`.
+
+    Un coup est légal si toutes les combinaisons du plateau obtenu sont
+    valides : depuis un plateau qui contient des combinaisons invalides,
+    seuls les coups qui les réparent toutes sont produits.
+
+    types : types de coups à envisager (par défaut tous, dans l'ordre de
+    TYPES_COUPS). plateau_modifiable=False ne garde que les poses de
+    combinaisons du rack (joueur qui n'a pas encore fait sa première pose).
+    """
+    types = TYPES_COUPS if types is None else types
+    if not plateau_modifiable:
+        types = [t for t in types if t == 'poser']
+    mains = [list(m.tuiles) for m in plateau.mains]
+    sigs = [m.signature() for m in plateau.mains]
+    invalides = {i for i, s in enumerate(sigs) if not _valide(s)}
+    if len(invalides) > 2:
+        # Un coup touche au plus deux combinaisons existantes
+        return
+    par_code = {}
+    for t in rack.tuiles:
+        par_code.setdefault(t.code, []).append(t)
+    vus = {tuple(sorted(sigs))}
+
+    def coup(nom, details, modifiees, nouvelles, tuiles_rack):
+        """Construit le coup, ou None s'il laisse une combinaison invalide
+        ou mène à un plateau déjà produit. modifiees : indice -> (tuiles,
+        signature), tuiles vides si la combinaison disparaît ; nouvelles :
+        liste de (tuiles, signature)."""
+        if not invalides <= modifiees.keys():
+            return None
+        resultat = [s for i, s in enumerate(sigs) if i not in modifiees]
+        resultat += [s for tuiles, s in modifiees.values() if tuiles]
+        resultat += [s for _, s in nouvelles]
+        cle = tuple(sorted(resultat))
+        if cle in vus:
+            return None
+        vus.add(cle)
+        combinaisons = []
+        for i, m in enumerate(mains):
+            tuiles = modifiees[i][0] if i in modifiees else m
+            if tuiles:
+                combinaisons.append(tuiles)
+        combinaisons += [tuiles for tuiles, _ in nouvelles]
+        return Coup(nom, details, combinaisons, tuiles_rack, cle)
+
+    def ordonnee(tuiles):
+        tuiles = ordonner(tuiles)
+        return tuiles, signature(tuiles)
+
+    def retirables(i):
+        """Tuiles de la combinaison i qui peuvent en être retirées en la
+        laissant valide (ou vide) : (position, tuile, signature restante),
+        une seule par code."""
+        codes = set()
+        for j, t in enumerate(mains[i]):
+            if t.code in codes:
+                continue
+            codes.add(t.code)
+            reste = _retirer_code(sigs[i], t.code)
+            if not reste or _valide(reste):
+                yield j, t, reste
+
+    def sans(i, j):
+        return mains[i][:j] + mains[i][j + 1:]
+
+    for nom in types:
+        if nom == 'ajouter':
+            for code, tuiles in par_code.items():
+                for i, s in enumerate(sigs):
+                    if _valide(_ajouter_code(s, code)):
+                        c = coup(nom, {'index': i}, {i: ordonnee(mains[i] + tuiles[:1])}, [], tuiles[:1])
+                        if c:
+                            yield c
+
+        elif nom == 'poser':
+            for code in sorted(par_code):
+                for sig, besoins in _combinaisons_par_code().get(code, ()):
+                    if sig[0] != code:
+                        continue
+                    tuiles = _prendre(par_code, besoins)
+                    if tuiles is not None:
+                        c = coup(nom, {}, {}, [ordonnee(tuiles)], tuiles)
+                        if c:
+                            yield c
+
+        elif nom == 'deplacer':
+            for i in range(len(mains)):
+                for j, t, reste in retirables(i):
+                    for k, s in enumerate(sigs):
+                        if k != i and _valide(_ajouter_code(s, t.code)):
+                            c = coup(nom, {'index_src': i, 'index_tuile': j, 'index_dest': k},
+                                     {i: (sans(i, j), reste), k: ordonnee(mains[k] + [t])}, [], [])
+                            if c:
+                                yield c
+
+        elif nom == 'fusionner':
+            for i in range(len(mains)):
+                for k in range(i + 1, len(mains)):
+                    if _valide(tuple(sorted(sigs[i] + sigs[k]))):
+                        c = coup(nom, {'index1': i, 'index2': k},
+                                 {i: ordonnee(mains[i] + mains[k]), k: ([], ())}, [], [])
+                        if c:
+                            yield c
+
+        elif nom in ('scinder', 'scinder_ajouter'):
+            for i, m in enumerate(mains):
+                if table_combinaisons_valides().get(sigs[i]) != 'suite':
+                    continue
+                ordre = ordonner(m)
+                if nom == 'scinder':
+                    for p in range(3, len(ordre) - 2):
+                        gauche, droite = signature(ordre[:p]), signature(ordre[p:])
+                        if _valide(gauche) and _valide(droite):
+                            c = coup(nom, {'index': i, 'split_pos': p},
+                                     {i: (ordre[:p], gauche)}, [(ordre[p:], droite)], [])
+                            if c:
+                                yield c
+                    continue
+                # Une tuile du rack double une tuile de la suite : la suite
+                # est coupée après cette tuile, le double commence la suite
+                # de droite.
+                for p, t in enumerate(ordre):
+                    if t.is_joker or t.code not in par_code:
+                        continue
+                    double = par_code[t.code][0]
+                    gauche, droite = ordre[:p + 1], [double] + ordre[p + 1:]
+                    sig_g, sig_d = signature(gauche), signature(droite)
+                    if _valide(sig_g) and _valide(sig_d):
+                        c = coup(nom, {'index': i, 'split_pos': p + 1},
+                                 {i: (gauche, sig_g)}, [(droite, sig_d)], [double])
+                        if c:
+                            yield c
+
+        elif nom == 'poser_avec_plateau':
+            for i in range(len(mains)):
+                for j, t, reste in retirables(i):
+                    for sig, besoins in _combinaisons_par_code().get(t.code, ()):
+                        tuiles = _prendre(par_code, besoins, fournie=t.code)
+                        if tuiles:
+                            c = coup(nom, {'index_src': i, 'index_tuile': j},
+                                     {i: (sans(i, j), reste)}, [ordonnee([t] + tuiles)], tuiles)
+                            if c:
+                                yield c
+
+        elif nom == 'remplacer_joker':
+            # Le joker libéré doit être rejoué dans le même coup : ajouté à
+            # une autre combinaison, ou posé avec des tuiles du rack.
+            for i, m in enumerate(mains):
+                if CODE_JOKER not in sigs[i]:
+                    continue
+                position = next(j for j, t in enumerate(m) if t.is_joker)
+                joker = m[position]
+                sans_joker = _retirer_code(sigs[i], CODE_JOKER)
+                for code, remplacantes in par_code.items():
+                    if code == CODE_JOKER or not _valide(_ajouter_code(sans_joker, code)):
+                        continue
+                    remplacante = remplacantes[0]
+                    remplacee = ordonnee(m[:position] + [remplacante] + m[position + 1:])
+                    details = {'index': i, 'index_tuile': position}
+                    for k, s in enumerate(sigs):
+                        if k != i and _valide(_ajouter_code(s, CODE_JOKER)):
+                            c = coup(nom, dict(details, index_dest=k),
+                                     {i: remplacee, k: ordonnee(mains[k] + [joker])}, [], [remplacante])
+                            if c:
+                                yield c
+                    for sig, besoins in _combinaisons_par_code().get(CODE_JOKER, ()):
+                        tuiles = _prendre(par_code, besoins, fournie=CODE_JOKER, deja={code: 1})
+                        if tuiles:
+                            c = coup(nom, details, {i: remplacee}, [ordonnee([joker] + tuiles)],
+                                     [remplacante] + tuiles)
+                            if c:
+                                yield c
+
+
+if __name__ == "__main__":
+    from bench_solveur import partie_aleatoire
+    nb = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    graine = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    plateau, rack = partie_aleatoire(nb, graine)
+    debut = time.perf_counter()
+    premier = next(generer_coups(plateau, rack), None)
+    t_premier = time.perf_counter() - debut
+    debut = time.perf_counter()
+    par_type = {}
+    for c in generer_coups(plateau, rack):
+        par_type[c.nom] = par_type.get(c.nom, 0) + 1
+    t_total = time.perf_counter() - debut
+    print(f"Premier coup en {t_premier * 1e3:.2f} ms : {premier}")
+    print(f"{sum(par_type.values())} coups distincts en {t_total * 1e3:.1f} ms : {par_type}")
@@ -0,0 +1,170 @@
+"""
+Échantillonnage des tuiles cachées (Monte Carlo).
+
+Du point de vue d'un joueur, toute tuile qui n'est ni sur le plateau ni dans
+son rack se trouve dans le rack d'un adversaire ou dans la pioche. Un monde
+déterminisé est une répartition de ces tuiles cachées compatible avec ce
+que le joueur sait : la taille de chaque rack adverse, la taille de la
+pioche, et les tuiles connues d'un adversaire (par exemple celles d'une
+première pose annulée, reprises sous les yeux de tous).
+
+Les mondes sont tirés par lots en NumPy : un lot est une matrice
+(N x tuiles cachées) de permutations des identifiants cachés, découpée selon
+les tailles des racks. Les racks adverses sont fournis sous forme de comptes
+(N x adversaires x 53, voir evaluation_racks), sans créer d'objets Tuile ;
+determiniser reconstruit un Jeu complet pour un monde donné.
+
+Lancer : python echantillonnage.py [nombre de mondes]
+"""
+import sys
+import time
+import numpy as np
+from classes import Pioche, NB_TYPES, NB_COPIES, NB_TUILES, tuiles_depuis_idents
+from game import Jeu
+from sauvegarde import sauvegarder, charger
+
+
+class Mondes:
+    """
+    Lot de N mondes déterminisés.
+    Attributs :
+        adversaires (tuple[int]) : indices des adversaires, dans l'ordre des
+            racks.
+        idents (np.ndarray, N x H, uint8) : permutations des tuiles cachées ;
+            les premières colonnes vont au premier adversaire, et ainsi de
+            suite, les dernières à la pioche (la prochaine tirée en dernier).
+        bornes (tuple[int]) : colonnes de début de chaque rack, puis de la
+            pioche, puis H.
+        connues (dict[int, list[int]]) : identifiants connus de chaque
+            adversaire, ajoutés à son rack dans tous les mondes.
+    Méthodes :
+        comptes_racks, comptes_pioche, racks, pioche, __len__
+    """
+    __slots__ = ("adversaires", "idents", "bornes", "connues")
+
+    def __init__(self, adversaires:tuple, idents, bornes:tuple, connues:dict):
+        self.adversaires = adversaires
+        self.idents = idents
+        self.bornes = bornes
+        self.connues = connues
+
+    def __len__(self):
+        return self.idents.shape[0]
+
+    def _comptes(self, colonnes):
+        """Comptes (N x 53) des tuiles d'une tranche de colonnes."""
+        n = len(self)
+        codes = colonnes.astype(np.intp) // NB_COPIES + np.arange(n)[:, None] * NB_TYPES
+        return np.bincount(codes.ravel(), minlength=n * NB_TYPES).reshape(n, NB_TYPES).astype(np.int8)
+
+    def comptes_racks(self):
+        """Comptes des racks adverses (N x adversaires x 53), tuiles connues
+        comprises."""
+        comptes = np.empty((len(self), len(self.adversaires), NB_TYPES), dtype=np.int8)
+        for k, a in enumerate(self.adversaires):
+            comptes[:, k] = self._comptes(self.idents[:, self.bornes[k]:self.bornes[k + 1]])
+            for ident in self.connues.get(a, ()):
+                comptes[:, k, ident // NB_COPIES] += 1
+        return comptes
+
+    def comptes_pioche(self):
+        """Comptes de la pioche (N x 53)."""
+        return self._comptes(self.idents[:, self.bornes[-2]:])
+
+    def racks(self, i:int):
+        """Identifiants du rack de chaque adversaire dans le monde i."""
+        ligne = self.idents[i].tolist()
+        return {a: list(self.connues.get(a, ())) + ligne[self.bornes[k]:self.bornes[k + 1]]
+                for k, a in enumerate(self.adversaires)}
+
+    def pioche(self, i:int):
+        """Identifiants de la pioche dans le monde i."""
+        return self.idents[i, self.bornes[-2]:].tolist()
+
+    def __repr__(self):
+        return f"Mondes(n={len(self)}, adversaires={self.adversaires})"
+
+
+class Echantillonneur:
+    """
+    Tirage de mondes déterminisés du point de vue d'un joueur.
+    Attributs :
+        observateur (int) : indice du joueur dont on adopte le point de vue.
+        adversaires (tuple[int]) : indices des autres joueurs.
+        tailles (tuple[int]) : nombre de tuiles inconnues de chaque rack
+            adverse (taille du rack moins les tuiles connues).
+        taille_pioche (int) : nombre de tuiles de la pioche.
+        cachees (np.ndarray, uint8) : identifiants des tuiles cachées.
+        comptes_caches (np.ndarray, 53, int8) : comptes des tuiles cachées.
+        connues (dict[int, list[int]]) : tuiles connues de chaque adversaire.
+    Méthodes :
+        depuis_jeu, tirer, determiniser
+    """
+    def __init__(self, observateur:int, tailles_racks:dict, taille_pioche:int, visibles,
+                 connues:dict = None, graine:int = None):
+        """tailles_racks : taille du rack de chaque adversaire (indice ->
+        nombre de tuiles) ; visibles : identifiants des tuiles que
+        l'observateur voit (plateau et son propre rack) ; connues :
+        identifiants connus du rack de certains adversaires.
+
+        Lève ValueError si les tailles ne correspondent pas au nombre de
+        tuiles cachées.
+        """
+        self.observateur = observateur
+        self.connues = {a: list(idents) for a, idents in (connues or {}).items()}
+        self.adversaires = tuple(sorted(tailles_racks))
+        self.tailles = tuple(tailles_racks[a] - len(self.connues.get(a, ())) for a in self.adversaires)
+        self.taille_pioche = taille_pioche
+        exclues = np.zeros(NB_TUILES, dtype=bool)
+        exclues[list(visibles)] = True
+        exclues[[i for idents in self.connues.values() for i in idents]] = True
+        self.cachees = np.flatnonzero(~exclues).astype(np.uint8)
+        self.comptes_caches = np.bincount(self.cachees // NB_COPIES, minlength=NB_TYPES).astype(np.int8)
+        if min(self.tailles, default=0) < 0 or sum(self.tailles) + taille_pioche != len(self.cachees):
+            raise ValueError("Tailles des racks et de la pioche incompatibles avec les tuiles cachées")
+        self._bornes = tuple(np.cumsum((0,) + self.tailles).tolist()) + (len(self.cachees),)
+        self._rng = np.random.default_rng(graine)
+
+    @classmethod
+    def depuis_jeu(cls, jeu:Jeu, observateur:int, connues:dict = None, graine:int = None):
+        """Échantillonneur pour le joueur d'indice `observateur` d'un Jeu."""
+        visibles = [t.ident for m in jeu.plateau.mains for t in m.tuiles]
+        visibles += [t.ident for t in jeu.joueurs[observateur].rack.tuiles]
+        tailles = {k: len(j.rack.tuiles) for k, j in enumerate(jeu.joueurs) if k != observateur}
+        return cls(observateur, tailles, len(jeu.pioche), visibles, connues, graine)
+
+    def tirer(self, n:int):
+        """Tire n mondes indépendants, uniformes parmi les répartitions
+        compatibles."""
+        idents = self._rng.permuted(np.broadcast_to(self.cachees, (n, len(self.cachees))), axis=1)
+        return Mondes(self.adversaires, idents, self._bornes, self.connues)
+
+    def determiniser(self, jeu:Jeu, mondes:Mondes, i:int):
+        """Copie indépendante de `jeu` où les racks adverses et la pioche sont
+        ceux du monde i (le rack de l'observateur et le plateau sont
+        inchangés)."""
+        copie = charger(sauvegarder(jeu), verbeux=False)
+        for a, idents in mondes.racks(i).items():
+            copie.joueurs[a].rack.tuiles = tuiles_depuis_idents(idents)
+        copie.pioche = Pioche(idents=mondes.pioche(i))
+        return copie
+
+    def __repr__(self):
+        return (f"Echantillonneur(observateur={self.observateur}, cachees={len(self.cachees)}, "
+                f"racks={self.tailles}, pioche={self.taille_pioche})")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    jeu = Jeu(4, verbeux=False, graine=0)
+    echantillonneur = Echantillonneur.depuis_jeu(jeu, 0, graine=0)
+    debut = time.perf_counter()
+    mondes = echantillonneur.tirer(n)
+    comptes = mondes.comptes_racks()
+    duree = time.perf_counter() - debut
+    print(f"{echantillonneur}")
+    print(f"{n} mondes (comptes des racks compris) en {duree:.3f} s ({n / duree:,.0f} mondes/s)")
+    debut = time.perf_counter()
+    for i in range(1000):
+        echantillonneur.determiniser(jeu, mondes, i)
+    print(f"determiniser : {(time.perf_counter() - debut) * 1e3:.1f} µs par Jeu")
@@ -0,0 +1,201 @@
+from classes import (Tuile, Combinaison, Rack, Plateau, COULEURS, NB_VALEURS,
+                     CODE_JOKER, NB_TYPES, NB_COPIES)
+
+
+# --- Masques de 106 bits -------------------------------------------------
+# Le bit d'indice t.ident est à 1 si la tuile physique t est présente.
+# Les opérations ensemblistes se font directement sur les entiers Python :
+# union (|), intersection (&), différence (& ~), inclusion (a & ~b == 0).
+
+def masque_tuiles(tuiles):
+    """Retourne le masque de 106 bits d'une liste de tuiles."""
+    masque = 0
+    for t in tuiles:
+        masque |= 1 << t.ident
+    return masque
+
+
+def tuiles_masque(masque:int):
+    """Retourne les tuiles (du pool) présentes dans un masque."""
+    tuiles = []
+    while masque:
+        bas = masque & -masque
+        tuiles.append(Tuile.depuis_ident(bas.bit_length() - 1))
+        masque ^= bas
+    return tuiles
+
+
+def contient_code(masque:int, code:int):
+    """Indique si au moins un exemplaire du type `code` est dans le masque."""
+    return (masque >> (code * NB_COPIES)) & 3 != 0
+
+
+class Comptage:
+    """
+    Vecteur de comptage d'un ensemble de tuiles : nombre d'exemplaires de
+    chacun des 53 types (4 couleurs x 13 valeurs, puis le joker en dernier).
+    Attributs :
+        comptes (tuple[int]) : 53 compteurs indexés par code de tuile.
+    Méthodes :
+        depuis_codes, depuis_tuiles, depuis_rack, depuis_main, depuis_plateau,
+        depuis_masque, contient, nb_jokers, matrice, codes, masque, choisir,
+        vers_tuiles, vers_rack, vers_combinaison,
+        +, - (différence bornée à 0), & (min), | (max), <= (inclusion)
+
+    Un Comptage est immuable et hachable : il peut servir de clé de cache.
+    Chaque compteur est compris entre 0 et NB_COPIES (ValueError sinon, y
+    compris pour le résultat de +) : au-delà, le masque déborderait sur les
+    bits du code suivant.
+    """
+    __slots__ = ("comptes",)
+
+    def __init__(self, comptes=None):
+        self.comptes = tuple(comptes) if comptes is not None else (0,) * NB_TYPES
+        if len(self.comptes) != NB_TYPES or not all(0 <= n <= NB_COPIES for n in self.comptes):
+            raise ValueError(f"Un comptage a {NB_TYPES} compteurs compris entre 0 et {NB_COPIES}")
+
+    # --- Conversions depuis les classes du jeu ---
+    @classmethod
+    def depuis_codes(cls, codes):
+        comptes = [0] * NB_TYPES
+        for code in codes:
+            comptes[code] += 1
+        return cls(comptes)
+
+    @classmethod
+    def depuis_tuiles(cls, tuiles):
+        return cls.depuis_codes(t.code for t in tuiles)
+
+    @classmethod
+    def depuis_rack(cls, rack:Rack):
+        return cls.depuis_tuiles(rack.tuiles)
+
+    @classmethod
+    def depuis_main(cls, main):
+        return cls.depuis_tuiles(main.tuiles)
+
+    @classmethod
+    def depuis_plateau(cls, plateau:Plateau):
+        """Comptage de toutes les tuiles posées (toutes combinaisons confondues)."""
+        return cls.depuis_codes(t.code for m in plateau.mains for t in m.tuiles)
+
+    @classmethod
+    def depuis_masque(cls, masque:int):
+        return cls(((masque >> (code * NB_COPIES)) & 3).bit_count() for code in range(NB_TYPES))
+
+    # --- Requêtes O(1) ---
+    def __getitem__(self, code:int):
+        return self.comptes[code]
+
+    def contient(self, code:int, n:int=1):
+        return self.comptes[code] >= n
+
+    def nb_jokers(self):
+        return self.comptes[CODE_JOKER]
+
+    def __len__(self):
+        return sum(self.comptes)
+
+    def matrice(self):
+        """Retourne les comptes sous forme 4 x 13 (couleur, valeur - 1)."""
+        return [list(self.comptes[i * NB_VALEURS:(i + 1) * NB_VALEURS]) for i in range(len(COULEURS))]
+
+    def codes(self):
+        """Liste des codes, chaque code répété autant de fois que son compte."""
+        return [code for code, n in enumerate(self.comptes) for _ in range(n)]
+
+    # --- Arithmétique ensembliste (multi-ensembles) ---
+    def __add__(self, autre):
+        return Comptage(a + b for a, b in zip(self.comptes, autre.comptes))
+
+    def __sub__(self, autre):
+        return Comptage(a - b if a > b else 0 for a, b in zip(self.comptes, autre.comptes))
+
+    def __and__(self, autre):
+        return Comptage(a if a < b else b for a, b in zip(self.comptes, autre.comptes))
+
+    def __or__(self, autre):
+        return Comptage(a if a > b else b for a, b in zip(self.comptes, autre.comptes))
+
+    def __le__(self, autre):
+        return all(a <= b for a, b in zip(self.comptes, autre.comptes))
+
+    def __eq__(self, autre):
+        return isinstance(autre, Comptage) and self.comptes == autre.comptes
+
+    def __hash__(self):
+        return hash(self.comptes)
+
+    # --- Conversions vers les classes du jeu ---
+    def masque(self, utilises=None):
+        """Masque canonique : les exemplaires sont pris dans l'ordre (copie 0 puis 1).
+
+        `utilises` (liste de 53 compteurs, modifiée) permet de répartir les
+        exemplaires entre plusieurs comptages d'un même plateau.
+
+        Lève ValueError si les comptages répartis demandent plus de
+        NB_COPIES exemplaires d'un même type (`utilises` est alors inchangé).
+        """
+        if utilises is not None and any(u + n > NB_COPIES for u, n in zip(utilises, self.comptes)):
+            raise ValueError("Exemplaires insuffisants pour ce comptage")
+        masque = 0
+        for code, n in enumerate(self.comptes):
+            debut = utilises[code] if utilises is not None else 0
+            for copie in range(debut, debut + n):
+                masque |= 1 << (code * NB_COPIES + copie)
+            if utilises is not None:
+                utilises[code] += n
+        return masque
+
+    def vers_tuiles(self, utilises=None):
+        """Tuiles du pool correspondant au comptage (jokers en dernier)."""
+        return tuiles_masque(self.masque(utilises))
+
+    def choisir(self, tuiles):
+        """Sélectionne parmi `tuiles` des tuiles physiques correspondant au comptage.
+
+        Lève ValueError si `tuiles` ne contient pas assez d'exemplaires.
+        """
+        restants = list(self.comptes)
+        choix = []
+        for t in tuiles:
+            if restants[t.code]:
+                restants[t.code] -= 1
+                choix.append(t)
+        if any(restants):
+            raise ValueError("Tuiles insuffisantes pour ce comptage")
+        return choix
+
+    def vers_rack(self):
+        rack = Rack()
+        for t in self.vers_tuiles():
+            rack.ajouter_tuile(t)
+        return rack
+
+    def vers_combinaison(self, utilises=None):
+        return Combinaison(self.vers_tuiles(utilises))
+
+    def __repr__(self):
+        return f"Comptage(tuiles={len(self)}, jokers={self.nb_jokers()})"
+
+
+def encoder_plateau(plateau:Plateau):
+    """Encode le plateau en un tuple de Comptage (un par combinaison)."""
+    return tuple(Comptage.depuis_main(m) for m in plateau.mains)
+
+
+def decoder_plateau(encodage):
+    """Reconstruit un Plateau à partir d'un tuple de Comptage.
+
+    Les exemplaires des tuiles sont répartis entre les combinaisons pour
+    qu'une même tuile physique n'apparaisse jamais deux fois.
+    """
+    plateau = Plateau()
+    utilises = [0] * NB_TYPES
+    for comptage in encodage:
+        plateau.ajouter_main(comptage.vers_combinaison(utilises))
+    return plateau
+
+
+# Comptage du jeu complet (deux exemplaires de chaque type)
+JEU_COMPLET = Comptage((NB_COPIES,) * NB_TYPES)
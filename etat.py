@@ -0,0 +1,240 @@
+from classes import Tuile, Combinaison, Pioche, NB_COPIES, table_combinaisons_valides
+from game import Jeu
+
+
+def _signature_idents(idents):
+    return tuple(sorted([i // NB_COPIES for i in idents]))
+
+
+def _points_initiaux(idents):
+    """Points d'une pose selon Combinaison.points(context='initial')."""
+    return Combinaison(Tuile.depuis_ident(i) for i in idents).points(context='initial') or 0
+
+
+class EtatJoueur:
+    """
+    État immuable d'un joueur.
+    Attributs :
+        nom (str), rack (tuple[int]) : identifiants des tuiles du rack,
+        points (int), has_melded (bool), has_drawn (bool), temp_meld_points (int)
+    """
+    __slots__ = ("nom", "rack", "points", "has_melded", "has_drawn", "temp_meld_points")
+
+    def __init__(self, nom:str, rack:tuple, points:int = 0, has_melded:bool = False,
+                 has_drawn:bool = False, temp_meld_points:int = 0):
+        self.nom = nom
+        self.rack = rack
+        self.points = points
+        self.has_melded = has_melded
+        self.has_drawn = has_drawn
+        self.temp_meld_points = temp_meld_points
+
+    def remplacer(self, **changements):
+        """Retourne une copie de l'état avec les attributs donnés modifiés."""
+        valeurs = {nom: getattr(self, nom) for nom in self.__slots__}
+        valeurs.update(changements)
+        return EtatJoueur(**valeurs)
+
+    def __repr__(self):
+        return f"EtatJoueur(nom={self.nom}, rack={len(self.rack)} tuiles, points={self.points})"
+
+
+class EtatJeu:
+    """
+    État immuable d'une partie, à partage de structure.
+
+    Les tuiles sont représentées par leur identifiant (Tuile.ident). Chaque
+    coup retourne un nouvel EtatJeu qui réutilise tout ce qu'il ne modifie
+    pas : les combinaisons non touchées, les racks des autres joueurs et la
+    pioche (dont seule la longueur utile nb_pioche change au tirage).
+
+    Attributs :
+        plateau (tuple[tuple[int]]) : combinaisons posées.
+        joueurs (tuple[EtatJoueur]) : état de chaque joueur.
+        pioche (tuple[int]) : tuiles de la pioche, tirées depuis la fin.
+        nb_pioche (int) : nombre de tuiles restantes dans la pioche.
+        tour (int) : index du tour courant.
+        debut_tour (EtatJeu | None) : état au début du tour, pour annuler une
+            première pose de moins de 30 points (None si l'état est lui-même
+            un début de tour).
+    Méthodes :
+        depuis_jeu, vers_jeu, joueur_courant, est_valide_plateau, est_terminee,
+        piocher, poser, ajouter_tuile, deplacer_tuile, fusionner_combinaisons,
+        split_combinaison, remplacer_plateau, passer_tour
+    """
+    __slots__ = ("plateau", "joueurs", "pioche", "nb_pioche", "tour", "debut_tour")
+
+    def __init__(self, plateau:tuple, joueurs:tuple, pioche:tuple, nb_pioche:int = None,
+                 tour:int = 0, debut_tour = None):
+        self.plateau = plateau
+        self.joueurs = joueurs
+        self.pioche = pioche
+        self.nb_pioche = len(pioche) if nb_pioche is None else nb_pioche
+        self.tour = tour
+        self.debut_tour = debut_tour
+
+    # --- Conversions avec Jeu ---
+    @classmethod
+    def depuis_jeu(cls, jeu:Jeu):
+        """Capture l'état d'un Jeu (à appeler de préférence entre deux tours :
+        une première pose en cours ne pourra plus être annulée)."""
+        plateau = tuple(tuple(t.ident for t in m.tuiles) for m in jeu.plateau.mains)
+        joueurs = tuple(
+            EtatJoueur(j.nom, tuple(t.ident for t in j.rack.tuiles), j.points, j.has_melded,
+                       j.has_drawn, j.temp_meld_points)
+            for j in jeu.joueurs
+        )
+        pioche = tuple(jeu.pioche.idents)
+        return cls(plateau, joueurs, pioche, tour=jeu.tour)
+
+    def vers_jeu(self):
+        """Reconstruit un Jeu indépendant à partir de l'état."""
+        jeu = Jeu(len(self.joueurs), distribuer=False, pioche=Pioche(idents=self.pioche[:self.nb_pioche]))
+        jeu.tour = self.tour
+        jeu.plateau.mains = [Combinaison(Tuile.depuis_ident(i) for i in comb) for comb in self.plateau]
+        for joueur, etat in zip(jeu.joueurs, self.joueurs):
+            joueur.nom = etat.nom
+            joueur.rack.tuiles = [Tuile.depuis_ident(i) for i in etat.rack]
+            joueur.points = etat.points
+            joueur.has_melded = etat.has_melded
+            joueur.has_drawn = etat.has_drawn
+            joueur.temp_meld_points = etat.temp_meld_points
+        jeu.partie_terminee = self.est_terminee()
+        return jeu
+
+    # --- Requêtes ---
+    @property
+    def index_courant(self):
+        return self.tour % len(self.joueurs)
+
+    @property
+    def joueur_courant(self):
+        return self.joueurs[self.index_courant]
+
+    def est_valide_plateau(self):
+        table = table_combinaisons_valides()
+        return all(len(c) >= 3 and _signature_idents(c) in table for c in self.plateau)
+
+    def est_terminee(self):
+        return any(not j.rack for j in self.joueurs)
+
+    # --- Construction des nouveaux états ---
+    def _suivant(self, plateau=None, joueur:EtatJoueur = None, nb_pioche:int = None):
+        joueurs = self.joueurs
+        if joueur is not None:
+            i = self.index_courant
+            joueurs = joueurs[:i] + (joueur,) + joueurs[i + 1:]
+        return EtatJeu(self.plateau if plateau is None else plateau, joueurs, self.pioche,
+                       self.nb_pioche if nb_pioche is None else nb_pioche, self.tour,
+                       self.debut_tour or self)
+
+    def _sans_rack(self, idents):
+        """Rack du joueur courant privé de `idents` (ValueError si absentes)."""
+        rack = list(self.joueur_courant.rack)
+        for i in idents:
+            rack.remove(i)
+        return tuple(rack)
+
+    def _compter_pose(self, joueur:EtatJoueur, idents):
+        # Même règle que Jeu.poser_combinaison : points ajoutés directement
+        # après la première pose, accumulés sinon.
+        points = _points_initiaux(idents) if idents else 0
+        if points <= 0:
+            return joueur
+        if joueur.has_melded:
+            return joueur.remplacer(points=joueur.points + points)
+        return joueur.remplacer(temp_meld_points=joueur.temp_meld_points + points)
+
+    # --- Coups ---
+    def piocher(self):
+        """Le joueur courant tire la dernière tuile de la pioche."""
+        joueur = self.joueur_courant
+        if joueur.has_drawn or self.nb_pioche == 0:
+            return self
+        tuile = self.pioche[self.nb_pioche - 1]
+        joueur = joueur.remplacer(rack=joueur.rack + (tuile,), has_drawn=True)
+        return self._suivant(joueur=joueur, nb_pioche=self.nb_pioche - 1)
+
+    def poser(self, idents):
+        """Pose une nouvelle combinaison formée de tuiles du rack courant."""
+        idents = tuple(idents)
+        joueur = self.joueur_courant.remplacer(rack=self._sans_rack(idents))
+        return self._suivant(plateau=self.plateau + (idents,), joueur=self._compter_pose(joueur, idents))
+
+    def ajouter_tuile(self, index_combinaison:int, ident:int, pos:int = None):
+        """Ajoute une tuile du rack courant à une combinaison du plateau."""
+        comb = list(self.plateau[index_combinaison])
+        comb.insert(len(comb) if pos is None else pos, ident)
+        plateau = self.plateau[:index_combinaison] + (tuple(comb),) + self.plateau[index_combinaison + 1:]
+        joueur = self.joueur_courant.remplacer(rack=self._sans_rack((ident,)))
+        return self._suivant(plateau=plateau, joueur=self._compter_pose(joueur, (ident,)))
+
+    def deplacer_tuile(self, index_src:int, index_tuile:int, index_dest:int, pos_dest:int = None):
+        """Même sémantique que Plateau.deplacer_tuile."""
+        plateau = list(self.plateau)
+        src = list(plateau[index_src])
+        tuile = src.pop(index_tuile)
+        dest = list(plateau[index_dest]) if index_dest != index_src else src
+        dest.insert(len(dest) if pos_dest is None else pos_dest, tuile)
+        plateau[index_src] = tuple(src)
+        plateau[index_dest] = tuple(dest)
+        if not src:
+            plateau.pop(index_src)
+        return self._suivant(plateau=tuple(plateau))
+
+    def fusionner_combinaisons(self, index1:int, index2:int):
+        plateau = list(self.plateau)
+        plateau[index1] = plateau[index1] + plateau[index2]
+        plateau.pop(index2)
+        return self._suivant(plateau=tuple(plateau))
+
+    def split_combinaison(self, index:int, split_pos:int):
+        comb = self.plateau[index]
+        plateau = self.plateau[:index] + (comb[:split_pos], comb[split_pos:]) + self.plateau[index + 1:]
+        return self._suivant(plateau=plateau)
+
+    def remplacer_plateau(self, combinaisons, idents_rack=()):
+        """Remplace tout le plateau par `combinaisons` (listes d'identifiants),
+        en y ajoutant les tuiles `idents_rack` du rack courant.
+
+        Les combinaisons identiques à des combinaisons existantes réutilisent
+        les tuples existants.
+        """
+        existantes = {c: c for c in self.plateau}
+        plateau = tuple(existantes.get(tuple(c), tuple(c)) for c in combinaisons)
+        joueur = self.joueur_courant
+        if idents_rack:
+            joueur = joueur.remplacer(rack=self._sans_rack(idents_rack))
+            joueur = self._compter_pose(joueur, tuple(idents_rack))
+        return self._suivant(plateau=plateau, joueur=joueur)
+
+    def passer_tour(self):
+        """Termine le tour (comme Jeu.passer_tour) et passe au joueur suivant.
+
+        Une première pose de moins de 30 points (0 compris) est annulée en
+        repartant de l'état du début du tour, sans aucune copie.
+        """
+        etat = self
+        joueur = self.joueur_courant
+        debut = self.debut_tour or self
+        if not joueur.has_melded:
+            # Tuiles du rack posées ce tour, même sans points (un joker seul)
+            posees = not set(debut.joueur_courant.rack) <= set(joueur.rack)
+            if joueur.temp_meld_points < 30 and (joueur.temp_meld_points > 0 or posees):
+                # On garde la pioche courante (une tuile tirée reste tirée)
+                etat = EtatJeu(debut.plateau, debut.joueurs, self.pioche, self.nb_pioche, self.tour)
+                rack = debut.joueur_courant.rack
+                if self.nb_pioche < debut.nb_pioche:
+                    rack = rack + self.pioche[self.nb_pioche:debut.nb_pioche][::-1]
+                joueur = debut.joueur_courant.remplacer(rack=rack, temp_meld_points=0)
+            elif joueur.temp_meld_points >= 30:
+                joueur = joueur.remplacer(points=joueur.points + joueur.temp_meld_points,
+                                          has_melded=True, temp_meld_points=0)
+        joueur = joueur.remplacer(has_drawn=False)
+        i = etat.index_courant
+        joueurs = etat.joueurs[:i] + (joueur,) + etat.joueurs[i + 1:]
+        return EtatJeu(etat.plateau, joueurs, etat.pioche, etat.nb_pioche, etat.tour + 1)
+
+    def __repr__(self):
+        return (f"EtatJeu(tour={self.tour}, combinaisons={len(self.plateau)}, "
+                f"pioche={self.nb_pioche}, joueurs={self.joueurs})")
@@ -0,0 +1,144 @@
+"""
+Évaluation vectorisée (NumPy) de lots de racks.
+
+Un lot de N racks est un tableau (N x 53) de comptes de tuiles, indexé par
+code de tuile (voir classes.code_tuile). Toutes les mesures sont calculées
+pour le lot entier en une seule passe, sans créer d'objets Tuile : elles
+servent de préfiltre avant une analyse exacte (premiere_pose).
+
+Lancer : python evaluation_racks.py [nombre de racks]
+"""
+import sys
+import time
+import numpy as np
+from classes import Pioche, COULEURS, NB_VALEURS, CODE_JOKER, NB_TYPES, NB_COPIES, NB_TUILES
+from encodage import Comptage
+
+_NB_COULEURS = len(COULEURS)
+_VALEURS = np.arange(1, NB_VALEURS + 1)
+
+
+# --- Construction des lots ---------------------------------------------
+
+def matrice_racks(racks):
+    """Tableau (N x 53) des comptes d'une liste de Rack, Comptage ou listes
+    de tuiles."""
+    lignes = []
+    for rack in racks:
+        if not isinstance(rack, Comptage):
+            rack = Comptage.depuis_tuiles(getattr(rack, 'tuiles', rack))
+        lignes.append(rack.comptes)
+    return np.array(lignes, dtype=np.int8).reshape(-1, NB_TYPES)
+
+
+def racks_pioche(n:int, taille:int = 14, graine:int = 0):
+    """Racks des `taille` premières tuiles tirées de n pioches de graines
+    graine, graine + 1, ... (même mélange que Pioche)."""
+    comptes = np.zeros((n, NB_TYPES), dtype=np.int8)
+    for i in range(n):
+        pioche = Pioche(graine + i)
+        for ident in pioche.idents[-taille:]:
+            comptes[i, ident // NB_COPIES] += 1
+    return comptes
+
+
+def distribuer(n:int, taille:int = 14, graine:int = None):
+    """Tire n racks de `taille` tuiles uniformément dans le jeu complet,
+    entièrement en NumPy (même loi que les tirages de Pioche, beaucoup plus
+    rapide pour des millions de racks)."""
+    rng = np.random.default_rng(graine)
+    idents = np.argpartition(rng.random((n, NB_TUILES)), taille, axis=1)[:, :taille]
+    codes = idents // NB_COPIES + np.arange(n)[:, None] * NB_TYPES
+    comptes = np.bincount(codes.ravel(), minlength=n * NB_TYPES)
+    return comptes.reshape(n, NB_TYPES).astype(np.int8)
+
+
+# --- Évaluation --------------------------------------------------------
+
+class EvaluationRacks:
+    """
+    Mesures d'un lot de N racks.
+    Attributs (tableaux NumPy) :
+        couleurs_par_valeur (N x 13) : nombre de couleurs distinctes par valeur.
+        groupes_candidats (N x 13, bool) : un groupe de la valeur est
+            réalisable avec les jokers du rack.
+        suites_max (N x 4) : plus longue suite par couleur, sans joker.
+        suites_max_jokers (N x 4) : plus longue suite par couleur en comblant
+            les trous avec les jokers du rack (0 si moins de 3).
+        marge_jokers (N) : jokers du rack moins le nombre minimal de jokers
+            nécessaires pour former une combinaison (négatif : aucune).
+        borne_points (N) : majorant des points de première pose (toutes les
+            tuiles pouvant entrer dans une combinaison, joker compté 13).
+    Méthodes :
+        peut_poser(seuil) : masque des racks dont la borne atteint le seuil.
+    """
+    def __init__(self, comptes):
+        comptes = np.asarray(comptes)
+        n = comptes.shape[0]
+        tuiles = comptes[:, :CODE_JOKER].reshape(n, _NB_COULEURS, NB_VALEURS).astype(np.int16)
+        jokers = np.minimum(comptes[:, CODE_JOKER], 2).astype(np.int16)
+        presentes = (tuiles > 0).astype(np.int16)
+        j3 = jokers[:, None, None]
+
+        # Groupes : une valeur, couleurs distinctes
+        self.couleurs_par_valeur = presentes.sum(axis=1)
+        self.groupes_candidats = (self.couleurs_par_valeur >= 1) & (self.couleurs_par_valeur + jokers[:, None] >= 3)
+
+        # Suites : longueur de la suite se terminant à la valeur courante,
+        # avec 0, 1 ou 2 trous comblés par des jokers. Une tuile présente
+        # prolonge la suite, un trou consomme un joker de plus.
+        fins = [np.zeros((n, _NB_COULEURS), dtype=np.int16) for _ in range(3)]
+        maxima = [np.zeros((n, _NB_COULEURS), dtype=np.int16) for _ in range(3)]
+        for v in range(NB_VALEURS):
+            presente = presentes[:, :, v].astype(bool)
+            fins = [np.where(presente, fins[k] + 1, fins[k - 1] + 1 if k else 0) for k in range(3)]
+            for k in range(3):
+                np.maximum(maxima[k], fins[k], out=maxima[k])
+        self.suites_max = maxima[0]
+        self.suites_max_jokers = np.choose(jokers[:, None], maxima)
+        self.suites_max_jokers[self.suites_max_jokers < 3] = 0
+
+        # Fenêtres de 3 : base des suites et du nombre de jokers manquants
+        fenetres = presentes[:, :, :-2] + presentes[:, :, 1:-1] + presentes[:, :, 2:]
+        manque_suites = np.where(fenetres >= 1, 3 - fenetres, 3).min(axis=(1, 2))
+        manque_groupes = np.where(self.couleurs_par_valeur >= 1,
+                                  np.maximum(3 - self.couleurs_par_valeur, 0), 3).min(axis=1)
+        self.marge_jokers = jokers - np.minimum(manque_suites, manque_groupes)
+
+        # Une tuile peut servir si elle entre dans un groupe réalisable ou
+        # dans une fenêtre de 3 réalisable de sa couleur
+        fenetres_ok = (fenetres >= 1) & (3 - fenetres <= j3)
+        utiles = np.zeros((n, _NB_COULEURS, NB_VALEURS), dtype=bool)
+        for decalage in range(3):
+            utiles[:, :, decalage:decalage + NB_VALEURS - 2] |= fenetres_ok
+        utiles |= self.groupes_candidats[:, None, :]
+        utiles &= presentes.astype(bool)
+        self.borne_points = (tuiles * utiles * _VALEURS).sum(axis=(1, 2))
+        self.borne_points += np.where(self.marge_jokers >= 0, 13 * jokers, 0)
+
+    def peut_poser(self, seuil:int = 30):
+        return self.borne_points >= seuil
+
+    def __len__(self):
+        return len(self.borne_points)
+
+    def __repr__(self):
+        return f"EvaluationRacks(racks={len(self)})"
+
+
+def evaluer_racks(comptes):
+    """Évalue un tableau (N x 53) de comptes de tuiles."""
+    return EvaluationRacks(comptes)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    debut = time.perf_counter()
+    comptes = distribuer(n, graine=0)
+    t_tirage = time.perf_counter() - debut
+    debut = time.perf_counter()
+    evaluation = evaluer_racks(comptes)
+    t_eval = time.perf_counter() - debut
+    print(f"Tirage de {n} racks : {t_tirage:.2f} s, évaluation : {t_eval:.2f} s "
+          f"({n / t_eval / 1e6:.2f} M racks/s)")
+    print(f"Racks pouvant atteindre 30 points (borne) : {evaluation.peut_poser().mean() * 100:.1f} %")
@@ -1,5 +1,15 @@
-from classes import Tuile, Main, Pioche, Plateau, Joueur, Combinaison
-import copy
+from classes import Tuile, Main, Pioche, Plateau, Joueur, Combinaison, melanger_empreinte, MASQUE_64
+def _valeur_rack(rack):
+    """Valeur des tuiles restant dans un rack (joker = 25)."""
+    total = 0
+    for t in rack.tuiles:
+        if getattr(t, 'is_joker', False):
+            total += 25
+        else:
+            total += getattr(t, 'valeur', 0)
+    return total
+
+
 class Jeu:
     """
     Gère la logique principale d'une partie de Rummikub (console).
@@ -10,31 +20,59 @@ class Jeu:
         joueurs (list[Joueur]): Liste des joueurs.
         tour (int): Index du tour courant.
         partie_terminee (bool): Indique si la partie est finie.
+        gagnant (Joueur | None): Joueur ayant vidé son rack (ou, partie bloquée, celui
+            dont le rack vaut le moins), une fois la partie finie.
+        verbeux (bool): Affiche les messages de la partie (False pour les simulations).
+        journal (Journal | None): Journal où chaque action est enregistrée (voir journal.py).
 
     Méthodes principales :
         afficher_etat() : Affiche l'état du jeu.
-        poser_combinaison(joueur) : Pose une combinaison.
+        poser_combinaison(joueur) : Pose une combinaison (saisie console).
+        poser_tuiles(joueur, pos_list, rack_list) : Pose une combinaison sans saisie.
+        reorganiser_plateau(joueur, combinaisons) : Remplace tout le plateau.
+        manipuler_plateau(joueur, action, **kwargs) : Manipulation annulée si le plateau devient invalide.
         tirer_tuile(joueur) : Tire une tuile pour un joueur.
         passer_tour() : Passe au joueur suivant.
+        terminer_tour() : Fin de tour complète (passer_tour, verifier_fin, tour suivant).
         verifier_fin() : Vérifie la fin de partie et calcule les scores.
+        terminer_partie_bloquee() : Termine une partie bloquée et calcule les scores.
+        empreinte() : Empreinte de Zobrist de l'état, pour les tables de transposition.
         jouer() : Boucle principale du jeu console.
     """
-    def __init__(self, n_joueurs: int = 1):
+    def __init__(self, n_joueurs: int = 1, distribuer: bool = True, verbeux: bool = True,
+                 graine: int = None, pioche: Pioche = None, journal = None):
         """Initialise une partie avec n_joueurs (par défaut 1).
 
-        Chaque joueur reçoit 14 tuiles au départ.
+        Chaque joueur reçoit 14 tuiles au départ (sauf si distribuer=False,
+        utilisé pour reconstruire une partie à partir d'un état existant).
+        graine : graine du mélange de la pioche (partie reproductible).
+        pioche : pioche déjà constituée, utilisée à la place d'une nouvelle.
+        journal : journal des actions ; l'état initial y est écrit après la
+            distribution.
         """
-        self.pioche = Pioche()
+        self.pioche = Pioche(graine) if pioche is None else pioche
         self.plateau = Plateau()
         # Crée la liste de joueurs
         self.joueurs = [Joueur(f"Joueur {i+1}") for i in range(max(1, int(n_joueurs)))]
         self.tour = 0
         self.partie_terminee = False
+        self.gagnant = None
+        self.verbeux = verbeux
+        self.journal = journal
 
         # Distribution initiale : 14 tuiles par joueur
-        for _ in range(14):
+        for _ in range(14 if distribuer else 0):
             for j in self.joueurs:
                 j.piocher(self.pioche)
+        self._noter('debut_partie', self)
+
+    def _afficher(self, *message):
+        if self.verbeux:
+            print(*message)
+
+    def _noter(self, evenement, *args):
+        if self.journal is not None:
+            getattr(self.journal, evenement)(*args)
 
     def afficher_etat(self):
         print("\n===== ÉTAT DU JEU =====")
@@ -81,117 +119,230 @@ class Jeu:
                     if idx < 0 or idx >= len(joueur.rack.tuiles):
                         raise IndexError(f"Index de rack invalide: {idx}")
 
-            tuiles_plateau = [self.plateau.mains[i].tuiles[j] for (i,j) in pos_list]
-            tuiles_rack = [joueur.rack.tuiles[idx] for idx in rack_list]
-            tuiles = tuiles_plateau + tuiles_rack
-            if not tuiles:
+            if not pos_list and not rack_list:
                 print("Aucune tuile sélectionnée.")
                 return
-            comb = Combinaison(tuiles)
-            if comb.est_valide():
-                # Calcul des points apportés par les tuiles prises dans le rack
-                comb_rack = Combinaison(tuiles_rack) if tuiles_rack else None
-                points_rack = comb_rack.points(context='initial') if comb_rack else 0
-
-                # Si c'est la première modification liée au rack ce tour, on sauvegarde l'état
-                if comb_rack and not getattr(joueur, 'has_melded', False) and not getattr(joueur, 'temp_meld_points', 0):
-                    joueur._backup_plateau = copy.deepcopy(self.plateau.mains)
-                    joueur._backup_rack = list(joueur.rack.tuiles)
-                    joueur._placed_this_turn = True
-
-                # Retirer d'abord les tuiles du plateau (attention à l'ordre)
-                for i,j in sorted(pos_list, reverse=True):
-                    self.plateau.retirer_tuile(i, j)
-                # Retirer les tuiles du rack
-                for idx in sorted(rack_list, reverse=True):
-                    joueur.rack.retirer(joueur.rack.tuiles[idx])
-                self.plateau.ajouter(comb)
-                # Accumuler les points temp pour la première pose, ou ajouter directement si already melded
-                if points_rack > 0:
-                    if getattr(joueur, 'has_melded', False):
-                        joueur.points = getattr(joueur, 'points', 0) + points_rack
-                    else:
-                        joueur.temp_meld_points = getattr(joueur, 'temp_meld_points', 0) + points_rack
+            if self.poser_tuiles(joueur, pos_list, rack_list):
                 print(" Combinaison posée !")
             else:
                 print(" Combinaison invalide (selon les tuiles sélectionnées).")
         except Exception as e:
             print("Erreur :", e)
 
+    def _compter_points_rack(self, joueur, tuiles_rack):
+        """Points apportés par des tuiles du rack : accumulés pour la première
+        pose, ajoutés directement si le joueur a déjà posé."""
+        points_rack = (Combinaison(tuiles_rack).points(context='initial') or 0) if tuiles_rack else 0
+        if points_rack > 0:
+            if getattr(joueur, 'has_melded', False):
+                joueur.points = getattr(joueur, 'points', 0) + points_rack
+            else:
+                joueur.temp_meld_points = getattr(joueur, 'temp_meld_points', 0) + points_rack
+
+    def poser_tuiles(self, joueur, pos_list, rack_list):
+        """Pose une combinaison formée des tuiles du plateau aux positions
+        `pos_list` ((combinaison, tuile)) et des tuiles du rack d'indices
+        `rack_list`. Retourne False (sans rien modifier) si elle est invalide.
+        """
+        tuiles_plateau = [self.plateau.mains[i].tuiles[j] for (i,j) in pos_list]
+        tuiles_rack = [joueur.rack.tuiles[idx] for idx in rack_list]
+        comb = Combinaison(tuiles_plateau + tuiles_rack)
+        if not comb.est_valide():
+            return False
+        # Si c'est la première modification liée au rack ce tour, on ouvre une transaction
+        if tuiles_rack and not getattr(joueur, 'has_melded', False):
+            joueur.debut_premiere_pose(self.plateau)
+
+        # Retirer d'abord les tuiles du plateau (attention à l'ordre)
+        for i,j in sorted(pos_list, reverse=True):
+            self.plateau.retirer_tuile(i, j)
+        # Retirer les tuiles du rack
+        for idx in sorted(rack_list, reverse=True):
+            joueur.rack.retirer(joueur.rack.tuiles[idx])
+        self.plateau.ajouter(comb)
+        self._compter_points_rack(joueur, tuiles_rack)
+        self._noter('pose', self.joueurs.index(joueur), pos_list, rack_list)
+        return True
+
+    def reorganiser_plateau(self, joueur, combinaisons):
+        """Remplace tout le plateau par `combinaisons` (par exemple une
+        Solution du solveur). Les tuiles qui ne viennent pas du plateau sont
+        prises dans le rack du joueur ; les points de chaque combinaison sont
+        comptés sur ses seules tuiles du rack.
+
+        Retourne False (sans rien modifier) si le nouveau plateau est invalide,
+        omet des tuiles du plateau, ou utilise des tuiles absentes du rack.
+        """
+        sur_plateau = {t.ident for m in self.plateau.mains for t in m.tuiles}
+        dans_rack = {t.ident for t in joueur.rack.tuiles}
+        nouvelles = [t.ident for c in combinaisons for t in c.tuiles]
+        du_rack = [i for i in nouvelles if i not in sur_plateau]
+        if (len(set(nouvelles)) != len(nouvelles) or not sur_plateau <= set(nouvelles)
+                or not set(du_rack) <= dans_rack):
+            return False
+        if not all(c.est_valide() for c in combinaisons):
+            return False
+        if du_rack and not getattr(joueur, 'has_melded', False):
+            joueur.debut_premiere_pose(self.plateau)
+        self.plateau.mains = [Combinaison(c.tuiles) for c in combinaisons]
+        du_rack = set(du_rack)
+        for t in [t for t in joueur.rack.tuiles if t.ident in du_rack]:
+            joueur.rack.retirer(t)
+        for c in combinaisons:
+            self._compter_points_rack(joueur, [t for t in c.tuiles if t.ident not in sur_plateau])
+        self._noter('reorganisation', self.joueurs.index(joueur), combinaisons)
+        return True
+
+    def manipuler_plateau(self, joueur, action:str, **kwargs):
+        """Applique une manipulation du plateau ('deplacer', 'deplacer_mult',
+        'fusionner', 'split' ou 'reutiliser') dans une transaction, annulée
+        si le plateau devient invalide.
+
+        Retourne 'annulee' (plateau invalide, rien n'a changé), 'appliquee'
+        ou 'echec' (la manipulation n'a rien fait ou a levé une erreur, le
+        plateau restant valide).
+        """
+        self.plateau.debut_transaction()
+        try:
+            if action == 'deplacer_mult':
+                ok = self.plateau.deplacer_tuiles(kwargs.get('sources'), kwargs.get('dest'), kwargs.get('pos_dest'))
+            else:
+                ok = joueur.manipuler_plateau(self.plateau, action, **kwargs)
+        except Exception as e:
+            self._afficher("Erreur lors de la manipulation :", e)
+            ok = False
+        if not self.plateau.est_valide_plateau():
+            self.plateau.annuler_transaction()
+            issue = 'annulee'
+        else:
+            self.plateau.valider_transaction()
+            issue = 'appliquee' if ok else 'echec'
+        self._noter('manipulation', self.joueurs.index(joueur), action, kwargs, issue)
+        return issue
+
+    def empreinte(self):
+        """Empreinte de l'état de la partie : plateau, rack de chaque place,
+        premières poses faites, joueur courant et taille de la pioche.
+
+        Calculée en O(nombre de joueurs) à partir des empreintes que Plateau
+        et Rack tiennent à jour ; deux positions identiques à l'ordre près
+        des combinaisons et des tuiles ont la même empreinte.
+        """
+        h = self.plateau.empreinte()
+        for k, j in enumerate(self.joueurs):
+            h += melanger_empreinte((j.rack.empreinte() + 2 * k + bool(j.has_melded) + 1) & MASQUE_64)
+        h += melanger_empreinte((len(self.pioche) << 8 | self.tour % len(self.joueurs)) + 1)
+        return h & MASQUE_64
+
     def tirer_tuile(self, joueur):
         if getattr(joueur, 'has_drawn', False):
-            print(f"{joueur.nom} a déjà tiré ce tour.")
+            self._afficher(f"{joueur.nom} a déjà tiré ce tour.")
             return
         t = joueur.tirer_tuile(self.pioche)
         if t:
             joueur.has_drawn = True
-            print(f"{joueur.nom} a tiré {t}")
+            self._noter('tirage', self.joueurs.index(joueur), t)
+            self._afficher(f"{joueur.nom} a tiré {t}")
         else:
-            print("La pioche est vide.")
+            self._afficher("La pioche est vide.")
 
     def passer_tour(self):
+        """Termine le tour du joueur courant : valide sa première pose si
+        elle atteint 30 points, l'annule sinon. Retourne l'issue : 'rien',
+        'validee' ou 'annulee'."""
         # Valider ou annuler l'initial meld si nécessaire pour le joueur courant
         current = self.joueurs[self.tour % len(self.joueurs)]
+        issue = 'rien'
         if not getattr(current, 'has_melded', False):
             temp = getattr(current, 'temp_meld_points', 0)
-            if temp > 0 and temp < 30:
-                # rollback
-                if getattr(current, '_backup_plateau', None) is not None:
-                    self.plateau.mains = current._backup_plateau
-                if getattr(current, '_backup_rack', None) is not None:
-                    current.rack.tuiles = current._backup_rack
-                current.temp_meld_points = 0
-                current._backup_plateau = None
-                current._backup_rack = None
-                current._placed_this_turn = False
-                print("Première pose non atteinte (moins de 30 pts) : mouvements annulés.")
-            elif temp >= 30:
+            if temp >= 30:
                 current.points = getattr(current, 'points', 0) + temp
                 current.has_melded = True
                 current.temp_meld_points = 0
-                current._backup_plateau = None
-                current._backup_rack = None
-                current._placed_this_turn = False
+                current.fin_premiere_pose(self.plateau, valider=True)
+                issue = 'validee'
+            elif temp > 0 or current.premiere_pose_en_cours:
+                # rollback, y compris d'une pose à 0 point (un joker seul
+                # ajouté au plateau, par exemple)
+                current.fin_premiere_pose(self.plateau, valider=False)
+                current.temp_meld_points = 0
+                issue = 'annulee'
+                self._afficher("Première pose non atteinte (moins de 30 pts) : mouvements annulés.")
+        else:
+            # Première pose déjà faite : rien à annuler, on referme une
+            # éventuelle transaction
+            current.fin_premiere_pose(self.plateau, valider=True)
         # Reset draw flag
         current.has_drawn = False
-        print("Tour passé.")
+        self._noter('fin_tour', self.joueurs.index(current), issue)
+        self._afficher("Tour passé.")
+        return issue
+
+    def tour_suivant(self):
+        self.tour += 1
+        self._noter('tour_suivant', self.tour)
+
+    def terminer_tour(self):
+        """Fin de tour sans saisie : valide ou annule la première pose, vérifie
+        la fin de partie et passe au joueur suivant."""
+        self.passer_tour()
+        self.verifier_fin()
+        self.tour_suivant()
 
     def verifier_fin(self):
         # Vérifie si un joueur a vidé son rack. Si oui, calcule les points finaux
         for winner in self.joueurs:
             if len(winner.rack.tuiles) == 0:
-                # Calcul des points restants pour chaque joueur
-                def somme_tuiles(rack):
-                    total = 0
-                    for t in rack.tuiles:
-                        if getattr(t, 'is_joker', False):
-                            total += 25
-                        else:
-                            total += getattr(t, 'valeur', 0)
-                    return total
-
-                totals = {p: somme_tuiles(p.rack) for p in self.joueurs}
-                total_others = sum(v for p, v in totals.items() if p is not winner)
-
-                # Le gagnant gagne la somme des points restants des autres joueurs
-                winner.points = getattr(winner, 'points', 0) + total_others
-                # Les autres perdent leurs points restants
-                for p, val in totals.items():
-                    if p is not winner:
-                        p.points = getattr(p, 'points', 0) - val
-
-                print(f"{winner.nom} a gagné la partie !")
-                print("--- Score final ---")
-                for p in self.joueurs:
-                    print(f"{p.nom} : {getattr(p, 'points', 0)} pts (tuiles restantes valeur: {totals[p]})")
-                self.partie_terminee = True
+                self._afficher(f"{winner.nom} a gagné la partie !")
+                self._compter_fin(winner)
                 return
 
+    def terminer_partie_bloquee(self):
+        """Termine une partie bloquée (pioche vide, plus aucune pose) : le
+        joueur dont le rack vaut le moins de points gagne. Les points sont
+        comptés comme dans verifier_fin, le gagnant retranchant en plus la
+        valeur de son propre rack."""
+        winner = min(self.joueurs, key=lambda p: _valeur_rack(p.rack))
+        self._afficher(f"Partie bloquée : {winner.nom} gagne avec le rack le plus faible.")
+        self._compter_fin(winner)
+
+    def _compter_fin(self, winner):
+        """Points finaux, le gagnant étant désigné ; termine la partie."""
+        # Calcul des points restants pour chaque joueur
+        totals = {p: _valeur_rack(p.rack) for p in self.joueurs}
+        total_others = sum(v for p, v in totals.items() if p is not winner)
+
+        # Le gagnant gagne la somme des points restants des autres joueurs
+        # (moins les siens, nuls s'il a vidé son rack)
+        winner.points = getattr(winner, 'points', 0) + total_others - totals[winner]
+        # Les autres perdent leurs points restants
+        for p, val in totals.items():
+            if p is not winner:
+                p.points = getattr(p, 'points', 0) - val
+
+        self._afficher("--- Score final ---")
+        for p in self.joueurs:
+            self._afficher(f"{p.nom} : {getattr(p, 'points', 0)} pts (tuiles restantes valeur: {totals[p]})")
+        self.partie_terminee = True
+        self.gagnant = winner
+        self._noter('fin_partie', self.joueurs.index(winner))
+
     def jouer(self):
         print("=== Début du jeu Rummikub ===")
+        automatiques = all(hasattr(j, 'jouer_tour') for j in self.joueurs)
+        sans_pose = 0
         while not self.partie_terminee:
             joueur = self.joueurs[self.tour % len(self.joueurs)]
             print(f"\n----- Tour de {joueur.nom} -----")
+            if hasattr(joueur, 'jouer_tour'):
+                # Joueur automatique (ia.JoueurIA) : pas de saisie
+                avant = len(joueur.rack.tuiles)
+                joueur.jouer_tour(self)
+                self.terminer_tour()
+                sans_pose = sans_pose + 1 if len(joueur.rack.tuiles) >= avant and not len(self.pioche) else 0
+                if automatiques and sans_pose >= len(self.joueurs) and not self.partie_terminee:
+                    self.terminer_partie_bloquee()
+                continue
             self.afficher_etat()
 
             choix = input("Choisis une action (p=poser, t=tirer, m=manipuler plateau, s=sauter, q=quitter) : ").lower()
@@ -203,12 +354,12 @@ class Jeu:
                 self.tirer_tuile(joueur)
                 # passer au tour suivant immédiatement
                 self.verifier_fin()
-                self.tour += 1
+                self.tour_suivant()
                 continue
             elif choix == "m":
                 sub = input("Action plateau (deplacer/fusionner/split) : ").lower().strip()
 
-                backup = copy.deepcopy(self.plateau.mains)
+                kwargs = None
                 try:
                     if sub == 'deplacer':
                         src = input("Source (ex 0:1) : ")
@@ -216,7 +367,7 @@ class Jeu:
                         dest = int(input("Index combinaison destination : "))
                         pos_dest_str = input("Position d'insertion destination (optionnel, vide pour fin) : ").strip()
                         pos_dest = int(pos_dest_str) if pos_dest_str != "" else None
-                        ok = joueur.manipuler_plateau(self.plateau, 'deplacer', index_src=i, index_tuile=j, index_dest=dest, pos_dest=pos_dest)
+                        kwargs = dict(index_src=i, index_tuile=j, index_dest=dest, pos_dest=pos_dest)
                     elif sub == 'deplacer_mult':
                         # sources multiples ex: 0:1,1:2
                         sources_str = input("Sources (ex: 0:1,1:2) : ").strip()
@@ -225,40 +376,31 @@ class Jeu:
                         dest = int(input("Index combinaison destination : "))
                         pos_dest_str = input("Position d'insertion destination (optionnel, vide pour fin) : ").strip()
                         pos_dest = int(pos_dest_str) if pos_dest_str != "" else None
-                        # backup
-                        backup = copy.deepcopy(self.plateau.mains)
-                        ok = self.plateau.deplacer_tuiles(sources, dest, pos_dest)
-                        if not self.plateau.est_valide_plateau():
-                            print(" Déplacement annulé : le plateau serait invalide. Restauration de l'état précédent.")
-                            self.plateau.mains = backup
-                            ok = False
+                        kwargs = dict(sources=sources, dest=dest, pos_dest=pos_dest)
                     elif sub == 'fusionner':
                         a = int(input("Index 1 : "))
                         b = int(input("Index 2 : "))
-                        ok = joueur.manipuler_plateau(self.plateau, 'fusionner', index1=a, index2=b)
+                        kwargs = dict(index1=a, index2=b)
                     elif sub == 'split':
                         idx = int(input("Index combinaison à splitter : "))
                         pos = int(input("Position de split (index de tuile) : "))
-                        ok = joueur.manipuler_plateau(self.plateau, 'split', index=idx, split_pos=pos)
+                        kwargs = dict(index=idx, split_pos=pos)
                     elif sub == 'reutiliser':
                         indices_str = input("Indices des tuiles à réutiliser (ex: 0:1,1:2) : ")
                         parts = [p.strip() for p in indices_str.split(",") if p.strip()]
                         indices = [(int(i), int(j)) for i,j in (part.split(":") for part in parts)]
-                        ok = joueur.manipuler_plateau(self.plateau, 'reutiliser', indices=indices)
+                        kwargs = dict(indices=indices)
                     else:
                         print("Action non reconnue.")
-                        ok = False
                 except Exception as e:
                     print("Erreur lors de la manipulation :", e)
-                    ok = False
-                if not self.plateau.est_valide_plateau():
+                issue = self.manipuler_plateau(joueur, sub, **kwargs) if kwargs is not None else 'echec'
+                if issue == 'annulee':
                     print(" Manipulation annulée : le plateau serait invalide. Restauration de l'état précédent.")
-                    self.plateau.mains = backup
+                elif issue == 'appliquee':
+                    print(" Manipulation appliquée.")
                 else:
-                    if ok:
-                        print(" Manipulation appliquée.")
-                    else:
-                        print("La manipulation a échoué.")
+                    print("La manipulation a échoué.")
             elif choix == "s":
                 self.passer_tour()
             elif choix == "q":
@@ -268,5 +410,5 @@ class Jeu:
                 print("Choix invalide.")
 
             self.verifier_fin()
-            self.tour += 1
+            self.tour_suivant()
         print("=== Fin du jeu ===")
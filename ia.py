@@ -0,0 +1,290 @@
+"""
+Joueur automatique par recherche arborescente Monte Carlo (MCTS), sous
+budget de temps.
+
+Les coups candidats du tour (tirer, ou poser selon la première pose
+optimale, le solveur et les premiers coups de coups.generer_coups) forment
+la racine de l'arbre. Chaque itération choisit un candidat par UCB1, tire un
+monde compatible avec ce que le joueur sait (echantillonnage.py), y joue le
+candidat, puis déroule la suite de la partie sur quelques tours avec une
+politique rapide, et note la position obtenue. Les tuiles adverses étant
+cachées, l'arbre s'arrête à la décision du joueur : les tours suivants
+dépendent du monde tiré.
+
+La recherche est répartie sur un pool de processus (parallélisation à la
+racine : chaque processus mène sa propre recherche jusqu'à l'échéance, les
+statistiques sont ensuite fusionnées). Le coup retenu est le plus visité ;
+si aucune itération n'a pu se faire dans le budget, c'est le premier
+candidat (meilleure pose connue, sinon tirer).
+
+Utilisation :
+    jeu = Jeu(3)
+    JoueurIA.remplacer(jeu, 2, budget=0.2)   # le joueur 3 devient automatique
+    jeu.jouer()
+"""
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from classes import Joueur, Combinaison, tuiles_depuis_idents
+from coups import generer_coups
+from premiere_pose import meilleure_premiere_pose
+from sauvegarde import sauvegarder, charger
+from simulation import PolitiqueGloutonne, jouer_tour
+from solveur import resoudre
+
+_POOLS = {}
+# Coups qui posent au moins une tuile du rack (voir coups.TYPES_COUPS)
+_TYPES_AVEC_RACK = ('ajouter', 'poser', 'scinder_ajouter', 'poser_avec_plateau', 'remplacer_joker')
+
+
+def _pool(processus:int):
+    """Pool de processus partagé par tous les joueurs automatiques (un par
+    nombre de processus), créé à la première utilisation. Hors du fil
+    principal, les processus sont lancés par 'spawn' : dupliquer (fork) un
+    processus qui a plusieurs fils n'est pas sûr."""
+    if processus not in _POOLS:
+        contexte = None
+        if threading.current_thread() is not threading.main_thread():
+            contexte = multiprocessing.get_context('spawn')
+        _POOLS[processus] = ProcessPoolExecutor(max_workers=processus, mp_context=contexte)
+    return _POOLS[processus]
+
+
+class _Echeance(Exception):
+    """Levée pour interrompre le solveur quand le budget est épuisé."""
+
+
+def _idents_plateau(combinaisons):
+    return [[t.ident for t in c.tuiles] for c in combinaisons]
+
+
+def _appliquer_action(jeu, joueur, action):
+    """Joue une action candidate : None pour tirer (ou passer si la pioche
+    est vide), sinon le plateau complet voulu (listes d'identifiants)."""
+    if action is None:
+        if len(jeu.pioche):
+            jeu.tirer_tuile(joueur)
+        return True
+    return jeu.reorganiser_plateau(joueur, [Combinaison(tuiles_depuis_idents(c)) for c in action])
+
+
+def _evaluer(jeu, observateur:int):
+    """Note de la position pour l'observateur, entre 0 et 1 : 1 s'il a gagné,
+    0 si un autre a gagné, sinon selon son avance en nombre de tuiles sur la
+    moyenne des adversaires."""
+    if jeu.gagnant is not None:
+        return 1.0 if jeu.gagnant is jeu.joueurs[observateur] else 0.0
+    propres = len(jeu.joueurs[observateur].rack.tuiles)
+    adverses = [len(j.rack.tuiles) for k, j in enumerate(jeu.joueurs) if k != observateur]
+    return 0.5 + 0.5 * math.tanh((sum(adverses) / len(adverses) - propres) / 4)
+
+
+def _explorer(sauvegarde:bytes, observateur:int, actions:list, echeance:float, graine:int,
+              horizon:int, exploration:float):
+    """Recherche MCTS (UCB1 sur les actions de la racine) jusqu'à
+    l'échéance (time.monotonic). S'exécute dans un processus du pool.
+
+    Retourne (visites, gains) par action.
+    """
+    # Import local : NumPy n'est nécessaire qu'aux joueurs automatiques, pas
+    # aux modules qui importent ia (main_console, interface)
+    from echantillonnage import Echantillonneur
+    jeu = charger(sauvegarde, verbeux=False)
+    echantillonneur = Echantillonneur.depuis_jeu(jeu, observateur, graine=graine)
+    politique = PolitiqueGloutonne()
+    rng = random.Random(graine)
+    visites = [0] * len(actions)
+    gains = [0.0] * len(actions)
+    mondes, suivant = None, 0
+    total = 0
+    while time.monotonic() < echeance:
+        non_visitees = [a for a, v in enumerate(visites) if not v]
+        if non_visitees:
+            a = rng.choice(non_visitees)
+        else:
+            log_total = math.log(total)
+            a = max(range(len(actions)), key=lambda k: gains[k] / visites[k]
+                    + exploration * math.sqrt(log_total / visites[k]))
+        if mondes is None or suivant == len(mondes):
+            mondes, suivant = echantillonneur.tirer(64), 0
+        monde = echantillonneur.determiniser(jeu, mondes, suivant)
+        suivant += 1
+        monde.tour = observateur
+        if _appliquer_action(monde, monde.joueurs[observateur], actions[a]):
+            monde.terminer_tour()
+            for _ in range(horizon * len(monde.joueurs) - 1):
+                if monde.partie_terminee or not jouer_tour(monde, politique):
+                    break
+            gain = _evaluer(monde, observateur)
+        else:
+            gain = 0.0
+        visites[a] += 1
+        gains[a] += gain
+        total += 1
+    return visites, gains
+
+
+class JoueurIA(Joueur):
+    """
+    Joueur automatique (MCTS sous budget de temps). Hérite de Joueur.
+    Attributs :
+        budget (float) : temps de réflexion par tour, en secondes.
+        processus (int) : taille du pool de processus (0 : recherche dans le
+            processus courant).
+        horizon (int) : nombre de tours de table simulés après le coup.
+        max_coups (int) : nombre maximal de coups candidats à la racine.
+        exploration (float) : constante d'exploration d'UCB1.
+        graine (int | None) : graine des tirages de mondes.
+        statistiques (list | None) : (action, visites, gain moyen) de la
+            dernière recherche (None pendant une recherche, ou si elle
+            n'avait qu'une action possible).
+    Méthodes :
+        remplacer, demarrer, candidats, reflechir, appliquer, jouer_tour
+    """
+    def __init__(self, nom:str, budget:float = 0.2, processus:int = None, horizon:int = 2,
+                 max_coups:int = 12, exploration:float = 0.7, graine:int = None):
+        super().__init__(nom)
+        self.budget = budget
+        self.processus = (os.cpu_count() or 1) if processus is None else processus
+        self.horizon = horizon
+        self.max_coups = max_coups
+        self.exploration = exploration
+        self.graine = graine
+        self.statistiques = None
+        self._recherches = 0
+
+    @classmethod
+    def remplacer(cls, jeu, index:int, **options):
+        """Remplace le joueur `index` de jeu par un JoueurIA qui reprend son
+        nom, son rack et son score. Retourne le nouveau joueur."""
+        ancien = jeu.joueurs[index]
+        ia = cls(ancien.nom, **options)
+        for attribut in ('rack', 'points', 'has_melded', 'has_drawn', 'temp_meld_points'):
+            setattr(ia, attribut, getattr(ancien, attribut))
+        jeu.joueurs[index] = ia
+        return ia
+
+    def demarrer(self):
+        """Crée dès maintenant le pool de processus du joueur. À appeler
+        depuis le fil principal quand reflechir sera appelé depuis un autre
+        fil (interface graphique). Les processus sont lancés tout de suite :
+        le pool ne les crée sinon qu'au premier envoi de tâche, dans le fil
+        qui l'envoie."""
+        if self.processus:
+            pool = _pool(self.processus)
+            for tache in [pool.submit(os.getpid) for _ in range(self.processus)]:
+                tache.result()
+
+    def candidats(self, jeu, echeance:float = None, observateur:int = None):
+        """Actions candidates du tour : des plateaux complets, la meilleure
+        pose connue en premier, puis tirer (None). Le solveur et
+        l'énumération des coups s'arrêtent à `echeance` (time.monotonic) ;
+        le solveur interrompu propose sa solution approchée (resoudre, repli).
+        observateur : place du joueur dans jeu (par défaut, celle de self)."""
+        joueur = self if observateur is None else jeu.joueurs[observateur]
+        if not joueur.has_melded:
+            solution = meilleure_premiere_pose(joueur.rack)
+            if solution is None:
+                return [None]
+            return [_idents_plateau(jeu.plateau.mains) + _idents_plateau(solution.combinaisons), None]
+
+        def annulation():
+            if echeance is not None and time.monotonic() > echeance:
+                raise _Echeance
+        actions = []
+        try:
+            solution = resoudre(jeu.plateau, joueur.rack, annulation=annulation, repli=True)
+            if solution is not None and solution.tuiles_posees:
+                actions.append(_idents_plateau(solution.combinaisons))
+            for coup in islice(generer_coups(jeu.plateau, joueur.rack, types=_TYPES_AVEC_RACK), self.max_coups):
+                actions.append([[t.ident for t in c] for c in coup.combinaisons])
+                annulation()
+        except _Echeance:
+            pass
+        return actions + [None]
+
+    def reflechir(self, jeu, observateur:int = None):
+        """Lance la recherche du coup sans bloquer : retourne un Future dont
+        le résultat est l'action choisie (voir appliquer), disponible au
+        plus tard après le budget de temps (plus la mise en route du pool au
+        premier appel).
+
+        jeu peut être une copie de la partie (par exemple chargée depuis une
+        sauvegarde) : observateur donne alors la place du joueur.
+
+        reflechir modifie le joueur (statistiques, compteur de recherches)
+        dans le fil qui l'appelle, puis dans celui qui termine la recherche :
+        avec l'interface (taches.reflexion), un fil du QThreadPool. Le coup
+        choisi ne dépend que de cette recherche ; self.statistiques n'est à
+        lire qu'une fois le Future terminé.
+        """
+        self.statistiques = None
+        echeance = time.monotonic() + self.budget
+        if observateur is None:
+            observateur = jeu.joueurs.index(self)
+        # La recherche des candidats n'a droit qu'à la moitié du budget
+        actions = self.candidats(jeu, echeance - self.budget / 2, observateur)
+        self._recherches += 1
+        graine = None if self.graine is None else self.graine * 1_000_003 + self._recherches
+        parametres = (sauvegarder(jeu), observateur, actions, echeance)
+        options = (self.horizon, self.exploration)
+        resultat = Future()
+        if len(actions) == 1 or self.processus == 0:
+            statistiques = None
+            if len(actions) > 1:
+                statistiques = self._conclure(actions, [_explorer(*parametres, graine, *options)])
+            resultat.set_result(self._choisir(actions, statistiques))
+            return resultat
+        recherches = [_pool(self.processus).submit(_explorer, *parametres,
+                                                   None if graine is None else graine + k, *options)
+                      for k in range(self.processus)]
+
+        def terminee(_):
+            if all(r.done() for r in recherches) and not resultat.done():
+                statistiques = self._conclure(actions, [r.result() for r in recherches if not r.exception()])
+                resultat.set_result(self._choisir(actions, statistiques))
+        for r in recherches:
+            r.add_done_callback(terminee)
+        return resultat
+
+    def _conclure(self, actions, resultats):
+        """Statistiques des recherches sur `actions`, gardées aussi dans
+        self.statistiques."""
+        visites = [sum(r[0][a] for r in resultats) for a in range(len(actions))]
+        gains = [sum(r[1][a] for r in resultats) for a in range(len(actions))]
+        statistiques = [(actions[a], visites[a], gains[a] / visites[a] if visites[a] else 0.0)
+                        for a in range(len(actions))]
+        self.statistiques = statistiques
+        return statistiques
+
+    @staticmethod
+    def _choisir(actions, statistiques):
+        if not statistiques:
+            return actions[0]
+        meilleure = max(range(len(actions)), key=lambda a: (statistiques[a][1], -a))
+        return actions[meilleure] if statistiques[meilleure][1] else actions[0]
+
+    def appliquer(self, jeu, action):
+        """Joue l'action choisie sur le vrai jeu : tirage (None) ou nouveau
+        plateau. La fin du tour reste à la charge de l'appelant."""
+        if action is None:
+            jeu.tirer_tuile(self)
+            return
+        if not _appliquer_action(jeu, self, action):
+            # Coup devenu impossible : on tire à la place
+            jeu.tirer_tuile(self)
+
+    def jouer_tour(self, jeu):
+        """Réfléchit (en bloquant jusqu'au budget) puis joue le coup choisi."""
+        action = self.reflechir(jeu).result()
+        self.appliquer(jeu, action)
+        if action is not None:
+            jeu._afficher(f"{self.nom} a joué : {len(self.rack.tuiles)} tuiles restantes.")
+
+    def __repr__(self):
+        return f"JoueurIA(nom={self.nom}, budget={self.budget}, processus={self.processus})"
@@ -1,9 +1,56 @@
 import sys
+from collections import Counter
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QMessageBox, QGridLayout, QFrame)
 from PyQt5.QtCore import Qt
 from classes import Joueur
 from game import Jeu
-import copy
+from ia import JoueurIA
+from sauvegarde import sauvegarder
+from taches import Taches, copier_plateau, copier_rack, meilleur_coup, reflexion, valider_combinaisons
+
+COULEURS_QT = {'rouge': 'red', 'bleu': 'blue', 'noir': 'black', 'jaune': 'orange'}
+
+
+class BoutonTuile(QPushButton):
+    """
+    Bouton d'une tuile (plateau ou rack), réutilisable d'un affichage à
+    l'autre.
+    Attributs :
+        code (int | None) : type de tuile affiché (le style n'en dépend que).
+        zone (str) : 'plateau' ou 'rack'.
+        position : (combinaison, tuile) sur le plateau, indice dans le rack.
+        coche (bool) : tuile sélectionnée.
+        suggeree (bool) : tuile mise en évidence par la suggestion de coup.
+    """
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setCheckable(True)
+        self.code = None
+        self.zone = None
+        self.position = None
+        self.coche = False
+        self.suggeree = False
+
+    def afficher(self, tuile, zone:str, position, coche:bool, suggeree:bool = False):
+        """Met le bouton à jour, sans toucher à ce qui n'a pas changé."""
+        if tuile.code != self.code or suggeree != self.suggeree:
+            self.code = tuile.code
+            self.suggeree = suggeree
+            if tuile.is_joker:
+                self.setText('J')
+                color = 'magenta'
+            else:
+                self.setText(str(tuile.valeur))
+                color = COULEURS_QT.get(tuile.couleur, 'grey')
+            bordure = " border: 3px solid gold;" if suggeree else ""
+            self.setStyleSheet(f"color: {color}; font-weight: bold; font-size: 18px; margin:2px;{bordure}")
+        if (zone, position) != (self.zone, self.position):
+            self.zone, self.position = zone, position
+            self.setToolTip(f"Plateau {position[0]}:{position[1]}" if zone == 'plateau' else f"Rack {position}")
+        if coche != self.coche or coche != self.isChecked():
+            self.coche = coche
+            self.setChecked(coche)
+
 
 class RummikubInterface(QWidget):
     """
@@ -18,11 +65,23 @@ class RummikubInterface(QWidget):
 
     Méthodes principales :
         init_ui() : Construit l'UI.
-        refresh() : Met à jour l'affichage.
+        refresh() : Met à jour l'affichage (rendre_plateau, rendre_rack :
+            seules les lignes et les cases signalées modifiées par le
+            plateau et les racks sont redessinées).
         poser_combinaison() : Pose une combinaison sur le plateau.
         deplacer_selection() : Déplace des tuiles sélectionnées.
         retirer_selection() : Retire des tuiles du plateau vers le rack.
-        passer_tour() : Passe au joueur suivant.
+        passer_tour() : Passe au joueur suivant, ou termine la partie.
+        afficher_fin() : Affiche les scores finaux.
+        lancer_ia() : Fait jouer le joueur courant s'il est automatique.
+        verifier_plateau() : Vérifie le plateau en arrière-plan.
+        suggerer_coup() : Met en évidence le meilleur coup du joueur courant.
+
+    Les calculs longs (réflexion des joueurs automatiques, vérification du
+    plateau, suggestion de coup) passent par self.taches (taches.py) : ils
+    tournent hors du fil de l'interface et sont abandonnés quand le tour
+    change. Les suggestions calculées pendant le tour sont gardées par
+    position (self.suggestions, clé : empreintes du plateau et du rack).
     """
     def __init__(self):
         """
@@ -36,9 +95,13 @@ class RummikubInterface(QWidget):
         n, ok = QInputDialog.getInt(self, "Nombre de joueurs", "Combien de joueurs ?", value=1, min=1, max=8)
         if not ok:
             n = 1
-        # Demander un nom pour chaque joueur (valeur par défaut : Joueur X)
+        # Places automatiques (les dernières), pour compléter la table
+        n_ia, ok = QInputDialog.getInt(self, "Joueurs automatiques", "Dont combien d'ordinateurs ?", value=0, min=0, max=n)
+        if not ok:
+            n_ia = 0
+        # Demander un nom pour chaque joueur humain (valeur par défaut : Joueur X)
         noms = []
-        for i in range(n):
+        for i in range(n - n_ia):
             nom, ok_nom = QInputDialog.getText(self, "Nom du joueur", f"Nom du joueur {i+1}:", text=f"Joueur {i+1}")
             if not ok_nom or not nom.strip():
                 nom = f"Joueur {i+1}"
@@ -48,12 +111,34 @@ class RummikubInterface(QWidget):
         for i, nom in enumerate(noms):
             if i < len(self.jeu.joueurs):
                 self.jeu.joueurs[i].nom = nom
+        for i in range(n - n_ia, n):
+            JoueurIA.remplacer(self.jeu, i).demarrer()
+            self.jeu.joueurs[i].nom = f"Ordinateur {i - (n - n_ia) + 1}"
+        self.jeu.plateau.abonner(self.noter_changement_plateau)
+        for j in self.jeu.joueurs:
+            j.rack.abonner(self.noter_changement_rack)
         self.tour = 0
         self.joueur = self.jeu.joueurs[self.tour]
+        # Détection des parties bloquées (voir passer_tour)
+        self.rack_debut = len(self.joueur.rack.tuiles)
+        self.sans_pose = 0
         self.selected_plateau = set()  
         self.selected_rack = set()     
+        self.taches = Taches()
+        self.suggestions = {}
+        self.suggestion = None
+        self.cle_demandee = None
+        self.lignes_plateau = []
+        self.lignes_sales = set(range(len(self.jeu.plateau.mains)))
+        self.lignes_selection = set()
+        self.boutons_rack = []
+        self.rack_sale = True
+        self.rack_affiche = None
+        self.selection_rack = set()
+        self.reserve_boutons = []
         self.init_ui()
         self.refresh()
+        self.lancer_ia()
         
 
     def init_ui(self):
@@ -70,6 +155,8 @@ class RummikubInterface(QWidget):
         self.btn_sauter = QPushButton("Passer son tour")
         self.btn_stop = QPushButton("Arrêter la partie")
         self.btn_refresh = QPushButton("Rafraîchir")
+        self.btn_verifier = QPushButton("Vérifier le plateau")
+        self.btn_suggerer = QPushButton("Suggérer un coup")
         self.msg = QLabel()
         self.msg.setStyleSheet("color: red;")
 
@@ -97,6 +184,8 @@ class RummikubInterface(QWidget):
         self.layout.addLayout(btns_hbox)
 
         self.layout.addWidget(self.btn_refresh)
+        self.layout.addWidget(self.btn_verifier)
+        self.layout.addWidget(self.btn_suggerer)
         self.layout.addWidget(self.msg)
         self.setLayout(self.layout)
 
@@ -108,6 +197,8 @@ class RummikubInterface(QWidget):
         self.btn_deplacer_selection.clicked.connect(self.deplacer_selection)
         self.btn_retirer_selection.clicked.connect(self.retirer_selection)
         self.btn_refresh.clicked.connect(self.refresh)
+        self.btn_verifier.clicked.connect(self.verifier_plateau)
+        self.btn_suggerer.clicked.connect(self.suggerer_coup)
         
     def tirer_tuile(self):
         if getattr(self.joueur, 'has_drawn', False):
@@ -150,92 +241,112 @@ class RummikubInterface(QWidget):
             self.layout.insertWidget(0, self.label_current)
         # reset msg color par défaut
         self.msg.setStyleSheet("color: red;")
-        # Plateau
-        for i in reversed(range(self.plateau_grid.count())):
-            item = self.plateau_grid.itemAt(i)
-            if item.widget():
-                item.widget().deleteLater()
-            elif item.layout():
-                while item.layout().count():
-                    child = item.layout().takeAt(0)
-                    if child.widget():
-                        child.widget().deleteLater()
-                self.plateau_grid.removeItem(item)
-     
-        for i, comb in enumerate(self.jeu.plateau.mains):
-            # Affichage par défaut (ligne)
-            hbox = QHBoxLayout()
-            for j, tuile in enumerate(comb.tuiles):
-                # Affichage chiffre ou J, couleur Qt
-                if getattr(tuile, 'is_joker', False):
-                    txt = 'J'
-                    color = 'magenta'
-                else:
-                    txt = str(tuile.valeur)
-                    color = {
-                        'rouge': 'red',
-                        'bleu': 'blue',
-                        'noir': 'black',
-                        'jaune': 'orange'
-                    }.get(getattr(tuile, 'couleur', ''), 'grey')
-                btn = QPushButton(txt)
-                btn.setCheckable(True)
-                btn.setChecked((i, j) in self.selected_plateau)
-                btn.clicked.connect(self.make_plateau_toggle(i, j, btn))
-                btn.setToolTip(f"Plateau {i}:{j}")
-                btn.setStyleSheet(f"color: {color}; font-weight: bold; font-size: 18px; margin:2px;")
-                hbox.addWidget(btn)
-            label = QLabel(f"(Combinaison {i})")
-            hbox.addWidget(label)
-            self.plateau_grid.addLayout(hbox)
-
-
-        # Rack
-        for i in reversed(range(self.rack_layout.count())):
-            item = self.rack_layout.itemAt(i)
-            if item.widget():
-                item.widget().deleteLater()
-       
-        for idx, tuile in enumerate(self.joueur.rack.tuiles):
-            if getattr(tuile, 'is_joker', False):
-                txt = 'J'
-                color = 'magenta'
-            else:
-                txt = str(tuile.valeur)
-                color = {
-                    'rouge': 'red',
-                    'bleu': 'blue',
-                    'noir': 'black',
-                    'jaune': 'orange'
-                }.get(getattr(tuile, 'couleur', ''), 'grey')
-            btn = QPushButton(txt)
-            btn.setCheckable(True)
-            btn.setChecked(idx in self.selected_rack)
-            btn.clicked.connect(self.make_rack_toggle(idx, btn))
-            btn.setToolTip(f"Rack {idx}")
-            btn.setStyleSheet(f"color: {color}; font-weight: bold; font-size: 18px; margin:2px;")
-            self.rack_layout.addWidget(btn)
-
+        self.rendre_plateau()
+        self.rendre_rack()
         self.msg.clear()
-    def make_plateau_toggle(self, i, j, btn):
-        def toggle():
-            if (i, j) in self.selected_plateau:
-                self.selected_plateau.remove((i, j))
-                btn.setChecked(False)
-            else:
-                self.selected_plateau.add((i, j))
-                btn.setChecked(True)
-        return toggle
-
-    def make_rack_toggle(self, idx, btn):
-        def toggle():
-            if idx in self.selected_rack:
-                self.selected_rack.remove(idx)
-                btn.setChecked(False)
+
+    # --- Rendu incrémental -------------------------------------------------
+    # Les boutons de tuiles ne sont jamais détruits : ceux qui ne servent plus
+    # retournent dans une réserve (cachés) et sont réutilisés. Le plateau et
+    # les racks notifient leurs changements (Plateau.abonner, Rack.abonner) :
+    # seules les lignes touchées depuis le dernier affichage, ou dont la
+    # sélection a changé, sont revues, et dans ces lignes seuls les boutons
+    # dont la tuile, la position ou l'état ont changé sont repeints.
+
+    def noter_changement_plateau(self, changement):
+        """Abonné du plateau : marque les lignes à redessiner."""
+        self.effacer_suggestion()
+        if changement.nom in ('tuile_retiree', 'tuile_inseree'):
+            self.lignes_sales.add(changement.indices[0])
+        elif changement.nom in ('combinaison_inseree', 'combinaison_retiree', 'plateau_remplace'):
+            # Les combinaisons suivantes changent d'indice
+            debut = changement.indices[0] if changement.indices else 0
+            fin = max(len(self.jeu.plateau.mains), len(self.lignes_plateau))
+            self.lignes_sales.update(range(debut, fin + 1))
+
+    def noter_changement_rack(self, changement):
+        self.effacer_suggestion()
+        self.rack_sale = True
+
+    def bouton_tuile(self):
+        """Bouton de tuile pris dans la réserve, ou créé s'il n'y en a plus."""
+        if self.reserve_boutons:
+            btn = self.reserve_boutons.pop()
+        else:
+            btn = BoutonTuile(self)
+            btn.clicked.connect(self.basculer_selection)
+        btn.show()
+        return btn
+
+    def liberer_bouton(self, layout, btn):
+        layout.removeWidget(btn)
+        btn.hide()
+        self.reserve_boutons.append(btn)
+
+    def remplir(self, layout, boutons, tuiles, zone, positions, selection, suggeres=(), debut=0):
+        """Ajuste la liste `boutons` (affichée dans `layout` à partir de
+        l'indice `debut`) aux tuiles données, en réutilisant les boutons.
+        Les positions de `suggeres` sont mises en évidence."""
+        while len(boutons) > len(tuiles):
+            self.liberer_bouton(layout, boutons.pop())
+        while len(boutons) < len(tuiles):
+            btn = self.bouton_tuile()
+            layout.insertWidget(debut + len(boutons), btn)
+            boutons.append(btn)
+        for btn, tuile, position in zip(boutons, tuiles, positions):
+            btn.afficher(tuile, zone, position, position in selection, position in suggeres)
+
+    def rendre_plateau(self):
+        mains = self.jeu.plateau.mains
+        selection = {i for i, _ in self.selected_plateau}
+        a_revoir = self.lignes_sales | selection | self.lignes_selection
+        for i in sorted(a_revoir):
+            while i >= len(self.lignes_plateau) and i < len(mains):
+                hbox = QHBoxLayout()
+                label = QLabel(f"(Combinaison {len(self.lignes_plateau)})")
+                hbox.addWidget(label)
+                self.plateau_grid.addLayout(hbox)
+                self.lignes_plateau.append([hbox, [], label])
+            if i >= len(self.lignes_plateau):
+                break
+            hbox, boutons, label = self.lignes_plateau[i]
+            if i < len(mains):
+                tuiles = mains[i].tuiles
+                self.remplir(hbox, boutons, tuiles, 'plateau', [(i, j) for j in range(len(tuiles))],
+                             self.selected_plateau, self.suggestion[0] if self.suggestion else ())
+                label.show()
             else:
-                self.selected_rack.add(idx)
-                btn.setChecked(True)
-        return toggle
+                # Ligne en trop : vidée et cachée, gardée pour plus tard
+                while boutons:
+                    self.liberer_bouton(hbox, boutons.pop())
+                label.hide()
+        self.lignes_sales.clear()
+        self.lignes_selection = selection
+
+    def rendre_rack(self):
+        rack = self.joueur.rack
+        if not self.rack_sale and rack is self.rack_affiche and self.selected_rack == self.selection_rack:
+            return
+        self.remplir(self.rack_layout, self.boutons_rack, rack.tuiles, 'rack', range(len(rack.tuiles)),
+                     self.selected_rack, self.suggestion[1] if self.suggestion else ())
+        self.rack_sale = False
+        self.rack_affiche = rack
+        self.selection_rack = set(self.selected_rack)
+
+    def basculer_selection(self):
+        btn = self.sender()
+        selection = self.selected_plateau if btn.zone == 'plateau' else self.selected_rack
+        if btn.position in selection:
+            selection.remove(btn.position)
+        else:
+            selection.add(btn.position)
+        btn.coche = btn.position in selection
+        btn.setChecked(btn.coche)
+        # L'affichage est déjà à jour : on le note pour le prochain rendu
+        if btn.zone == 'plateau':
+            self.lignes_selection = {i for i, _ in self.selected_plateau}
+        else:
+            self.selection_rack = set(self.selected_rack)
 
     def poser_combinaison(self):
         """
@@ -259,11 +370,9 @@ class RummikubInterface(QWidget):
                 comb_rack = Combinaison(tuiles_rack) if tuiles_rack else None
                 points_rack = comb_rack.points(context='initial') if comb_rack else 0
 
-                # Si c'est la première modification liée au rack ce tour, on sauvegarde l'état
-                if comb_rack and not getattr(self.joueur, 'has_melded', False) and not getattr(self.joueur, 'temp_meld_points', 0):
-                    self.joueur._backup_plateau = copy.deepcopy(self.jeu.plateau.mains)
-                    self.joueur._backup_rack = list(self.joueur.rack.tuiles)
-                    self.joueur._placed_this_turn = True
+                # Si c'est la première modification liée au rack ce tour, on ouvre une transaction
+                if comb_rack and not getattr(self.joueur, 'has_melded', False):
+                    self.joueur.debut_premiere_pose(self.jeu.plateau)
 
                 # Retirer d'abord les tuiles du plateau
                 for i, j in sorted(pos_list, reverse=True):
@@ -289,13 +398,7 @@ class RummikubInterface(QWidget):
                 # Vérifier fin de partie et afficher le classement si terminé
                 self.jeu.verifier_fin()
                 if getattr(self.jeu, 'partie_terminee', False):
-                    # Préparer et afficher un message final
-                    lines = [f"{p.nom} : {getattr(p, 'points', 0)} pts" for p in self.jeu.joueurs]
-                    text = "\n".join(lines)
-                    QMessageBox.information(self, "Fin de la partie - Scores", f"Partie terminée.\n\n{ text }")
-                    # Désactiver les boutons pour éviter d'autres actions
-                    for w in [self.btn_poser, self.btn_tirer, self.btn_sauter]:
-                        w.setEnabled(False)
+                    self.afficher_fin()
             else:
                 self.msg.setStyleSheet("color: red;")
                 self.msg.setText("Combinaison invalide.")
@@ -326,40 +429,41 @@ class RummikubInterface(QWidget):
         # Préparer sources
         sources = sorted(list(self.selected_plateau), key=lambda x: (x[0], x[1]))
 
-    # Backup
-        backup = copy.deepcopy(self.jeu.plateau.mains)
+        # Transaction : annulée si le plateau devient invalide
+        self.jeu.plateau.debut_transaction()
         try:
             ok_move = self.jeu.plateau.deplacer_tuiles(sources, dest, pos)
             if not ok_move:
                 raise Exception("Erreur interne lors du déplacement")
-            if not self.jeu.plateau.est_valide_plateau():
-                # rollback
-                self.jeu.plateau.mains = backup
-                self.msg.setStyleSheet("color: red;")
-                self.msg.setText("Déplacement annulé : le plateau serait invalide.")
-            else:
-                self.msg.setStyleSheet("color: green;")
-                self.msg.setText("Déplacement effectué.")
-                # clear selection
-                self.selected_plateau.clear()
-                self.refresh()
         except Exception as e:
-            self.jeu.plateau.mains = backup
+            self.jeu.plateau.annuler_transaction()
             self.msg.setStyleSheet("color: red;")
             self.msg.setText(f"Erreur lors du déplacement : {e}")
+            return
+        if not self.jeu.plateau.est_valide_plateau():
+            # rollback
+            self.jeu.plateau.annuler_transaction()
+            self.msg.setStyleSheet("color: red;")
+            self.msg.setText("Déplacement annulé : le plateau serait invalide.")
+        else:
+            self.jeu.plateau.valider_transaction()
+            self.msg.setStyleSheet("color: green;")
+            self.msg.setText("Déplacement effectué.")
+            # clear selection
+            self.selected_plateau.clear()
+            self.refresh()
 
     def retirer_selection(self):
         """
         Retire les tuiles sélectionnées du plateau et les remet dans le rack du joueur.
         """
-        from copy import deepcopy
         if not self.selected_plateau:
             self.msg.setStyleSheet("color: red;")
             self.msg.setText("Aucune tuile du plateau sélectionnée.")
             return
         sources = sorted(list(self.selected_plateau), key=lambda x: (x[0], x[1]))
-        backup_plateau = deepcopy(self.jeu.plateau.mains)
-        backup_rack = list(self.joueur.rack.tuiles)
+        self.jeu.plateau.debut_transaction()
+        self.joueur.rack.debut_transaction()
         try:
             removed = []
             # Retirer en ordre inverse
@@ -371,65 +475,212 @@ class RummikubInterface(QWidget):
             # Ajouter les tuiles retirées au rack du joueur (dans l'ordre original)
             for t in reversed(removed):
                 self.joueur.rack.ajouter_tuile(t)
-
-            if not self.jeu.plateau.est_valide_plateau():
-                # rollback
-                self.jeu.plateau.mains = backup_plateau
-                self.joueur.rack.tuiles = backup_rack
-                self.msg.setStyleSheet("color: red;")
-                self.msg.setText("Retrait annulé : le plateau serait invalide.")
-            else:
-                self.msg.setStyleSheet("color: green;")
-                self.msg.setText("Tuiles retirées vers ton rack.")
-                self.selected_plateau.clear()
-                self.refresh()
         except Exception as e:
-            self.jeu.plateau.mains = backup_plateau
-            self.joueur.rack.tuiles = backup_rack
+            self.jeu.plateau.annuler_transaction()
+            self.joueur.rack.annuler_transaction()
             self.msg.setStyleSheet("color: red;")
             self.msg.setText(f"Erreur lors du retrait : {e}")
+            return
+
+        if not self.jeu.plateau.est_valide_plateau():
+            # rollback
+            self.jeu.plateau.annuler_transaction()
+            self.joueur.rack.annuler_transaction()
+            self.msg.setStyleSheet("color: red;")
+            self.msg.setText("Retrait annulé : le plateau serait invalide.")
+        else:
+            self.jeu.plateau.valider_transaction()
+            self.joueur.rack.valider_transaction()
+            self.msg.setStyleSheet("color: green;")
+            self.msg.setText("Tuiles retirées vers ton rack.")
+            self.selected_plateau.clear()
+            self.refresh()
 
     def passer_tour(self):
         """
-        Termine le tour du joueur courant, valide la première pose si besoin, passe au joueur suivant.
+        Termine le tour du joueur courant (Jeu.passer_tour : valide ou annule
+        sa première pose), vérifie la fin de partie (rack vidé ou partie
+        bloquée) puis passe au joueur suivant, qui joue seul s'il est
+        automatique.
         """
-        # Gérer la validation de la première pose (accumulation multi-combinaisons)
-        current = self.jeu.joueurs[self.tour % len(self.jeu.joueurs)]
-        # Si le joueur n'a pas encore validé son initial meld
-        if not getattr(current, 'has_melded', False):
-            temp = getattr(current, 'temp_meld_points', 0)
-            if temp > 0 and temp < 30:
-                # rollback des changements effectués ce tour
-                if getattr(current, '_backup_plateau', None) is not None:
-                    self.jeu.plateau.mains = current._backup_plateau
-                if getattr(current, '_backup_rack', None) is not None:
-                    current.rack.tuiles = current._backup_rack
-                current.temp_meld_points = 0
-                current._backup_plateau = None
-                current._backup_rack = None
-                current._placed_this_turn = False
-                self.msg.setStyleSheet("color: red;")
-                self.msg.setText("Première pose non atteinte (moins de 30 pts) : mouvements annulés.")
-            elif temp >= 30:
-                # on valide la première pose : on ajoute les points accumulés
-                current.points = getattr(current, 'points', 0) + temp
-                current.has_melded = True
-                current.temp_meld_points = 0
-                current._backup_plateau = None
-                current._backup_rack = None
-                current._placed_this_turn = False
-
-        # Reset draw flag for the player (next time they will be able to draw on their new turn)
-        current.has_drawn = False
-
-        # Passe au joueur suivant
-        self.tour = (self.tour + 1) % len(self.jeu.joueurs)
-        self.msg.setStyleSheet("color: blue;")
-        self.msg.setText(f"Tour passé. Joueur suivant : {self.jeu.joueurs[self.tour].nom}")
+        if self.jeu.partie_terminee:
+            return
+        current = self.jeu.joueurs[self.tour]
+        issue = self.jeu.passer_tour()
+        # Fin de partie : rack vidé, ou partie bloquée (pioche vide et tous
+        # les joueurs passent un tour de table de suite, comme Jeu.jouer)
+        self.jeu.verifier_fin()
+        if not self.jeu.partie_terminee:
+            bloque = len(current.rack.tuiles) >= self.rack_debut and not len(self.jeu.pioche)
+            self.sans_pose = self.sans_pose + 1 if bloque else 0
+            if self.sans_pose >= len(self.jeu.joueurs):
+                self.jeu.terminer_partie_bloquee()
+        if self.jeu.partie_terminee:
+            self.taches.annuler()
+            self.refresh()
+            self.afficher_fin()
+            return
+        self.jeu.tour_suivant()
+        self.tour = self.jeu.tour % len(self.jeu.joueurs)
+        self.rack_debut = len(self.jeu.joueurs[self.tour].rack.tuiles)
+        suivant = f"Joueur suivant : {self.jeu.joueurs[self.tour].nom}"
+        if issue == 'annulee':
+            self.msg.setStyleSheet("color: red;")
+            self.msg.setText(f"Première pose non atteinte (moins de 30 pts) : mouvements annulés. {suivant}")
+        else:
+            self.msg.setStyleSheet("color: blue;")
+            self.msg.setText(f"Tour passé. {suivant}")
         # Clear selections when switching player
         self.selected_plateau.clear()
         self.selected_rack.clear()
+        # Les calculs lancés pendant le tour précédent sont périmés
+        self.taches.annuler()
+        self.suggestions.clear()
+        self.effacer_suggestion()
         self.refresh()
+        self.lancer_ia()
+
+    def lancer_ia(self):
+        """
+        Si le joueur courant est automatique, lance sa réflexion en
+        arrière-plan ; jouer_ia joue le coup quand elle est terminée.
+        """
+        joueur = self.jeu.joueurs[self.tour % len(self.jeu.joueurs)]
+        if (not isinstance(joueur, JoueurIA) or self.taches.en_cours_de('ia')
+                or self.jeu.partie_terminee):
+            return
+        self.activer_boutons(False)
+        self.msg.setStyleSheet("color: blue;")
+        self.msg.setText(f"{joueur.nom} réfléchit...")
+        self.taches.lancer('ia', reflexion, joueur, sauvegarder(self.jeu), self.tour % len(self.jeu.joueurs),
+                           terminee=self.jouer_ia,
+                           echouee=lambda message: self.jouer_ia(None))
+
+    def jouer_ia(self, action):
+        self.joueur.appliquer(self.jeu, action)
+        self.activer_boutons(True)
+        # passer_tour vérifie la fin de partie avant de relancer une réflexion
+        self.passer_tour()
+
+    def afficher_fin(self):
+        """Affiche les scores finaux et désactive les actions de jeu."""
+        gagnant = self.jeu.gagnant.nom if self.jeu.gagnant is not None else "?"
+        lines = [f"{p.nom} : {getattr(p, 'points', 0)} pts" for p in self.jeu.joueurs]
+        text = "\n".join(lines)
+        self.msg.setStyleSheet("color: green;")
+        self.msg.setText(f"Partie terminée : {gagnant} gagne.")
+        QMessageBox.information(self, "Fin de la partie - Scores", f"Partie terminée.\n\n{ text }")
+        # Désactiver les boutons pour éviter d'autres actions
+        self.activer_boutons(False)
+
+    def verifier_plateau(self):
+        """
+        Vérifie toutes les combinaisons du plateau en arrière-plan et
+        signale les invalides ; la progression s'affiche dans le message.
+        """
+        combinaisons = [list(m.tuiles) for m in self.jeu.plateau.mains]
+
+        def progression(fraction):
+            self.msg.setStyleSheet("color: blue;")
+            self.msg.setText(f"Vérification du plateau... {fraction:.0%}")
+
+        def terminee(invalides):
+            if invalides:
+                self.msg.setStyleSheet("color: red;")
+                self.msg.setText("Combinaisons invalides : " + ", ".join(map(str, invalides)))
+            else:
+                self.msg.setStyleSheet("color: green;")
+                self.msg.setText("Plateau valide.")
+        self.taches.lancer('verification', valider_combinaisons, combinaisons,
+                           terminee=terminee, progression=progression)
+
+    # --- Suggestion de coup ------------------------------------------------
+
+    def cle_suggestion(self):
+        """Position du joueur courant : la suggestion n'en dépend que."""
+        return (self.jeu.plateau.empreinte(), self.joueur.rack.empreinte(),
+                bool(getattr(self.joueur, 'has_melded', False)))
+
+    def suggerer_coup(self):
+        """
+        Met en évidence les tuiles du meilleur coup du joueur courant : celles
+        du rack à poser et celles des combinaisons du plateau à réarranger.
+        Le calcul se fait en arrière-plan, une seule fois par position.
+        """
+        cle = self.cle_suggestion()
+        if cle in self.suggestions:
+            self.montrer_suggestion(self.suggestions[cle])
+            return
+        if self.taches.en_cours_de('suggestion') and self.cle_demandee == cle:
+            return
+        self.cle_demandee = cle
+
+        def progression(fraction):
+            self.msg.setStyleSheet("color: blue;")
+            self.msg.setText(f"Recherche du meilleur coup... {fraction:.0%}")
+
+        def terminee(solution):
+            self.suggestions[cle] = solution
+            if self.cle_suggestion() == cle:
+                self.montrer_suggestion(solution)
+        self.taches.lancer('suggestion', meilleur_coup, copier_plateau(self.jeu.plateau),
+                           copier_rack(self.joueur.rack), cle[2],
+                           terminee=terminee, progression=progression)
+
+    def montrer_suggestion(self, solution):
+        """Met en évidence une solution (taches.meilleur_coup) sur la
+        position courante."""
+        self.effacer_suggestion()
+        if solution is None:
+            self.msg.setStyleSheet("color: blue;")
+            self.msg.setText("Aucun coup possible : tire une tuile.")
+            return
+        # Tuiles du rack à poser (les copies d'une même tuile sont interchangeables)
+        a_poser = Counter(t.code for t in solution.tuiles_posees)
+        rack = set()
+        for k, t in enumerate(self.joueur.rack.tuiles):
+            if a_poser[t.code]:
+                a_poser[t.code] -= 1
+                rack.add(k)
+        # Combinaisons du plateau absentes de la solution : à réarranger
+        plateau = set()
+        if getattr(self.joueur, 'has_melded', False):
+            gardees = Counter(tuple(sorted(t.code for t in c.tuiles)) for c in solution.combinaisons)
+            for i, m in enumerate(self.jeu.plateau.mains):
+                signature = tuple(sorted(t.code for t in m.tuiles))
+                if gardees[signature]:
+                    gardees[signature] -= 1
+                else:
+                    plateau.update((i, j) for j in range(len(m.tuiles)))
+        self.suggestion = (plateau, rack)
+        self.lignes_sales.update(i for i, _ in plateau)
+        self.rack_sale = True
+        self.rendre_plateau()
+        self.rendre_rack()
+        self.msg.setStyleSheet("color: green;")
+        if plateau:
+            self.msg.setText(f"Suggestion : poser {len(rack)} tuile(s) en réarrangeant "
+                             f"{len({i for i, _ in plateau})} combinaison(s) du plateau.")
+        else:
+            self.msg.setText(f"Suggestion : poser {len(rack)} tuile(s).")
+
+    def effacer_suggestion(self):
+        """Retire la mise en évidence (le plateau ou le rack a changé)."""
+        if self.suggestion is None:
+            return
+        plateau, _ = self.suggestion
+        self.suggestion = None
+        self.lignes_sales.update(i for i, _ in plateau)
+        self.rack_sale = True
+
+    def activer_boutons(self, actif:bool):
+        for btn in (self.btn_poser, self.btn_tirer, self.btn_sauter, self.btn_deplacer_selection,
+                    self.btn_retirer_selection, self.btn_suggerer):
+            btn.setEnabled(actif)
+
+    def closeEvent(self, event):
+        self.taches.annuler()
+        super().closeEvent(event)
 
 
 
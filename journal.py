@@ -0,0 +1,278 @@
+"""
+Journal des actions d'une partie, en ajout seul, et relecture en flux.
+
+Chaque événement est un enregistrement binaire : type (1 octet), longueur
+des données (2 octets), données. Un fichier peut contenir plusieurs parties
+à la suite, chacune commençant par un événement 'debut_partie' qui contient
+l'état initial (format de sauvegarde.py). La relecture rejoue les actions
+sur un Jeu sans jamais charger tout le fichier en mémoire.
+
+Utilisation :
+    with Journal("parties.log") as journal:
+        jeu = Jeu(2, journal=journal)
+        ...
+    for evenement, jeu in rejouer("parties.log"):
+        ...
+"""
+import struct
+from classes import Combinaison, Tuile, tuiles_depuis_idents
+from sauvegarde import sauvegarder, charger
+
+# En-tête d'un enregistrement : code de l'événement, longueur des données
+ENREGISTREMENT = struct.Struct('<BH')
+_AUCUN = -32768
+
+# Types d'événements, dans l'ordre de leur code
+EVENEMENTS = ('debut_partie', 'tirage', 'pose', 'manipulation', 'reorganisation',
+              'fin_tour', 'tour_suivant', 'fin_partie')
+_CODES = {nom: code for code, nom in enumerate(EVENEMENTS)}
+
+# Paramètres des manipulations, dans l'ordre d'écriture ; les paramètres en
+# tuple sont des listes de couples (combinaison, tuile).
+_ACTIONS = ('deplacer', 'deplacer_mult', 'fusionner', 'split', 'reutiliser')
+_PARAMETRES = {
+    'deplacer': ('index_src', 'index_tuile', 'index_dest', 'pos_dest'),
+    'deplacer_mult': (('sources',), 'dest', 'pos_dest'),
+    'fusionner': ('index1', 'index2'),
+    'split': ('index', 'split_pos'),
+    'reutiliser': (('indices',),),
+}
+_ISSUES_MANIPULATION = ('annulee', 'appliquee', 'echec')
+_ISSUES_TOUR = ('rien', 'validee', 'annulee')
+
+
+def _entiers(valeurs):
+    return struct.pack(f'<{len(valeurs)}h', *valeurs)
+
+
+def _lire_entiers(donnees, pos:int, n:int):
+    return list(struct.unpack_from(f'<{n}h', donnees, pos)), pos + 2 * n
+
+
+class Evenement:
+    """
+    Événement décodé du journal.
+    Attributs :
+        nom (str) : type d'événement (voir EVENEMENTS).
+        joueur (int | None) : indice du joueur concerné.
+        valeurs (dict) : données propres au type d'événement.
+    """
+    __slots__ = ("nom", "joueur", "valeurs")
+
+    def __init__(self, nom:str, joueur, valeurs:dict):
+        self.nom = nom
+        self.joueur = joueur
+        self.valeurs = valeurs
+
+    def __repr__(self):
+        return f"Evenement({self.nom}, joueur={self.joueur}, {self.valeurs})"
+
+
+class Journal:
+    """
+    Journal binaire en ajout seul, branché sur un Jeu (Jeu(journal=...)).
+    Le Jeu appelle une méthode par événement ; chacune écrit un
+    enregistrement à la fin du fichier.
+    Méthodes :
+        debut_partie, tirage, pose, manipulation, reorganisation, fin_tour,
+        tour_suivant, fin_partie, fermer
+    """
+    def __init__(self, chemin:str):
+        self.chemin = chemin
+        self._fichier = open(chemin, 'ab')
+
+    def _ecrire(self, nom:str, donnees:bytes):
+        self._fichier.write(ENREGISTREMENT.pack(_CODES[nom], len(donnees)))
+        self._fichier.write(donnees)
+
+    def debut_partie(self, jeu):
+        self._ecrire('debut_partie', sauvegarder(jeu))
+
+    def tirage(self, joueur:int, tuile):
+        self._ecrire('tirage', bytes((joueur, tuile.ident)))
+
+    def pose(self, joueur:int, pos_list, rack_list):
+        self._ecrire('pose', bytes((joueur, len(pos_list))) + _entiers([x for p in pos_list for x in p])
+                     + bytes((len(rack_list),)) + _entiers(rack_list))
+
+    def manipulation(self, joueur:int, action:str, kwargs:dict, issue:str):
+        valeurs = []
+        for parametre in _PARAMETRES[action]:
+            if isinstance(parametre, tuple):
+                couples = kwargs.get(parametre[0]) or []
+                valeurs.append(len(couples))
+                valeurs.extend(x for c in couples for x in c)
+            else:
+                valeur = kwargs.get(parametre)
+                valeurs.append(_AUCUN if valeur is None else valeur)
+        self._ecrire('manipulation', bytes((joueur, _ACTIONS.index(action), _ISSUES_MANIPULATION.index(issue)))
+                     + _entiers(valeurs))
+
+    def reorganisation(self, joueur:int, combinaisons):
+        morceaux = [bytes((joueur, len(combinaisons)))]
+        for c in combinaisons:
+            morceaux.append(bytes((len(c.tuiles),)))
+            morceaux.append(bytes(t.ident for t in c.tuiles))
+        self._ecrire('reorganisation', b''.join(morceaux))
+
+    def fin_tour(self, joueur:int, issue:str):
+        self._ecrire('fin_tour', bytes((joueur, _ISSUES_TOUR.index(issue))))
+
+    def tour_suivant(self, tour:int):
+        self._ecrire('tour_suivant', struct.pack('<I', tour))
+
+    def fin_partie(self, gagnant:int):
+        self._ecrire('fin_partie', bytes((gagnant,)))
+
+    def fermer(self):
+        self._fichier.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+def _decoder(code:int, donnees:bytes):
+    nom = EVENEMENTS[code]
+    if nom == 'debut_partie':
+        return Evenement(nom, None, {'sauvegarde': bytes(donnees)})
+    if nom == 'tour_suivant':
+        return Evenement(nom, None, {'tour': struct.unpack('<I', donnees)[0]})
+    joueur = donnees[0]
+    if nom == 'tirage':
+        return Evenement(nom, joueur, {'tuile': Tuile.depuis_ident(donnees[1])})
+    if nom == 'pose':
+        plats, pos = _lire_entiers(donnees, 2, 2 * donnees[1])
+        rack_list, _ = _lire_entiers(donnees, pos + 1, donnees[pos])
+        return Evenement(nom, joueur, {'pos_list': list(zip(plats[::2], plats[1::2])), 'rack_list': rack_list})
+    if nom == 'manipulation':
+        action = _ACTIONS[donnees[1]]
+        valeurs = struct.unpack_from(f'<{(len(donnees) - 3) // 2}h', donnees, 3)
+        kwargs = {}
+        i = 0
+        for parametre in _PARAMETRES[action]:
+            if isinstance(parametre, tuple):
+                n = valeurs[i]
+                couples = valeurs[i + 1:i + 1 + 2 * n]
+                kwargs[parametre[0]] = list(zip(couples[::2], couples[1::2]))
+                i += 1 + 2 * n
+            else:
+                kwargs[parametre] = None if valeurs[i] == _AUCUN else valeurs[i]
+                i += 1
+        return Evenement(nom, joueur, {'action': action, 'kwargs': kwargs,
+                                       'issue': _ISSUES_MANIPULATION[donnees[2]]})
+    if nom == 'reorganisation':
+        combinaisons = []
+        pos = 2
+        for _ in range(donnees[1]):
+            longueur = donnees[pos]
+            combinaisons.append(tuiles_depuis_idents(donnees[pos + 1:pos + 1 + longueur]))
+            pos += 1 + longueur
+        return Evenement(nom, joueur, {'combinaisons': combinaisons})
+    if nom == 'fin_tour':
+        return Evenement(nom, joueur, {'issue': _ISSUES_TOUR[donnees[1]]})
+    return Evenement(nom, joueur, {})
+
+
+def lire_evenements(chemin:str):
+    """Générateur des événements du journal, lus un par un depuis le disque."""
+    with open(chemin, 'rb') as f:
+        while True:
+            entete = f.read(ENREGISTREMENT.size)
+            if not entete:
+                return
+            if len(entete) < ENREGISTREMENT.size:
+                raise ValueError("Journal tronqué")
+            code, longueur = ENREGISTREMENT.unpack(entete)
+            donnees = f.read(longueur)
+            if len(donnees) < longueur or code >= len(EVENEMENTS):
+                raise ValueError("Journal tronqué ou corrompu")
+            yield _decoder(code, donnees)
+
+
+def enregistrements(tampon, debut:int = 0, fin:int = None):
+    """Générateur des enregistrements bruts (position, code, longueur) d'un
+    tampon en mémoire (bytes, memoryview, mmap), sans les décoder."""
+    fin = len(tampon) if fin is None else fin
+    pos = debut
+    while pos < fin:
+        if pos + ENREGISTREMENT.size > fin:
+            raise ValueError("Journal tronqué")
+        code, longueur = ENREGISTREMENT.unpack_from(tampon, pos)
+        if pos + ENREGISTREMENT.size + longueur > fin or code >= len(EVENEMENTS):
+            raise ValueError("Journal tronqué ou corrompu")
+        yield pos, code, longueur
+        pos += ENREGISTREMENT.size + longueur
+
+
+def decoder_evenements(tampon, debut:int = 0, fin:int = None):
+    """Générateur des événements d'un tampon en mémoire."""
+    for pos, code, longueur in enregistrements(tampon, debut, fin):
+        pos += ENREGISTREMENT.size
+        yield _decoder(code, tampon[pos:pos + longueur])
+
+
+def appliquer(jeu, evenement:Evenement):
+    """Rejoue un événement sur `jeu` (tout sauf 'debut_partie')."""
+    nom = evenement.nom
+    v = evenement.valeurs
+    joueur = jeu.joueurs[evenement.joueur] if evenement.joueur is not None else None
+    if nom == 'tirage':
+        tuile = jeu.pioche.regarder(1)
+        if tuile != [v['tuile']]:
+            raise ValueError("Relecture incohérente : la pioche ne correspond pas au journal")
+        jeu.tirer_tuile(joueur)
+    elif nom == 'pose':
+        jeu.poser_tuiles(joueur, v['pos_list'], v['rack_list'])
+    elif nom == 'manipulation':
+        jeu.manipuler_plateau(joueur, v['action'], **v['kwargs'])
+    elif nom == 'reorganisation':
+        jeu.reorganiser_plateau(joueur, [Combinaison(c) for c in v['combinaisons']])
+    elif nom == 'fin_tour':
+        jeu.passer_tour()
+    elif nom == 'tour_suivant':
+        jeu.tour_suivant()
+    elif nom == 'fin_partie':
+        jeu.verifier_fin()
+        if not jeu.partie_terminee:
+            jeu.terminer_partie_bloquee()
+
+
+def rejouer(chemin:str):
+    """Générateur de couples (événement, jeu) : le jeu est dans l'état qui
+    suit l'événement. Un nouveau Jeu est créé à chaque début de partie ; le
+    même objet est ensuite modifié sur place au fil des événements."""
+    return rejouer_evenements(lire_evenements(chemin))
+
+
+def rejouer_evenements(evenements):
+    """Comme rejouer, à partir de n'importe quelle suite d'événements."""
+    jeu = None
+    for evenement in evenements:
+        if evenement.nom == 'debut_partie':
+            jeu = charger(evenement.valeurs['sauvegarde'], verbeux=False)
+        elif jeu is None:
+            raise ValueError("Journal sans début de partie")
+        else:
+            appliquer(jeu, evenement)
+        yield evenement, jeu
+
+
+def etat_au_tour(chemin:str, tour:int, partie:int = 0):
+    """Jeu de la partie d'indice `partie` au début du tour `tour` (ou à sa
+    fin si elle s'est terminée avant). Retourne None si la partie n'existe
+    pas."""
+    numero = -1
+    trouve = None
+    for evenement, jeu in rejouer(chemin):
+        if evenement.nom == 'debut_partie':
+            numero += 1
+            if numero > partie:
+                break
+        if numero == partie:
+            trouve = jeu
+            if jeu.tour >= tour:
+                break
+    return trouve
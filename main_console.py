@@ -1,5 +1,11 @@
 from game import Jeu
+from ia import JoueurIA
 if __name__ == "__main__":
     n = int(input("Nombre de joueurs ? "))
+    n_ia = int(input("Dont joueurs automatiques ? ") or 0)
     jeu = Jeu(n_joueurs=n)
+    # Les places automatiques sont les dernières
+    for i in range(max(0, len(jeu.joueurs) - n_ia), len(jeu.joueurs)):
+        JoueurIA.remplacer(jeu, i)
+        jeu.joueurs[i].nom += " (IA)"
     jeu.jouer()
\ No newline at end of file
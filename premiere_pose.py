@@ -0,0 +1,115 @@
+from functools import lru_cache
+from classes import (Combinaison, Rack, NB_VALEURS, CODE_JOKER, points_signature,
+                     table_combinaisons_valides)
+from encodage import Comptage
+from solveur import Solution
+
+SEUIL_PREMIERE_POSE = 30
+
+
+@lru_cache(maxsize=None)
+def _candidats_par_code():
+    """Combinaisons valides indexées par leur plus petit code hors joker.
+
+    Chaque entrée est un quintuplet (signature, besoins, points, masque,
+    jokers), où besoins liste les couples (code, nombre d'exemplaires)
+    nécessaires, masque a un bit par code hors joker utilisé (chacun au plus
+    une fois) et jokers compte les jokers.
+    """
+    candidats = {code: [] for code in range(CODE_JOKER)}
+    for sig, genre in table_combinaisons_valides().items():
+        # Une suite sans joker de plus de 5 tuiles se coupe en deux suites
+        # valides qui rapportent autant : inutile de l'envisager.
+        if genre == 'suite' and len(sig) > 5 and CODE_JOKER not in sig:
+            continue
+        besoins = tuple((code, sig.count(code)) for code in sorted(set(sig)))
+        masque = sum(1 << code for code in sig if code != CODE_JOKER)
+        candidats[sig[0]].append((sig, besoins, points_signature(sig), masque, sig.count(CODE_JOKER)))
+    # Les combinaisons les plus rentables d'abord
+    for liste in candidats.values():
+        liste.sort(key=lambda c: -c[2])
+    return candidats
+
+
+@lru_cache(maxsize=1 << 12)
+def _meilleure_decomposition(comptes:tuple):
+    """Meilleur ensemble disjoint de combinaisons formées à partir du
+    comptage `comptes` (53 compteurs).
+
+    Retourne (points, nombre de tuiles, signatures des combinaisons).
+    Le résultat est mis en cache par comptage : deux racks de même
+    composition ne sont résolus qu'une fois.
+    """
+    # Seules les combinaisons contenues dans le rack peuvent servir
+    presents = sum(1 << code for code in range(CODE_JOKER) if comptes[code])
+    jokers = comptes[CODE_JOKER]
+    candidats = {code: [c for c in liste if not c[3] & ~presents and c[4] <= jokers]
+                 for code, liste in _candidats_par_code().items() if comptes[code]}
+    memo = {}
+
+    def meilleure(comptes):
+        # La plus petite tuile présente (hors joker) est soit laissée de
+        # côté, soit placée dans une combinaison dont elle est la plus
+        # petite tuile.
+        if comptes in memo:
+            return memo[comptes]
+        code = next((c for c in range(CODE_JOKER) if comptes[c]), None)
+        if code is None:
+            # Il ne reste que des jokers : ils ne forment rien seuls
+            return (0, 0, ())
+        reste = list(comptes)
+        reste[code] -= 1
+        resultat = meilleure(tuple(reste))
+        for sig, besoins, points, _, _ in candidats[code]:
+            if any(comptes[c] < n for c, n in besoins):
+                continue
+            reste = list(comptes)
+            for c, n in besoins:
+                reste[c] -= n
+            p, nb, sigs = meilleure(tuple(reste))
+            if (p + points, nb + len(sig)) > resultat[:2]:
+                resultat = (p + points, nb + len(sig), (sig,) + sigs)
+        memo[comptes] = resultat
+        return resultat
+
+    return meilleure(comptes)
+
+
+def ordonner(tuiles):
+    """Range les tuiles d'une combinaison pour l'affichage : les suites par
+    valeur, les jokers à la place des tuiles qu'ils remplacent (au plus bas,
+    comme dans Combinaison.points)."""
+    jokers = [t for t in tuiles if t.is_joker]
+    reelles = sorted((t for t in tuiles if not t.is_joker), key=lambda t: t.code)
+    if len({t.valeur for t in reelles}) <= 1:
+        return reelles + jokers
+    n = len(tuiles)
+    debut = max(1, reelles[0].valeur - len(jokers), reelles[-1].valeur - n + 1)
+    par_valeur = {t.valeur: t for t in reelles}
+    return [par_valeur[v] if v in par_valeur else jokers.pop() for v in range(debut, debut + n)]
+
+
+def meilleure_premiere_pose(rack:Rack, seuil:int = SEUIL_PREMIERE_POSE):
+    """Cherche la première pose la plus rentable formée uniquement de tuiles
+    du rack.
+
+    Les points sont comptés comme Combinaison.points(context='initial') (un
+    joker vaut la tuile qu'il remplace). À points égaux, la pose qui place le
+    plus de tuiles est préférée.
+
+    Retourne une Solution (combinaisons à poser, tuiles posées, points), ou
+    None si aucune pose n'atteint `seuil` points.
+    """
+    points, _, sigs = _meilleure_decomposition(Comptage.depuis_rack(rack).comptes)
+    if points < seuil:
+        return None
+    disponibles = list(rack.tuiles)
+    combinaisons = []
+    posees = []
+    for sig in sigs:
+        tuiles = Comptage.depuis_codes(sig).choisir(disponibles)
+        for t in tuiles:
+            disponibles.remove(t)
+        posees.extend(tuiles)
+        combinaisons.append(Combinaison(ordonner(tuiles)))
+    return Solution(combinaisons, posees, points)
@@ -0,0 +1,98 @@
+"""
+Sauvegarde binaire compacte d'une partie (Jeu).
+
+Format (petit-boutiste), chaque tuile tenant sur un octet (Tuile.ident) :
+    en-tête   : 'RK', version, nombre de joueurs, tour, partie terminée,
+                nombre de tuiles de la pioche
+    pioche    : identifiants des tuiles, la prochaine tirée en dernier
+    joueur    : points, temp_meld_points, drapeaux (has_melded, has_drawn),
+                longueur du nom, longueur du rack, nom (utf-8), rack
+    plateau   : nombre de combinaisons, puis pour chacune sa longueur et
+                ses tuiles
+
+Une partie de 4 joueurs tient en moins de 200 octets. La sauvegarde se fait
+entre deux tours : une première pose en cours (transaction ouverte) est
+enregistrée telle quelle, sans possibilité d'annulation au chargement.
+"""
+import struct
+from classes import Combinaison, Pioche, tuiles_depuis_idents
+from game import Jeu
+
+_MAGIQUE = b'RK'
+_VERSION = 1
+_ENTETE = struct.Struct('<2sBBIBB')
+_JOUEUR = struct.Struct('<iHBBB')
+_HAS_MELDED = 1
+_HAS_DRAWN = 2
+
+
+def sauvegarder(jeu:Jeu):
+    """Retourne l'état complet de la partie sous forme de bytes."""
+    pioche = jeu.pioche.idents
+    morceaux = [_ENTETE.pack(_MAGIQUE, _VERSION, len(jeu.joueurs), jeu.tour,
+                             jeu.partie_terminee, len(pioche)),
+                pioche.tobytes()]
+    for j in jeu.joueurs:
+        nom = j.nom.encode('utf-8')
+        drapeaux = (_HAS_MELDED if j.has_melded else 0) | (_HAS_DRAWN if j.has_drawn else 0)
+        morceaux.append(_JOUEUR.pack(j.points, j.temp_meld_points, drapeaux, len(nom), len(j.rack.tuiles)))
+        morceaux.append(nom)
+        morceaux.append(bytes(t.ident for t in j.rack.tuiles))
+    morceaux.append(bytes((len(jeu.plateau.mains),)))
+    for m in jeu.plateau.mains:
+        morceaux.append(bytes((len(m.tuiles),)))
+        morceaux.append(bytes(t.ident for t in m.tuiles))
+    return b''.join(morceaux)
+
+
+def charger(donnees:bytes, verbeux:bool = True):
+    """Reconstruit un Jeu à partir de bytes produits par sauvegarder.
+
+    Lève ValueError si les données ne sont pas une sauvegarde valide.
+    """
+    donnees = memoryview(donnees)
+    try:
+        magique, version, n_joueurs, tour, terminee, nb_pioche = _ENTETE.unpack_from(donnees, 0)
+    except struct.error:
+        raise ValueError("Sauvegarde tronquée")
+    if magique != _MAGIQUE or version != _VERSION:
+        raise ValueError("Format de sauvegarde inconnu")
+    try:
+        pos = _ENTETE.size
+        jeu = Jeu(n_joueurs, distribuer=False, verbeux=verbeux,
+                  pioche=Pioche(idents=donnees[pos:pos + nb_pioche]))
+        jeu.tour = tour
+        jeu.partie_terminee = bool(terminee)
+        pos += nb_pioche
+        for j in jeu.joueurs:
+            j.points, j.temp_meld_points, drapeaux, lg_nom, lg_rack = _JOUEUR.unpack_from(donnees, pos)
+            pos += _JOUEUR.size
+            j.nom = str(donnees[pos:pos + lg_nom], 'utf-8')
+            pos += lg_nom
+            j.rack.tuiles = tuiles_depuis_idents(donnees[pos:pos + lg_rack])
+            pos += lg_rack
+            j.has_melded = bool(drapeaux & _HAS_MELDED)
+            j.has_drawn = bool(drapeaux & _HAS_DRAWN)
+        mains = []
+        nb_mains = donnees[pos]
+        pos += 1
+        for _ in range(nb_mains):
+            longueur = donnees[pos]
+            mains.append(Combinaison(tuiles_depuis_idents(donnees[pos + 1:pos + 1 + longueur])))
+            pos += 1 + longueur
+        jeu.plateau.mains = mains
+    except (struct.error, IndexError):
+        raise ValueError("Sauvegarde tronquée")
+    if pos != len(donnees):
+        raise ValueError("Taille de sauvegarde incohérente")
+    return jeu
+
+
+def ecrire(jeu:Jeu, chemin:str):
+    with open(chemin, 'wb') as f:
+        f.write(sauvegarder(jeu))
+
+
+def lire(chemin:str, verbeux:bool = True):
+    with open(chemin, 'rb') as f:
+        return charger(f.read(), verbeux)
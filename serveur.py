@@ -0,0 +1,480 @@
+"""
+Serveur de parties en réseau (asyncio, TCP local).
+
+Un processus héberge de nombreuses tables, chacune une partie (Jeu) dont
+les places sont prises par des clients. Le protocole est fait de lignes
+JSON ; les tuiles y sont désignées par leur code (0 à 52, voir
+Tuile.code), le serveur choisissant lui-même les exemplaires.
+
+Requêtes du client :
+    {"op": "creer", "joueurs": 2}             -> {"t": "table", "table": 7}
+    {"op": "rejoindre", "table": 7, "nom": "Alice"}
+                                              -> {"t": "etat", "siege": 0, "rack": [...], ...}
+    {"op": "jouer", "plateau": [[0, 1, 2], ...]}   plateau complet voulu
+    {"op": "tirer"}
+    {"op": "quitter"}
+Messages du serveur :
+    {"t": "etat", ...}     état complet, à l'arrivée à une table
+    {"t": "coup", "siege": 0, "retirees": [3], "ajoutees": [[...]], "racks": [...],
+     "pioche": 52, "tour": 1}
+        diffusé à toute la table après chaque tour : combinaisons retirées
+        (indices, dans l'ordre croissant) puis combinaisons ajoutées à la
+        fin ; le client applique ce delta à sa copie du plateau.
+    {"t": "rack", "rack": [...]}   nouveau rack, envoyé au seul joueur concerné
+    {"t": "fin", "gagnant": 0, "points": [...]}
+    {"t": "erreur", "message": "..."}
+
+Un coup est un tour complet : le serveur vérifie le plateau proposé avec les
+règles de Plateau et Combinaison (Jeu.reorganiser_plateau), exige qu'il
+pose au moins une tuile du rack, refuse une première pose de moins de 30
+points, puis termine le tour. Quand la pioche est vide et que tous les
+joueurs passent un tour de table de suite, la partie est bloquée : elle se
+termine et le gagnant est celui dont le rack vaut le moins de points
+(Jeu.terminer_partie_bloquee, qui compte aussi les points).
+
+Mémoire bornée : le nombre de tables est limité ; une table sans activité
+est mise en veille sous forme de sauvegarde (moins de 200 octets, voir
+sauvegarde.py) et rechargée à la requête suivante ; une table sans joueur
+connecté depuis trop longtemps est supprimée. Les lignes reçues sont de
+taille limitée et un client qui ne lit plus ses messages est déconnecté.
+
+Lancer : python serveur.py [port]
+         python serveur.py --charge [nombre de tables]   (clients locaux)
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from itertools import count
+from classes import Combinaison, NB_TYPES
+from game import Jeu
+from sauvegarde import sauvegarder, charger
+
+TAILLE_LIGNE = 4096
+TAMPON_MAX = 64 * 1024
+SEUIL_PREMIERE_POSE = 30
+
+
+class ErreurProtocole(Exception):
+    """Requête refusée : le message est renvoyé au client."""
+
+
+def _encoder(message:dict):
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def _codes(combinaison):
+    return [t.code for t in combinaison.tuiles]
+
+
+def _signature(codes):
+    return tuple(sorted(codes))
+
+
+def _entier(valeur):
+    """Vrai pour un entier JSON (les booléens ne comptent pas)."""
+    return isinstance(valeur, int) and not isinstance(valeur, bool)
+
+
+class Table:
+    """
+    Partie hébergée par le serveur.
+    Attributs :
+        ident (int) : numéro de la table.
+        sieges (list[Connexion | None]) : client assis à chaque place.
+        jeu (Jeu | None) : partie en cours, None quand la table est en veille.
+        sauvegarde (bytes | None) : partie en veille.
+        activite (float) : dernière activité (time.monotonic).
+        passes (int) : tours passés de suite, pioche vide.
+    Méthodes :
+        partie, veiller, jouer, tirer, diffuser, etat
+    """
+    __slots__ = ("ident", "sieges", "jeu", "sauvegarde", "activite", "passes")
+
+    def __init__(self, ident:int, n_joueurs:int):
+        self.ident = ident
+        self.jeu = Jeu(n_joueurs, verbeux=False)
+        self.sieges = [None] * len(self.jeu.joueurs)
+        self.sauvegarde = None
+        self.activite = time.monotonic()
+        self.passes = 0
+
+    def partie(self):
+        """Partie de la table, rechargée si elle était en veille."""
+        if self.jeu is None:
+            self.jeu = charger(self.sauvegarde, verbeux=False)
+            self.sauvegarde = None
+        self.activite = time.monotonic()
+        return self.jeu
+
+    def veiller(self):
+        """Met la partie en veille (entre deux tours, toujours le cas ici)."""
+        if self.jeu is not None:
+            self.sauvegarde = sauvegarder(self.jeu)
+            self.jeu = None
+
+    def etat(self, siege:int):
+        jeu = self.partie()
+        return {'t': 'etat', 'table': self.ident, 'siege': siege,
+                'noms': [j.nom for j in jeu.joueurs],
+                'rack': [t.code for t in jeu.joueurs[siege].rack.tuiles],
+                'plateau': [_codes(m) for m in jeu.plateau.mains],
+                'racks': [len(j.rack.tuiles) for j in jeu.joueurs],
+                'pioche': len(jeu.pioche), 'tour': jeu.tour % len(jeu.joueurs),
+                'terminee': jeu.partie_terminee}
+
+    def _verifier_tour(self, siege:int):
+        jeu = self.partie()
+        if jeu.partie_terminee:
+            raise ErreurProtocole("Partie terminée")
+        if jeu.tour % len(jeu.joueurs) != siege:
+            raise ErreurProtocole("Ce n'est pas ton tour")
+        return jeu
+
+    def jouer(self, siege:int, plateau:list):
+        """Remplace le plateau par `plateau` (listes de codes), puis termine
+        le tour. Retourne le delta (retirees, ajoutees).
+
+        Les combinaisons inchangées gardent leur place, les nouvelles sont
+        ajoutées à la fin : tous les clients ont le plateau dans le même
+        ordre. Lève ErreurProtocole si le coup est refusé (rien n'a changé).
+        """
+        jeu = self._verifier_tour(siege)
+        joueur = jeu.joueurs[siege]
+        if not isinstance(plateau, list) or not all(isinstance(c, list) for c in plateau):
+            raise ErreurProtocole("Plateau mal formé")
+        for c in plateau:
+            if not all(_entier(code) and 0 <= code < NB_TYPES for code in c):
+                raise ErreurProtocole("Code de tuile invalide")
+        # Combinaisons gardées (dans l'ordre du plateau) et nouvelles
+        restantes = Counter(_signature(c) for c in plateau)
+        retirees = []
+        for i, m in enumerate(jeu.plateau.mains):
+            signature = _signature(_codes(m))
+            if restantes[signature]:
+                restantes[signature] -= 1
+            else:
+                retirees.append(i)
+        ajoutees = []
+        for c in plateau:
+            signature = _signature(c)
+            if restantes[signature]:
+                restantes[signature] -= 1
+                ajoutees.append(c)
+        if not ajoutees and not retirees:
+            raise ErreurProtocole("Le plateau n'a pas changé")
+        # Sans tuile du rack, le joueur réarrangerait le plateau sans tirer
+        # (et, avant sa première pose, hors de toute transaction annulable)
+        if sum(map(len, plateau)) <= sum(len(m.tuiles) for m in jeu.plateau.mains):
+            raise ErreurProtocole("Aucune tuile du rack posée")
+        # Exemplaires : ceux du plateau d'abord, puis ceux du rack
+        disponibles = defaultdict(list)
+        for t in joueur.rack.tuiles:
+            disponibles[t.code].append(t)
+        for m in jeu.plateau.mains:
+            for t in m.tuiles:
+                disponibles[t.code].append(t)
+        a_retirer = set(retirees)
+        gardees = [m.tuiles for i, m in enumerate(jeu.plateau.mains) if i not in a_retirer]
+        combinaisons = []
+        try:
+            for c in gardees:
+                combinaisons.append(Combinaison([disponibles[t.code].pop() for t in c]))
+            for c in ajoutees:
+                combinaisons.append(Combinaison([disponibles[code].pop() for code in c]))
+        except IndexError:
+            raise ErreurProtocole("Tuiles absentes du plateau et du rack")
+        if not jeu.reorganiser_plateau(joueur, combinaisons):
+            raise ErreurProtocole("Plateau invalide")
+        if not joueur.has_melded and joueur.temp_meld_points < SEUIL_PREMIERE_POSE:
+            joueur.fin_premiere_pose(jeu.plateau, valider=False)
+            joueur.temp_meld_points = 0
+            raise ErreurProtocole(f"Première pose de moins de {SEUIL_PREMIERE_POSE} points")
+        jeu.terminer_tour()
+        self.passes = 0
+        return retirees, ajoutees
+
+    def tirer(self, siege:int):
+        """Tire une tuile (ou passe si la pioche est vide) et termine le tour.
+        Termine la partie si elle est bloquée (voir l'en-tête du module)."""
+        jeu = self._verifier_tour(siege)
+        self.passes = 0 if len(jeu.pioche) else self.passes + 1
+        jeu.tirer_tuile(jeu.joueurs[siege])
+        jeu.terminer_tour()
+        if self.passes >= len(jeu.joueurs) and not jeu.partie_terminee:
+            jeu.terminer_partie_bloquee()
+
+    def diffuser(self, message:dict):
+        donnees = _encoder(message)
+        for connexion in self.sieges:
+            if connexion is not None:
+                connexion.envoyer_donnees(donnees)
+
+    def __repr__(self):
+        occupes = sum(c is not None for c in self.sieges)
+        return f"Table({self.ident}, sieges={occupes}/{len(self.sieges)}, veille={self.jeu is None})"
+
+
+class Connexion:
+    """
+    Client connecté.
+    Attributs :
+        writer (asyncio.StreamWriter), table (Table | None), siege (int | None)
+    Méthodes :
+        envoyer, envoyer_donnees, fermer
+    """
+    __slots__ = ("writer", "table", "siege")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.table = None
+        self.siege = None
+
+    def envoyer(self, message:dict):
+        self.envoyer_donnees(_encoder(message))
+
+    def envoyer_donnees(self, donnees:bytes):
+        """Écrit sans attendre ; un client qui laisse son tampon d'envoi
+        dépasser TAMPON_MAX est déconnecté."""
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > TAMPON_MAX:
+            self.fermer()
+            return
+        self.writer.write(donnees)
+
+    def fermer(self):
+        if not self.writer.is_closing():
+            self.writer.close()
+
+
+class Serveur:
+    """
+    Serveur de tables.
+    Attributs :
+        tables (dict[int, Table]) : tables hébergées.
+        max_tables (int) : nombre maximal de tables.
+        veille (float) : inactivité (s) avant la mise en veille d'une table.
+        abandon (float) : inactivité (s) avant la suppression d'une table
+            sans joueur connecté.
+    Méthodes :
+        demarrer, servir, traiter, nettoyer, fermer
+    """
+    def __init__(self, max_tables:int = 10_000, max_joueurs:int = 4, veille:float = 30.0,
+                 abandon:float = 600.0):
+        self.tables = {}
+        self.max_tables = max_tables
+        self.max_joueurs = max_joueurs
+        self.veille = veille
+        self.abandon = abandon
+        self._numeros = count(1)
+        self._serveur = None
+        self._nettoyage = None
+
+    async def demarrer(self, hote:str = '127.0.0.1', port:int = 0):
+        """Ouvre le port (0 : choisi par le système) et retourne le port."""
+        self._serveur = await asyncio.start_server(self.servir, hote, port, limit=TAILLE_LIGNE)
+        self._nettoyage = asyncio.create_task(self._nettoyer_periodiquement())
+        return self._serveur.sockets[0].getsockname()[1]
+
+    async def fermer(self):
+        self._nettoyage.cancel()
+        self._serveur.close()
+        await self._serveur.wait_closed()
+
+    async def servir(self, reader, writer):
+        connexion = Connexion(writer)
+        try:
+            while True:
+                try:
+                    ligne = await reader.readline()
+                except (ValueError, ConnectionError):
+                    # Ligne trop longue ou connexion coupée
+                    break
+                if not ligne:
+                    break
+                try:
+                    requete = json.loads(ligne)
+                    if not isinstance(requete, dict):
+                        raise ErreurProtocole("Requête mal formée")
+                    if not self.traiter(connexion, requete):
+                        break
+                except ErreurProtocole as e:
+                    connexion.envoyer({'t': 'erreur', 'message': str(e)})
+                except ValueError:
+                    connexion.envoyer({'t': 'erreur', 'message': "JSON invalide"})
+                if writer.is_closing():
+                    break
+        finally:
+            self._quitter(connexion)
+            connexion.fermer()
+
+    def traiter(self, connexion:Connexion, requete:dict):
+        """Traite une requête. Retourne False si le client s'en va."""
+        op = requete.get('op')
+        if op == 'creer':
+            n = requete.get('joueurs', 2)
+            if not _entier(n) or not 1 <= n <= self.max_joueurs:
+                raise ErreurProtocole(f"Nombre de joueurs entre 1 et {self.max_joueurs}")
+            if len(self.tables) >= self.max_tables:
+                self.nettoyer()
+                if len(self.tables) >= self.max_tables:
+                    raise ErreurProtocole("Serveur complet")
+            table = Table(next(self._numeros), n)
+            self.tables[table.ident] = table
+            connexion.envoyer({'t': 'table', 'table': table.ident})
+        elif op == 'rejoindre':
+            numero = requete.get('table')
+            table = self.tables.get(numero) if _entier(numero) else None
+            if table is None:
+                raise ErreurProtocole("Table inconnue")
+            if connexion.table is not None:
+                raise ErreurProtocole("Déjà assis à une table")
+            if None not in table.sieges:
+                raise ErreurProtocole("Table complète")
+            siege = table.sieges.index(None)
+            nom = requete.get('nom')
+            if isinstance(nom, str) and nom.strip():
+                table.partie().joueurs[siege].nom = nom.strip()[:32]
+            table.sieges[siege] = connexion
+            connexion.table, connexion.siege = table, siege
+            connexion.envoyer(table.etat(siege))
+        elif op in ('jouer', 'tirer'):
+            table, siege = connexion.table, connexion.siege
+            if table is None:
+                raise ErreurProtocole("Pas assis à une table")
+            if op == 'jouer':
+                retirees, ajoutees = table.jouer(siege, requete.get('plateau'))
+            else:
+                table.tirer(siege)
+                retirees, ajoutees = [], []
+            jeu = table.jeu
+            connexion.envoyer({'t': 'rack', 'rack': [t.code for t in jeu.joueurs[siege].rack.tuiles]})
+            table.diffuser({'t': 'coup', 'siege': siege, 'retirees': retirees, 'ajoutees': ajoutees,
+                            'racks': [len(j.rack.tuiles) for j in jeu.joueurs],
+                            'pioche': len(jeu.pioche), 'tour': jeu.tour % len(jeu.joueurs)})
+            if jeu.partie_terminee:
+                table.diffuser({'t': 'fin', 'gagnant': jeu.joueurs.index(jeu.gagnant)
+                                if jeu.gagnant is not None else siege,
+                                'points': [j.points for j in jeu.joueurs]})
+        elif op == 'quitter':
+            return False
+        else:
+            raise ErreurProtocole("Opération inconnue")
+        return True
+
+    def _quitter(self, connexion:Connexion):
+        table = connexion.table
+        if table is None:
+            return
+        table.sieges[connexion.siege] = None
+        connexion.table = connexion.siege = None
+        # Partie finie que plus personne ne suit ; les autres attendent un
+        # retour des joueurs jusqu'à l'abandon (voir nettoyer)
+        if all(c is None for c in table.sieges) and table.jeu is not None and table.jeu.partie_terminee:
+            del self.tables[table.ident]
+
+    def nettoyer(self):
+        """Met en veille les tables inactives et supprime celles qui n'ont
+        plus de joueur connecté depuis `abandon` secondes."""
+        maintenant = time.monotonic()
+        for ident, table in list(self.tables.items()):
+            inactivite = maintenant - table.activite
+            if inactivite > self.abandon and all(c is None for c in table.sieges):
+                del self.tables[ident]
+            elif inactivite > self.veille:
+                table.veiller()
+
+    async def _nettoyer_periodiquement(self):
+        while True:
+            await asyncio.sleep(min(self.veille, self.abandon) / 4)
+            self.nettoyer()
+
+
+class Client:
+    """
+    Client minimal du protocole (tests, démonstrations).
+    Attributs :
+        delai (float | None) : attente maximale d'un message (s) ; au-delà,
+            recevoir lève asyncio.TimeoutError.
+    Méthodes :
+        connecter, envoyer, recevoir, requete, fermer
+    """
+    def __init__(self, reader, writer, delai:float = None):
+        self.reader = reader
+        self.writer = writer
+        self.delai = delai
+
+    @classmethod
+    async def connecter(cls, hote:str = '127.0.0.1', port:int = 0, delai:float = None):
+        reader, writer = await asyncio.open_connection(hote, port, limit=TAILLE_LIGNE * 16)
+        return cls(reader, writer, delai)
+
+    async def envoyer(self, **message):
+        self.writer.write(_encoder(message))
+        await self.writer.drain()
+
+    async def recevoir(self):
+        """Message suivant du serveur (None si la connexion est fermée)."""
+        ligne = await asyncio.wait_for(self.reader.readline(), self.delai)
+        return json.loads(ligne) if ligne else None
+
+    async def requete(self, **message):
+        await self.envoyer(**message)
+        return await self.recevoir()
+
+    async def fermer(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def _charge(n_tables:int):
+    """Crée n_tables tables de deux clients locaux qui tirent chacun un tour,
+    puis affiche le temps et la mémoire occupée."""
+    import tracemalloc
+    tracemalloc.start()
+    serveur = Serveur(max_tables=n_tables, veille=3600.0)
+    port = await serveur.demarrer()
+    debut = time.perf_counter()
+
+    async def table():
+        a, b = await Client.connecter(port=port), await Client.connecter(port=port)
+        numero = (await a.requete(op='creer', joueurs=2))['table']
+        await a.requete(op='rejoindre', table=numero, nom='A')
+        await b.requete(op='rejoindre', table=numero, nom='B')
+        for client in (a, b):
+            await client.envoyer(op='tirer')
+            await client.recevoir()                  # rack
+            for c in (a, b):
+                await c.recevoir()                   # coup
+        return a, b
+    clients = []
+    for k in range(0, n_tables, 100):
+        clients += await asyncio.gather(*(table() for _ in range(min(100, n_tables - k))))
+    duree = time.perf_counter() - debut
+    memoire = tracemalloc.get_traced_memory()[0]
+    for table_ in serveur.tables.values():
+        table_.veiller()
+    en_veille = tracemalloc.get_traced_memory()[0]
+    print(f"{n_tables} tables, {2 * n_tables} clients : {duree:.2f} s")
+    print(f"mémoire : {memoire / n_tables / 1024:.1f} Kio par table active "
+          f"(clients compris), {en_veille / n_tables / 1024:.1f} Kio en veille")
+    for a, b in clients:
+        await a.fermer()
+        await b.fermer()
+    await serveur.fermer()
+
+
+async def _servir(port:int):
+    serveur = Serveur()
+    port = await serveur.demarrer(port=port)
+    print(f"Serveur Rummikub sur 127.0.0.1:{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--charge':
+        asyncio.run(_charge(int(sys.argv[2]) if len(sys.argv) > 2 else 1000))
+    else:
+        asyncio.run(_servir(int(sys.argv[1]) if len(sys.argv) > 1 else 8765))
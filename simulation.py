@@ -0,0 +1,200 @@
+"""
+Moteur de simulation sans affichage ni saisie : fait jouer des parties
+complètes de Jeu par des politiques automatiques.
+
+Lancer : python simulation.py [nombre de parties] [politique ...]
+(exemple : python simulation.py 200 gloutonne pioche)
+"""
+import argparse
+import time
+from game import Jeu
+from premiere_pose import meilleure_premiere_pose
+from solveur import resoudre
+
+
+def _indices_rack(joueur, tuiles):
+    """Indices dans le rack du joueur des tuiles données."""
+    position = {t.ident: i for i, t in enumerate(joueur.rack.tuiles)}
+    return [position[t.ident] for t in tuiles]
+
+
+def _poser_depuis_rack(jeu:Jeu, joueur, seuil:int):
+    """Pose les meilleures combinaisons formées du seul rack si elles
+    atteignent `seuil` points. Retourne True si quelque chose a été posé."""
+    solution = meilleure_premiere_pose(joueur.rack, seuil)
+    if solution is None:
+        return False
+    for comb in solution.combinaisons:
+        jeu.poser_tuiles(joueur, [], _indices_rack(joueur, comb.tuiles))
+    return True
+
+
+class Politique:
+    """
+    Stratégie d'un joueur automatique.
+    Attributs :
+        nom (str) : nom court de la politique.
+    Méthodes :
+        jouer(jeu, joueur) : joue les poses du tour (sans tirer ni passer le
+            tour : le moteur tire une tuile si rien n'a été posé).
+    """
+    nom = "abstraite"
+
+    def jouer(self, jeu:Jeu, joueur):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class PolitiquePioche(Politique):
+    """Ne pose jamais rien : tire une tuile à chaque tour."""
+    nom = "pioche"
+
+    def jouer(self, jeu:Jeu, joueur):
+        pass
+
+
+class PolitiqueGloutonne(Politique):
+    """Pose les combinaisons de son rack (30 points au moins pour la première
+    pose), puis complète une par une les combinaisons du plateau avec les
+    tuiles restantes, sans jamais réarranger le plateau."""
+    nom = "gloutonne"
+
+    def jouer(self, jeu:Jeu, joueur):
+        if not joueur.has_melded:
+            _poser_depuis_rack(jeu, joueur, 30)
+            return
+        _poser_depuis_rack(jeu, joueur, 1)
+        ajout = True
+        while ajout and joueur.rack.tuiles:
+            ajout = False
+            for idx in range(len(joueur.rack.tuiles)):
+                for i, comb in enumerate(jeu.plateau.mains):
+                    positions = [(i, j) for j in range(len(comb.tuiles))]
+                    if jeu.poser_tuiles(joueur, positions, [idx]):
+                        ajout = True
+                        break
+                if ajout:
+                    break
+
+
+class PolitiqueSolveur(Politique):
+    """Première pose optimale depuis le rack, puis pose maximale à chaque
+    tour en réarrangeant tout le plateau (solveur.resoudre)."""
+    nom = "solveur"
+
+    def __init__(self, objectif:str = 'tuiles'):
+        self.objectif = objectif
+
+    def jouer(self, jeu:Jeu, joueur):
+        if not joueur.has_melded:
+            _poser_depuis_rack(jeu, joueur, 30)
+            return
+        solution = resoudre(jeu.plateau, joueur.rack, self.objectif)
+        if solution is not None and solution.tuiles_posees:
+            jeu.reorganiser_plateau(joueur, solution.combinaisons)
+
+    def __repr__(self):
+        return f"PolitiqueSolveur(objectif={self.objectif!r})"
+
+
+POLITIQUES = {p.nom: p for p in (PolitiquePioche, PolitiqueGloutonne, PolitiqueSolveur)}
+
+
+class ResultatPartie:
+    """
+    Résultat d'une partie simulée.
+    Attributs :
+        graine (int) : graine du mélange de la pioche.
+        tours (int) : nombre de tours joués.
+        gagnant (int | None) : indice du joueur ayant vidé son rack (None si
+            la partie s'est bloquée).
+        scores (list[int]) : points des joueurs, calculés par verifier_fin.
+    """
+    __slots__ = ("graine", "tours", "gagnant", "scores")
+
+    def __init__(self, graine:int, tours:int, gagnant, scores:list):
+        self.graine = graine
+        self.tours = tours
+        self.gagnant = gagnant
+        self.scores = scores
+
+    def __repr__(self):
+        return f"ResultatPartie(graine={self.graine}, tours={self.tours}, gagnant={self.gagnant}, scores={self.scores})"
+
+
+def jouer_tour(jeu:Jeu, politique:Politique):
+    """Joue le tour du joueur courant : ses poses selon `politique`, un
+    tirage s'il n'a rien posé, puis la fin du tour (Jeu.terminer_tour).
+    Retourne False si le joueur n'a pu ni poser ni tirer (pioche vide)."""
+    joueur = jeu.joueurs[jeu.tour % len(jeu.joueurs)]
+    avant = len(joueur.rack.tuiles)
+    politique.jouer(jeu, joueur)
+    actif = True
+    if len(joueur.rack.tuiles) >= avant:
+        if len(jeu.pioche):
+            jeu.tirer_tuile(joueur)
+        else:
+            actif = False
+    jeu.terminer_tour()
+    return actif
+
+
+def simuler_partie(politiques, graine:int, tours_max:int = 2000, journal=None):
+    """Joue une partie complète, un joueur par politique.
+
+    Un joueur qui ne pose rien tire une tuile. La partie s'arrête quand un
+    joueur vide son rack, quand la pioche est vide et qu'un tour de table
+    entier s'est passé sans pose, ou après `tours_max` tours.
+    journal : Journal optionnel où la partie est enregistrée.
+    """
+    jeu = Jeu(len(politiques), verbeux=False, graine=graine, journal=journal)
+    sans_pose = 0
+    while not jeu.partie_terminee and jeu.tour < tours_max:
+        if jouer_tour(jeu, politiques[jeu.tour % len(jeu.joueurs)]):
+            sans_pose = 0
+        else:
+            sans_pose += 1
+        if sans_pose >= len(jeu.joueurs):
+            break
+    gagnant = jeu.joueurs.index(jeu.gagnant) if jeu.gagnant is not None else None
+    return ResultatPartie(graine, jeu.tour, gagnant, [j.points for j in jeu.joueurs])
+
+
+def simuler(politiques, n_parties:int, graine:int = 0, tours_max:int = 2000):
+    """Joue n_parties parties de graines graine, graine + 1, ..."""
+    return [simuler_partie(politiques, graine + i, tours_max) for i in range(n_parties)]
+
+
+def resumer(resultats, n_joueurs:int):
+    """Statistiques par place : victoires, score moyen, et nombre moyen de
+    tours et de parties bloquées."""
+    n = len(resultats) or 1
+    return {
+        'parties': len(resultats),
+        'tours_moyens': sum(r.tours for r in resultats) / n,
+        'bloquees': sum(1 for r in resultats if r.gagnant is None),
+        'victoires': [sum(1 for r in resultats if r.gagnant == i) for i in range(n_joueurs)],
+        'scores_moyens': [sum(r.scores[i] for r in resultats) / n for i in range(n_joueurs)],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulation de parties de Rummikub sans affichage.")
+    parser.add_argument("parties", type=int, nargs="?", default=100)
+    parser.add_argument("politiques", nargs="*", default=["gloutonne", "pioche"],
+                        choices=sorted(POLITIQUES))
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+
+    politiques = [POLITIQUES[nom]() for nom in args.politiques]
+    debut = time.perf_counter()
+    resultats = simuler(politiques, args.parties, args.graine)
+    duree = time.perf_counter() - debut
+    resume = resumer(resultats, len(politiques))
+    print(f"{resume['parties']} parties en {duree:.2f} s ({resume['parties'] / duree:.1f} parties/s)")
+    print(f"Tours moyens : {resume['tours_moyens']:.1f}, parties bloquées : {resume['bloquees']}")
+    for i, politique in enumerate(politiques):
+        print(f"Joueur {i + 1} ({politique.nom}) : {resume['victoires'][i]} victoires, "
+              f"score moyen {resume['scores_moyens'][i]:.1f}")
@@ -0,0 +1,411 @@
+from functools import lru_cache
+from classes import (Combinaison, Plateau, Rack, COULEURS, NB_VALEURS, CODE_JOKER,
+                     signature, table_combinaisons_valides)
+
+
+class Solution:
+    """
+    Résultat du solveur.
+    Attributs :
+        combinaisons (list[Combinaison]) : nouveau plateau complet (tuiles du
+            plateau réarrangées + tuiles posées depuis le rack).
+        tuiles_posees (list[Tuile]) : tuiles du rack placées sur le plateau.
+        score (int) : valeur de l'objectif (nombre de tuiles ou points).
+    """
+    def __init__(self, combinaisons, tuiles_posees, score):
+        self.combinaisons = combinaisons
+        self.tuiles_posees = tuiles_posees
+        self.score = score
+
+    def __repr__(self):
+        return f"Solution(score={self.score}, posees={self.tuiles_posees}, combinaisons={len(self.combinaisons)})"
+
+
+# Longueur d'une suite en cours, plafonnée à 3 (3 = suite déjà valide).
+# Chaque couleur peut porter au plus deux suites en parallèle (deux exemplaires
+# par tuile) : l'état d'une couleur est la paire triée de leurs longueurs,
+# numérotée de 0 à 9.
+_PLAFOND = 3
+_PAIRES = [(l1, l2) for l1 in range(_PLAFOND + 1) for l2 in range(l1, _PLAFOND + 1)]
+_INDICE_PAIRE = {p: i for i, p in enumerate(_PAIRES)}
+_PUISSANCES = [10 ** c for c in range(len(COULEURS))]
+
+
+def _actions_couleur(l1:int, l2:int):
+    """Actions possibles sur les deux emplacements de suite d'une couleur.
+
+    Chaque action vaut 0 (pas de tuile : la suite se termine, ce qui n'est
+    permis que si elle est vide ou déjà valide), 'T' (une tuile réelle) ou
+    'J' (un joker). Retourne des triplets (a1, a2, indice de la nouvelle paire).
+    """
+    resultat = []
+    for a1 in (0, 'T', 'J'):
+        if a1 == 0 and l1 in (1, 2):
+            continue
+        for a2 in (0, 'T', 'J'):
+            if a2 == 0 and l2 in (1, 2):
+                continue
+            # Emplacements symétriques : on ne garde qu'un ordre
+            if l1 == l2 and (a1, a2) in (('T', 0), ('J', 0), ('J', 'T')):
+                continue
+            n1 = min(l1 + 1, _PLAFOND) if a1 else 0
+            n2 = min(l2 + 1, _PLAFOND) if a2 else 0
+            resultat.append((a1, a2, _INDICE_PAIRE[(n1, n2) if n1 <= n2 else (n2, n1)]))
+    return resultat
+
+
+@lru_cache(maxsize=None)
+def _transitions(paire:int, b:int, r:int, jokers_libres:int):
+    """Transitions d'une couleur pour une valeur : b tuiles du plateau (à
+    replacer), r tuiles du rack (facultatives), jokers_libres jokers.
+
+    Retourne des tuples (nouvelle paire, jokers utilisés, tuiles laissées aux
+    groupes, tuiles du rack posées, décision).
+    """
+    resultat = []
+    for a1, a2, nouvelle in _actions_couleur(*_PAIRES[paire]):
+        u = (a1 == 'T') + (a2 == 'T')
+        w = (a1 == 'J') + (a2 == 'J')
+        if w > jokers_libres or u > b + r:
+            continue
+        for g in range(max(0, b - u), min(2, b + r - u) + 1):
+            # Un joker ne remplace jamais une tuile disponible laissée de côté
+            if w and u + g < b + r:
+                continue
+            resultat.append((nouvelle, w, g, u + g - b, (a1, a2, g)))
+    return tuple(resultat)
+
+
+# Partie basse d'un sous-état : somme * 3 + maximum des tuiles laissées aux
+# groupes de la valeur. _GROUPES[bas][g] : variation de cette partie quand
+# une couleur laisse g tuiles aux groupes, ou None si la somme dépasserait 8.
+_GROUPES = [[(g * 3 + max(g - bas % 3, 0)) if bas // 3 + g <= 8 else None for g in range(3)]
+            for bas in range(27)]
+# Nombre de suites commencées mais pas encore valides (longueur 1 ou 2)
+_EN_ATTENTE = [sum(l in (1, 2) for l in p) for p in _PAIRES]
+
+
+# Dominance entre longueurs de suite : une suite de longueur 3 (déjà valide)
+# peut tout ce que peut un emplacement vide ou une suite plus courte, et une
+# suite de longueur 2 tout ce que peut une suite de longueur 1. Pour chaque
+# paire, les paires obtenues en allongeant un seul de ses emplacements.
+_PLUS_LONGUES = {0: (3,), 1: (2,), 2: (3,), 3: ()}
+_PAIRES_DOMINANTES = [
+    tuple(sorted({_INDICE_PAIRE[tuple(sorted((l, p[1 - i])))]
+                  for i in range(2) for l in _PLUS_LONGUES[p[i]]}))
+    for p in _PAIRES
+]
+
+
+def _elaguer(couche:dict, pas:int, couleurs=range(len(COULEURS))):
+    """Supprime les états dominés par un état où une couleur (parmi
+    `couleurs`) a une suite plus avancée (voir _PAIRES_DOMINANTES), avec
+    autant de jokers utilisés ou moins, la même partie basse et un score au
+    moins égal. Les jokers utilisés sont codés avec le multiplicateur `pas`,
+    les paires avec 3 * pas."""
+    puissances = [_PUISSANCES[c] * 3 * pas for c in couleurs]
+    for cle in list(couche):
+        score = couche[cle]
+        ju = cle // pas % 3
+        for p in puissances:
+            paire = cle // p % 10
+            for dominante in _PAIRES_DOMINANTES[paire]:
+                base = cle + (dominante - paire) * p
+                if any(couche.get(base - j * pas, -1) >= score for j in range(ju + 1)):
+                    del couche[cle]
+                    break
+            else:
+                continue
+            break
+
+
+def _pareto(couche:dict, pas:int):
+    """Supprime les états dominés : même configuration, plus de jokers
+    utilisés et score inférieur ou égal. Les jokers utilisés sont codés dans
+    la clé entière avec le multiplicateur `pas`."""
+    for cle in [cle for cle in couche if cle // pas % 3]:
+        score = couche[cle]
+        for d in range(1, cle // pas % 3 + 1):
+            if couche.get(cle - d * pas, -1) >= score:
+                del couche[cle]
+                break
+
+
+# Nombre d'états gardés à chaque valeur par la passe en faisceau, et nombre
+# de tuiles du plateau à partir duquel elle est lancée (en dessous, la passe
+# exacte est assez rapide seule)
+_LARGEUR_FAISCEAU = 32
+_FAISCEAU_DES = 30
+# Taille de couche à partir de laquelle la recherche des états dominés
+# coûte moins qu'elle n'économise
+_ELAGAGE_DES = 2000
+
+
+def _programmer(du_plateau, du_rack, jokers_total:int, gains, largeur:int = None, plancher:int = -1,
+                annulation=None):
+    """Programmation dynamique de resoudre sur les valeurs 1 à 13.
+
+    largeur : si donnée, seuls les `largeur` meilleurs états sont gardés
+        entre deux valeurs (passe en faisceau : rapide, mais pas forcément
+        optimale).
+    plancher : score d'une solution déjà connue ; les états qui ne peuvent
+        plus l'atteindre, même en posant toutes les tuiles du rack restant à
+        traiter, sont abandonnés.
+
+    Retourne la dernière couche (état -> score) et les retours (un
+    dictionnaire état -> (état précédent, décision) par étape).
+    """
+    # Les états sont codés en entiers :
+    # - couche (entre deux valeurs) : paires * 3 + jokers utilisés, les paires
+    #   des 4 couleurs formant un nombre en base 10 ;
+    # - sous-état (pendant une valeur) : couche * 27 + somme * 3 + maximum des
+    #   tuiles laissées aux groupes de la valeur (somme <= 8, maximum <= 2).
+    # Gain maximal restant après chaque code, dans l'ordre de traitement
+    # (valeur par valeur, couleur par couleur)
+    ordre = [c * NB_VALEURS + v - 1 for v in range(1, NB_VALEURS + 1) for c in range(len(COULEURS))]
+    restes = {}
+    total = 0
+    for code in reversed(ordre):
+        restes[code] = total
+        total += gains[code] * len(du_rack[code])
+    couche = {0: 0}
+    retours = []
+
+    for valeur in range(1, NB_VALEURS + 1):
+        if annulation is not None:
+            annulation()
+        sous = {cle * 27: score for cle, score in couche.items()}
+        for c in range(len(COULEURS)):
+            code = c * NB_VALEURS + valeur - 1
+            b = len(du_plateau[code])
+            r = len(du_rack[code])
+            gain = gains[code]
+            seuil = plancher - restes[code]
+            puissance = _PUISSANCES[c] * 81
+            suivant = {}
+            retour = {}
+            for etat, score in sous.items():
+                groupes = _GROUPES[etat % 27]
+                ju = etat // 27 % 3
+                paire = etat // puissance % 10
+                # À la première couleur, l'état précédent est celui de la couche
+                precedent = etat if c else etat // 27
+                for nouvelle, w, g, poses, decision in _transitions(paire, b, r, jokers_total - ju):
+                    d = groupes[g]
+                    if d is None:
+                        continue
+                    s = score + poses * gain
+                    if s < seuil:
+                        continue
+                    nouvel = etat + (nouvelle - paire) * puissance + w * 27 + d
+                    if s > suivant.get(nouvel, -1):
+                        suivant[nouvel] = s
+                        retour[nouvel] = (precedent, decision)
+            _pareto(suivant, 27)
+            if len(suivant) > _ELAGAGE_DES:
+                _elaguer(suivant, 27, (c,))
+            sous = suivant
+            retours.append(retour)
+
+        # Formation des groupes de la valeur : k groupes de 3 ou 4 tuiles,
+        # x jokers en complément.
+        couche = {}
+        retour = {}
+        for etat, score in sous.items():
+            maxi = etat % 3
+            somme = etat // 3 % 9
+            ju = etat // 27 % 3
+            if somme == 0:
+                options = ((0, 0),)
+            else:
+                options = [(k, x) for k in range(max(maxi, 1), 3) for x in range(0, jokers_total - ju + 1)
+                           if 3 * k <= somme + x <= 4 * k]
+            for k, x in options:
+                nouvel = etat // 27 + x
+                if score > couche.get(nouvel, -1):
+                    couche[nouvel] = score
+                    retour[nouvel] = (etat, (k, x))
+        _pareto(couche, 1)
+        if len(couche) > _ELAGAGE_DES:
+            _elaguer(couche, 1)
+        if largeur is not None and len(couche) > largeur:
+            # Meilleurs scores d'abord, puis le moins de suites à compléter
+            couche = dict(sorted(couche.items(), key=lambda e: (-e[1], _attente(e[0])))[:largeur])
+        retours.append(retour)
+    return couche, retours
+
+
+def _attente(etat:int):
+    """Nombre de suites d'une couche encore trop courtes pour être valides."""
+    paires = etat // 3
+    return sum(_EN_ATTENTE[paires // p % 10] for p in _PUISSANCES)
+
+
+def _meilleur_final(couche:dict):
+    """(score, état) du meilleur état final dont toutes les suites sont
+    terminées (vides ou valides), ou None."""
+    meilleur = None
+    for etat, score in couche.items():
+        if _attente(etat):
+            continue
+        if meilleur is None or score > meilleur[0]:
+            meilleur = (score, etat)
+    return meilleur
+
+
+def resoudre(plateau:Plateau, rack:Rack, objectif:str = 'tuiles', annulation=None, repli:bool = False):
+    """Cherche la pose optimale du rack sur le plateau, tout le plateau
+    pouvant être réarrangé en suites et groupes valides.
+
+    Programmation dynamique sur les valeurs 1 à 13 : à chaque valeur, les
+    tuiles de chaque couleur prolongent (ou démarrent) jusqu'à deux suites
+    par couleur, le reste forme des groupes de la valeur courante. Les jokers
+    peuvent tenir n'importe quelle place ; ceux qui ne servent à compléter
+    aucune combinaison sont ajoutés à la fin à une combinaison existante.
+    Toutes les tuiles du plateau doivent être réutilisées.
+
+    Sur les grands plateaux, une première passe en faisceau
+    (_LARGEUR_FAISCEAU états par valeur) trouve vite une solution ; si elle
+    pose toutes les tuiles du rack hors jokers, elle est optimale. Sinon la
+    passe exacte abandonne les états qui ne peuvent plus l'égaler, ainsi que
+    les états dominés (_elaguer). Quand cette passe est nécessaire sur un
+    plateau d'une vingtaine de combinaisons, elle peut encore prendre de
+    l'ordre d'une seconde : les appelants pressés la bornent par
+    `annulation`.
+
+    objectif : 'tuiles' (maximise le nombre de tuiles posées) ou 'points'
+        (maximise la valeur posée, joker = 25, comme au décompte final).
+    annulation : fonction optionnelle appelée à chaque valeur de la passe
+        exacte ; elle peut lever une exception pour interrompre la recherche.
+    repli : si vrai, une interruption de la passe exacte par `annulation`
+        retourne la solution de la passe en faisceau (pas forcément
+        optimale) quand il y en a une, au lieu de propager l'exception.
+
+    Retourne une Solution, ou None si les tuiles du plateau ne peuvent pas
+    être arrangées en combinaisons valides.
+    """
+    if objectif not in ('tuiles', 'points'):
+        raise ValueError(f"Objectif inconnu : {objectif}")
+    # Tuiles physiques disponibles par code
+    du_plateau = [[] for _ in range(CODE_JOKER + 1)]
+    du_rack = [[] for _ in range(CODE_JOKER + 1)]
+    for m in plateau.mains:
+        for t in m.tuiles:
+            du_plateau[t.code].append(t)
+    for t in rack.tuiles:
+        du_rack[t.code].append(t)
+    jokers_total = min(len(du_plateau[CODE_JOKER]) + len(du_rack[CODE_JOKER]), 2)
+
+    gains = [1 if objectif == 'tuiles' else (code % NB_VALEURS) + 1 for code in range(CODE_JOKER)]
+    # Passe en faisceau (grands plateaux) : une solution réalisable,
+    # optimale si elle pose toutes les tuiles (hors jokers) du rack, sinon
+    # plancher de la passe exacte.
+    meilleur = None
+    if sum(map(len, du_plateau)) >= _FAISCEAU_DES:
+        couche, retours = _programmer(du_plateau, du_rack, jokers_total, gains, largeur=_LARGEUR_FAISCEAU)
+        meilleur = _meilleur_final(couche)
+    if meilleur is None or meilleur[0] < sum(gains[code] * len(du_rack[code]) for code in range(CODE_JOKER)):
+        try:
+            couche, retours = _programmer(du_plateau, du_rack, jokers_total, gains,
+                                          plancher=meilleur[0] if meilleur else -1, annulation=annulation)
+        except Exception:
+            if not repli or meilleur is None:
+                raise
+        else:
+            meilleur = _meilleur_final(couche)
+    if meilleur is None:
+        return None
+    score, final = meilleur
+    jokers_rack = len(du_rack[CODE_JOKER])
+    if score == 0 and not (jokers_rack and plateau.mains):
+        return Solution([Combinaison(m.tuiles) for m in plateau.mains], [], 0)
+
+    # Remontée des décisions, de la dernière étape à la première
+    decisions = []
+    etat = final
+    for retour in reversed(retours):
+        etat, decision = retour[etat]
+        decisions.append(decision)
+    decisions.reverse()
+    return _reconstruire(decisions, du_plateau, du_rack, score, 1 if objectif == 'tuiles' else 25)
+
+
+def _placer_joker(combinaisons, joker):
+    """Ajoute un joker restant à une combinaison : de préférence une suite de
+    moins de 13 tuiles ou un groupe de 3, sinon la première combinaison (qui
+    reste valide pour Main.est_valide). Retourne False s'il n'y en a aucune."""
+    table = table_combinaisons_valides()
+    for comb in combinaisons:
+        genre = table.get(signature(comb.tuiles))
+        if (genre == 'suite' and len(comb.tuiles) < NB_VALEURS) or (genre == 'groupe' and len(comb.tuiles) < 4):
+            comb.ajouter_tuile(joker)
+            return True
+    if combinaisons:
+        combinaisons[0].ajouter_tuile(joker)
+        return True
+    return False
+
+
+def _reconstruire(decisions, du_plateau, du_rack, score, valeur_joker):
+    """Rejoue les décisions de la programmation dynamique sur les tuiles
+    physiques pour produire les combinaisons."""
+    posees = []
+    jokers = list(du_plateau[CODE_JOKER])
+    jokers_rack = list(du_rack[CODE_JOKER])
+
+    def prendre(code):
+        if du_plateau[code]:
+            return du_plateau[code].pop()
+        t = du_rack[code].pop()
+        posees.append(t)
+        return t
+
+    def prendre_joker():
+        if jokers:
+            return jokers.pop()
+        t = jokers_rack.pop()
+        posees.append(t)
+        return t
+
+    combinaisons = []
+    suites = [[[], []] for _ in COULEURS]
+    etape = 0
+    for valeur in range(1, NB_VALEURS + 1):
+        restes = []
+        for c in range(len(COULEURS)):
+            a1, a2, g = decisions[etape]
+            etape += 1
+            code = c * NB_VALEURS + valeur - 1
+            emplacements = suites[c]
+            for i, action in enumerate((a1, a2)):
+                if action == 0:
+                    if emplacements[i]:
+                        combinaisons.append(Combinaison(emplacements[i]))
+                        emplacements[i] = []
+                else:
+                    emplacements[i].append(prendre(code) if action == 'T' else prendre_joker())
+            # Même ordre que la paire triée de l'état
+            if min(len(emplacements[0]), _PLAFOND) > min(len(emplacements[1]), _PLAFOND):
+                emplacements.reverse()
+            restes.extend(prendre(code) for _ in range(g))
+        k, x = decisions[etape]
+        etape += 1
+        if k:
+            groupes = [[] for _ in range(k)]
+            # Les doublons d'une même couleur vont dans des groupes différents
+            restes.sort(key=lambda t: t.code)
+            for t in restes:
+                candidats = [gr for gr in groupes if all(u.code != t.code for u in gr)]
+                min(candidats, key=len).append(t)
+            for _ in range(x):
+                min(groupes, key=len).append(prendre_joker())
+            combinaisons.extend(Combinaison(gr) for gr in groupes)
+    for emplacements in suites:
+        combinaisons.extend(Combinaison(s) for s in emplacements if s)
+    # Jokers restants : ceux du plateau doivent être replacés, ceux du rack
+    # sont posés dès qu'une combinaison peut les accueillir.
+    for joker in jokers + jokers_rack:
+        if _placer_joker(combinaisons, joker) and joker in jokers_rack:
+            posees.append(joker)
+    score += valeur_joker * sum(1 for t in posees if t.is_joker)
+    return Solution(combinaisons, posees, score)
@@ -0,0 +1,235 @@
+"""
+Calculs lourds de l'interface exécutés hors du fil de l'interface, sur le
+QThreadPool de Qt : l'interface reste fluide pendant qu'un solveur ou une
+validation tourne.
+
+Chaque tâche reçoit un Controle : elle l'appelle régulièrement (avancer),
+ce qui publie sa progression et l'interrompt si elle a été annulée
+(annulation coopérative : le solveur s'arrête entre deux valeurs). Les
+résultats, la progression et les erreurs reviennent au fil de l'interface
+par des signaux Qt.
+
+Les tâches travaillent sur des copies (copier_plateau, copier_rack, ou une
+sauvegarde de toute la partie) : le plateau et les racks de la partie
+peuvent changer pendant le calcul.
+
+Utilisation :
+    taches = Taches()
+    taches.lancer('indice', meilleur_coup, copier_plateau(plateau), copier_rack(rack), True,
+                  terminee=afficher_indice, progression=barre.setValue)
+    ...
+    taches.annuler('indice')
+"""
+import threading
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from classes import Combinaison, Plateau, Rack, NB_VALEURS
+from premiere_pose import meilleure_premiere_pose
+from sauvegarde import charger
+from solveur import resoudre
+
+
+class TacheAnnulee(Exception):
+    """Levée par Controle.avancer quand la tâche a été annulée."""
+
+
+class Controle:
+    """
+    Annulation et progression d'une tâche (indépendant de Qt).
+    Attributs :
+        annulee (bool) : la tâche a été annulée.
+    Méthodes :
+        annuler, verifier, avancer(fraction)
+    """
+    def __init__(self, progression=None):
+        self._annulee = threading.Event()
+        self._progression = progression
+
+    @property
+    def annulee(self):
+        return self._annulee.is_set()
+
+    def annuler(self):
+        self._annulee.set()
+
+    def verifier(self):
+        """Lève TacheAnnulee si la tâche a été annulée."""
+        if self._annulee.is_set():
+            raise TacheAnnulee
+
+    def avancer(self, fraction:float):
+        """Point d'interruption : vérifie l'annulation puis publie la
+        progression (entre 0 et 1)."""
+        self.verifier()
+        if self._progression is not None:
+            self._progression(fraction)
+
+
+# --- Copies pour le calcul en arrière-plan -------------------------------
+
+def copier_plateau(plateau:Plateau):
+    copie = Plateau()
+    copie.mains = [Combinaison(m.tuiles) for m in plateau.mains]
+    return copie
+
+
+def copier_rack(rack:Rack):
+    copie = Rack()
+    copie.tuiles = list(rack.tuiles)
+    return copie
+
+
+# --- Calculs -------------------------------------------------------------
+
+def valider_combinaisons(combinaisons, controle:Controle):
+    """Indices des combinaisons invalides (listes de tuiles) ; liste vide si
+    le plateau est valide."""
+    invalides = []
+    for k, comb in enumerate(combinaisons):
+        if k % 16 == 0:
+            controle.avancer(k / len(combinaisons))
+        if not Combinaison(list(comb)).est_valide():
+            invalides.append(k)
+    controle.avancer(1.0)
+    return invalides
+
+
+def meilleur_coup(plateau:Plateau, rack:Rack, a_pose:bool, controle:Controle):
+    """Meilleur coup du joueur : le plateau réarrangé qui pose le plus de
+    tuiles (solveur.resoudre), ou, avant la première pose, la pose de 30
+    points au moins la plus rentable (ses seules combinaisons nouvelles).
+    Retourne une Solution, ou None s'il n'y a rien à poser."""
+    controle.avancer(0.0)
+    if not a_pose:
+        solution = meilleure_premiere_pose(rack)
+        controle.avancer(1.0)
+        return solution
+    valeur = [0]
+
+    def annulation():
+        valeur[0] += 1
+        controle.avancer(valeur[0] / (NB_VALEURS + 1))
+    solution = resoudre(plateau, rack, annulation=annulation)
+    controle.avancer(1.0)
+    if solution is None or not solution.tuiles_posees:
+        return None
+    return solution
+
+
+def reflexion(joueur, sauvegarde:bytes, observateur:int, controle:Controle):
+    """Coup d'un joueur automatique (JoueurIA.reflechir), cherché sur une
+    copie de la partie (sauvegarde.sauvegarder) où il occupe la place
+    `observateur`. Les actions désignent les tuiles par identifiant : elles
+    s'appliquent telles quelles à la vraie partie. La recherche n'est pas
+    interrompue par une annulation : son résultat est seulement ignoré.
+    Elle met à jour joueur.statistiques depuis ce fil (voir
+    JoueurIA.reflechir)."""
+    controle.avancer(0.0)
+    jeu = charger(sauvegarde, verbeux=False)
+    return joueur.reflechir(jeu, observateur).result()
+
+
+# --- Exécution sur le QThreadPool ----------------------------------------
+
+class SignauxTache(QObject):
+    """Signaux d'une tâche, reçus dans le fil de l'interface."""
+    progression = pyqtSignal(float)
+    terminee = pyqtSignal(object)
+    echouee = pyqtSignal(str)
+    annulee = pyqtSignal()
+
+
+class Tache(QRunnable):
+    """
+    Appel de fonction(*args, controle=...) dans un fil du QThreadPool.
+    Attributs :
+        signaux (SignauxTache), controle (Controle)
+    Méthodes :
+        run, annuler
+    """
+    def __init__(self, fonction, *args):
+        super().__init__()
+        self.fonction = fonction
+        self.args = args
+        self.signaux = SignauxTache()
+        self.controle = Controle(self.signaux.progression.emit)
+
+    def run(self):
+        try:
+            resultat = self.fonction(*self.args, controle=self.controle)
+        except TacheAnnulee:
+            self.signaux.annulee.emit()
+            return
+        except Exception as e:
+            self.signaux.echouee.emit(str(e))
+            return
+        if self.controle.annulee:
+            self.signaux.annulee.emit()
+        else:
+            self.signaux.terminee.emit(resultat)
+
+    def annuler(self):
+        self.controle.annuler()
+
+
+class Taches:
+    """
+    Tâches en cours de l'interface, au plus une par nom : en lancer une
+    nouvelle annule la précédente du même nom, dont le résultat est ignoré.
+    Attributs :
+        pool (QThreadPool), en_cours (dict[str, Tache])
+    Méthodes :
+        lancer, annuler, en_cours_de
+    """
+    def __init__(self, pool:QThreadPool = None):
+        self.pool = pool or QThreadPool.globalInstance()
+        self.en_cours = {}
+
+    def lancer(self, nom:str, fonction, *args, terminee=None, progression=None, echouee=None):
+        """Lance fonction(*args, controle=...) en arrière-plan. Les fonctions
+        données sont appelées dans le fil de l'interface, seulement si la
+        tâche n'a pas été remplacée ou annulée entre-temps."""
+        self.annuler(nom)
+        tache = Tache(fonction, *args)
+
+        def a_jour():
+            return self.en_cours.get(nom) is tache and not tache.controle.annulee
+
+        def fin():
+            if self.en_cours.get(nom) is tache:
+                del self.en_cours[nom]
+
+        def sur_terminee(resultat):
+            if a_jour():
+                fin()
+                if terminee is not None:
+                    terminee(resultat)
+            else:
+                fin()
+
+        def sur_echec(message):
+            if a_jour():
+                fin()
+                if echouee is not None:
+                    echouee(message)
+            else:
+                fin()
+
+        tache.signaux.terminee.connect(sur_terminee)
+        tache.signaux.echouee.connect(sur_echec)
+        tache.signaux.annulee.connect(fin)
+        if progression is not None:
+            tache.signaux.progression.connect(lambda f: a_jour() and progression(f))
+        self.en_cours[nom] = tache
+        self.pool.start(tache)
+        return tache
+
+    def annuler(self, nom:str = None):
+        """Annule la tâche `nom`, ou toutes les tâches."""
+        noms = list(self.en_cours) if nom is None else [nom]
+        for n in noms:
+            tache = self.en_cours.get(n)
+            if tache is not None:
+                tache.annuler()
+
+    def en_cours_de(self, nom:str):
+        return nom in self.en_cours
@@ -0,0 +1,140 @@
+"""
+Tests du serveur de tables (serveur.py) avec des clients locaux.
+
+Lancer : python -m pytest test_serveur.py   (ou python -m unittest test_serveur)
+"""
+import unittest
+from classes import Combinaison, Pioche, Tuile
+from serveur import Serveur, Client
+
+DELAI = 5.0
+
+
+def _tuiles(codes, copie=0):
+    return [Tuile.depuis_code(c, copie) for c in codes]
+
+
+class TestServeur(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.serveur = Serveur(veille=3600.0)
+        self.port = port = await self.serveur.demarrer()
+        self.clients = [await Client.connecter(port=port, delai=DELAI) for _ in range(2)]
+        self.numero = (await self.clients[0].requete(op='creer', joueurs=2))['table']
+        self.etats = [await c.requete(op='rejoindre', table=self.numero, nom=f"P{k}")
+                      for k, c in enumerate(self.clients)]
+        self.table = self.serveur.tables[self.numero]
+
+    async def asyncTearDown(self):
+        for c in self.clients:
+            await c.fermer()
+        await self.serveur.fermer()
+
+    def preparer(self, rack, plateau=(), a_pose=False):
+        """Rack du joueur 0 (codes), plateau (listes de codes, second
+        exemplaire des tuiles) et première pose faite ou non."""
+        jeu = self.table.partie()
+        joueur = jeu.joueurs[0]
+        joueur.rack.tuiles = _tuiles(rack)
+        joueur.has_melded = a_pose
+        jeu.plateau.mains = [Combinaison(_tuiles(c, copie=1)) for c in plateau]
+        return jeu
+
+    def plateau_serveur(self):
+        return [[t.code for t in m.tuiles] for m in self.table.partie().plateau.mains]
+
+    async def test_creer_et_rejoindre(self):
+        self.assertEqual([e['t'] for e in self.etats], ['etat', 'etat'])
+        self.assertEqual([e['siege'] for e in self.etats], [0, 1])
+        self.assertEqual(len(self.etats[0]['rack']), 14)
+        self.assertEqual(self.etats[1]['noms'], ['P0', 'P1'])
+        autre = await Client.connecter(port=self.port, delai=DELAI)
+        reponse = await autre.requete(op='rejoindre', table=self.numero)
+        self.assertEqual(reponse, {'t': 'erreur', 'message': "Table complète"})
+        await autre.fermer()
+
+    async def test_requetes_mal_typees(self):
+        client = self.clients[0]
+        for requete in ({'op': 'creer', 'joueurs': True}, {'op': 'creer', 'joueurs': [2]},
+                        {'op': 'rejoindre', 'table': [1]}, {'op': 'rejoindre', 'table': {'a': 1}},
+                        {'op': 'jouer', 'plateau': [[True, 1, 2]]}, {'op': 'jouer', 'plateau': 3}):
+            reponse = await client.requete(**requete)
+            self.assertEqual(reponse['t'], 'erreur', requete)
+        # La connexion est toujours servie
+        self.assertEqual((await client.requete(op='creer', joueurs=2))['t'], 'table')
+
+    async def test_coup_accepte(self):
+        self.preparer([9, 10, 11, 0, 1])
+        await self.clients[0].envoyer(op='jouer', plateau=[[9, 10, 11]])
+        self.assertEqual(sorted((await self.clients[0].recevoir())['rack']), [0, 1])
+        for c in self.clients:
+            coup = await c.recevoir()
+            self.assertEqual((coup['t'], coup['siege'], coup['tour']), ('coup', 0, 1))
+            self.assertEqual((coup['retirees'], coup['ajoutees']), ([], [[9, 10, 11]]))
+        self.assertEqual(self.plateau_serveur(), [[9, 10, 11]])
+        self.assertTrue(self.table.partie().joueurs[0].has_melded)
+
+    async def test_premiere_pose_insuffisante(self):
+        self.preparer([0, 1, 2, 5])
+        reponse = await self.clients[0].requete(op='jouer', plateau=[[0, 1, 2]])
+        self.assertEqual(reponse['t'], 'erreur')
+        jeu = self.table.partie()
+        self.assertEqual(self.plateau_serveur(), [])
+        self.assertEqual(len(jeu.joueurs[0].rack.tuiles), 4)
+        self.assertEqual(jeu.tour, 0)
+
+    async def test_reorganisation_sans_rack_avant_premiere_pose(self):
+        self.preparer([20, 21], plateau=[[0, 1, 2, 3, 4, 5]])
+        reponse = await self.clients[0].requete(op='jouer', plateau=[[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(reponse['t'], 'erreur')
+        self.assertEqual(self.plateau_serveur(), [[0, 1, 2, 3, 4, 5]])
+        self.assertEqual(self.table.partie().tour, 0)
+
+    async def test_reorganisation_sans_rack_apres_premiere_pose(self):
+        self.preparer([20, 21], plateau=[[0, 1, 2, 3, 4, 5]], a_pose=True)
+        reponse = await self.clients[0].requete(op='jouer', plateau=[[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(reponse['t'], 'erreur')
+        jeu = self.table.partie()
+        self.assertEqual(self.plateau_serveur(), [[0, 1, 2, 3, 4, 5]])
+        self.assertEqual((len(jeu.joueurs[0].rack.tuiles), jeu.tour), (2, 0))
+
+    async def test_reorganisation_avec_rack(self):
+        self.preparer([6, 20], plateau=[[0, 1, 2, 3, 4, 5]], a_pose=True)
+        await self.clients[0].envoyer(op='jouer', plateau=[[0, 1, 2], [3, 4, 5, 6]])
+        self.assertEqual((await self.clients[0].recevoir())['rack'], [20])
+        coups = [await c.recevoir() for c in self.clients]
+        self.assertEqual(coups[0], coups[1])
+        self.assertEqual((coups[0]['retirees'], coups[0]['ajoutees']), ([0], [[0, 1, 2], [3, 4, 5, 6]]))
+
+    async def test_veille_et_reprise(self):
+        self.preparer([9, 10, 11, 0], plateau=[[30, 31, 32]], a_pose=True)
+        self.table.veiller()
+        self.assertIsNone(self.table.jeu)
+        self.assertLess(len(self.table.sauvegarde), 200)
+        await self.clients[0].envoyer(op='tirer')
+        self.assertEqual(len((await self.clients[0].recevoir())['rack']), 5)
+        for c in self.clients:
+            self.assertEqual((await c.recevoir())['tour'], 1)
+        self.assertIsNotNone(self.table.jeu)
+        self.assertEqual(self.plateau_serveur(), [[30, 31, 32]])
+        self.assertTrue(self.table.jeu.joueurs[0].has_melded)
+
+    async def test_partie_bloquee(self):
+        jeu = self.preparer([0, 1])
+        jeu.pioche = Pioche(idents=[])
+        for k, client in enumerate(self.clients):
+            await client.envoyer(op='tirer')
+            await client.recevoir()                  # rack
+            for c in self.clients:
+                self.assertEqual((await c.recevoir())['t'], 'coup')
+        valeur = sum(25 if t.is_joker else t.valeur for t in self.table.partie().joueurs[1].rack.tuiles)
+        for c in self.clients:
+            fin = await c.recevoir()
+            self.assertEqual((fin['t'], fin['gagnant']), ('fin', 0))
+            self.assertEqual(fin['points'], [valeur - 3, -valeur])
+        reponse = await self.clients[0].requete(op='tirer')
+        self.assertEqual(reponse, {'t': 'erreur', 'message': "Partie terminée"})
+
+
+if __name__ == "__main__":
+    unittest.main()
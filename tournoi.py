@@ -0,0 +1,160 @@
+"""
+Tournoi entre politiques automatiques, réparti sur plusieurs processus
+(un par cœur par défaut).
+
+Lancer : python tournoi.py [nombre de parties] [politique ...]
+(exemple : python tournoi.py 10000 solveur gloutonne --processus 8)
+"""
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from simulation import POLITIQUES, simuler_partie
+
+
+def graine_partie(graine:int, index:int):
+    """Graine de la partie `index` du tournoi : ne dépend que de la graine du
+    tournoi et de l'index, pas du processus qui la joue."""
+    return (graine * 1_000_003 + index) & 0xFFFFFFFF
+
+
+class StatistiquesPolitique:
+    """
+    Statistiques cumulées d'une politique, fusionnables entre processus.
+    Attributs :
+        parties (int), victoires (int), bloquees (int) : nombre de parties
+            jouées, gagnées, et terminées sans gagnant.
+        scores (Counter) : distribution des scores finaux (score -> nombre).
+    Méthodes :
+        ajouter, fusionner, taux_victoire, score_moyen, ecart_type, quantile
+    """
+    __slots__ = ("parties", "victoires", "bloquees", "scores")
+
+    def __init__(self):
+        self.parties = 0
+        self.victoires = 0
+        self.bloquees = 0
+        self.scores = Counter()
+
+    def ajouter(self, score:int, gagne:bool, bloquee:bool):
+        self.parties += 1
+        self.victoires += gagne
+        self.bloquees += bloquee
+        self.scores[score] += 1
+
+    def fusionner(self, autre):
+        self.parties += autre.parties
+        self.victoires += autre.victoires
+        self.bloquees += autre.bloquees
+        self.scores.update(autre.scores)
+
+    def taux_victoire(self):
+        return self.victoires / self.parties if self.parties else 0.0
+
+    def score_moyen(self):
+        return sum(s * n for s, n in self.scores.items()) / self.parties if self.parties else 0.0
+
+    def ecart_type(self):
+        if not self.parties:
+            return 0.0
+        moyenne = self.score_moyen()
+        return (sum(n * (s - moyenne) ** 2 for s, n in self.scores.items()) / self.parties) ** 0.5
+
+    def quantile(self, q:float):
+        """Plus petit score s tel qu'une proportion q des scores soit <= s."""
+        cumul = 0
+        for s in sorted(self.scores):
+            cumul += self.scores[s]
+            if cumul >= q * self.parties:
+                return s
+        return 0
+
+    def __repr__(self):
+        return (f"StatistiquesPolitique(parties={self.parties}, victoires={self.victoires}, "
+                f"score_moyen={self.score_moyen():.1f})")
+
+
+def _jouer_lot(noms:tuple, graine:int, debut:int, fin:int, tours_max:int):
+    """Joue les parties d'index debut..fin-1 (dans un processus de travail).
+
+    Les places tournent d'une partie à l'autre pour qu'aucune politique ne
+    soit avantagée par l'ordre de jeu. Retourne les statistiques du lot par
+    nom de politique, et le nombre de tours joués.
+    """
+    politiques = {nom: POLITIQUES[nom]() for nom in set(noms)}
+    stats = {nom: StatistiquesPolitique() for nom in politiques}
+    tours = 0
+    for index in range(debut, fin):
+        decalage = index % len(noms)
+        places = noms[decalage:] + noms[:decalage]
+        resultat = simuler_partie([politiques[nom] for nom in places], graine_partie(graine, index), tours_max)
+        tours += resultat.tours
+        for place, nom in enumerate(places):
+            stats[nom].ajouter(resultat.scores[place], resultat.gagnant == place, resultat.gagnant is None)
+    return stats, tours
+
+
+def tournoi(noms, n_parties:int, graine:int = 0, processus:int = None, taille_lot:int = 50,
+            tours_max:int = 2000, progression=None):
+    """Joue n_parties parties entre les politiques `noms` sur un pool de
+    processus, et fusionne les statistiques au fil des lots terminés.
+
+    Les résultats ne dépendent ni du nombre de processus ni de l'ordre
+    d'arrivée des lots. progression : fonction optionnelle appelée avec
+    (parties terminées, statistiques partielles) après chaque lot.
+
+    Les statistiques étant regroupées par nom, chaque politique ne peut
+    avoir qu'une place : ValueError si un nom est répété ou inconnu.
+
+    Retourne (statistiques par nom de politique, nombre total de tours).
+    """
+    noms = tuple(noms)
+    if len(set(noms)) != len(noms):
+        raise ValueError(f"Politique en double : {', '.join(sorted(n for n in set(noms) if noms.count(n) > 1))}")
+    inconnues = [nom for nom in noms if nom not in POLITIQUES]
+    if inconnues:
+        raise ValueError(f"Politique inconnue : {', '.join(inconnues)}")
+    stats = {nom: StatistiquesPolitique() for nom in noms}
+    tours = 0
+    terminees = 0
+    with ProcessPoolExecutor(max_workers=processus or os.cpu_count()) as pool:
+        lots = {
+            pool.submit(_jouer_lot, noms, graine, debut, min(debut + taille_lot, n_parties), tours_max):
+                min(taille_lot, n_parties - debut)
+            for debut in range(0, n_parties, taille_lot)
+        }
+        for lot in as_completed(lots):
+            stats_lot, tours_lot = lot.result()
+            for nom, s in stats_lot.items():
+                stats[nom].fusionner(s)
+            tours += tours_lot
+            terminees += lots[lot]
+            if progression is not None:
+                progression(terminees, stats)
+    return stats, tours
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tournoi multiprocessus entre politiques de Rummikub.")
+    parser.add_argument("parties", type=int, nargs="?", default=1000)
+    parser.add_argument("politiques", nargs="*", default=["gloutonne", "pioche"],
+                        choices=sorted(POLITIQUES))
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--processus", type=int, default=None)
+    parser.add_argument("--lot", type=int, default=50)
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    try:
+        stats, tours = tournoi(args.politiques, args.parties, args.graine, args.processus, args.lot,
+                               progression=lambda n, _: print(f"\r{n}/{args.parties} parties", end="", flush=True))
+    except ValueError as e:
+        parser.error(str(e))
+    duree = time.perf_counter() - debut
+    print(f"\n{args.parties} parties en {duree:.2f} s ({args.parties / duree:.1f} parties/s, "
+          f"{tours / max(args.parties, 1):.1f} tours en moyenne)")
+    for nom, s in stats.items():
+        print(f"{nom:10s} : {s.taux_victoire() * 100:5.1f} % de victoires, score moyen {s.score_moyen():7.1f} "
+              f"(écart-type {s.ecart_type():.1f}, médiane {s.quantile(0.5)}, "
+              f"10 % {s.quantile(0.1)}, 90 % {s.quantile(0.9)})")